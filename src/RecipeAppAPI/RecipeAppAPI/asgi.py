@@ -2,6 +2,7 @@
 ASGI config for RecipeAppAPI project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Views run in a bounded pool of ASGI_THREADS threads, see core.handlers.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
@@ -9,7 +10,7 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from core.handlers import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'RecipeAppAPI.settings')
 
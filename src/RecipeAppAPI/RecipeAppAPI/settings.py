@@ -52,6 +52,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'RecipeAppAPI.urls'
@@ -74,27 +75,111 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'RecipeAppAPI.wsgi.application'
 
+# Threads of each ASGI process running views (core.handlers). The event loop
+# reads requests and sends responses, so slow clients don't hold a thread.
+# Keep it within DB_POOL_MAX_SIZE so views don't wait for connections.
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 10))
+
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# Connections are taken from a pool shared by the threads of each process
+# (core.db.pool) and given back at the end of each request, so requests
+# skip the TCP and authentication handshakes. Idle connections are health
+# checked before reuse once idle for HEALTH_CHECK_INTERVAL seconds. Pool
+# metrics are reported by /api/metrics/. With DB_POOL_MAX_SIZE=0, each
+# thread opens its own connection, kept for DB_CONN_MAX_AGE seconds.
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 10))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get("DB_HOST"),
         'NAME': os.environ.get("DB_NAME"),
         'USER': os.environ.get("DB_USER"),
         'PASSWORD': os.environ.get("DB_PASS"),
+        'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", 0)),
+        'POOL': {
+            'MAX_SIZE': DB_POOL_MAX_SIZE,
+            # Seconds to wait for a connection while all are in use
+            'TIMEOUT': float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            'MAX_LIFETIME': int(os.environ.get("DB_POOL_MAX_LIFETIME", 1800)),
+            'HEALTH_CHECK_INTERVAL': 30,
+        } if DB_POOL_MAX_SIZE else None,
     }
 }
+
+# Read replicas of the primary, at the comma separated DB_REPLICA_HOSTS with
+# the primary credentials. Safe requests to views with replica_reads set
+# read from a random available replica (core.middleware), except for clients
+# that wrote within DATABASE_REPLICA_STICKY_SECONDS, so they read their own
+# writes. Replicas failing to connect are skipped for
+# DATABASE_REPLICA_RETRY_SECONDS. Point DATABASE_REPLICA_STICKY_CACHE at a
+# cache shared by all processes in production: with a process local cache,
+# as by default, clients only read their own writes from the process that
+# served them, which the core.W001 system check warns about.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(","))
+):
+    DATABASE_REPLICAS.append(f"replica_{index}")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ["core.db.routers.ReplicaRouter"]
+DATABASE_REPLICA_STICKY_SECONDS = int(
+    os.environ.get("DB_REPLICA_STICKY_SECONDS", 10)
+)
+DATABASE_REPLICA_RETRY_SECONDS = 30
+DATABASE_REPLICA_STICKY_CACHE = "default"
 # DATABASES = {
 #     'default': {
-#         'ENGINE': 'django.db.backends.sqlite3',
+#         'ENGINE': 'core.db.backends.sqlite3',
 #         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
 #     }
 # }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+# The recipes cache holds serialized API responses, evicted after TIMEOUT
+# seconds or least recently used first once MAX_ENTRIES is reached. Point it
+# at a shared backend (e.g. django_redis.cache.RedisCache with an allkeys-lru
+# policy) in production. Keys embed the user's collection version, so writes
+# invalidate them without any deletes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipes': {
+        'BACKEND': os.environ.get(
+            "RECIPES_CACHE_BACKEND",
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get("RECIPES_CACHE_LOCATION", "recipes"),
+        'TIMEOUT': int(os.environ.get("RECIPES_CACHE_TIMEOUT", 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+RECIPES_RESPONSE_CACHE_ALIAS = "recipes"
+
+# Authentication tokens are cached by each process for a short while, set
+# the alias to a shared cache to share them between processes instead.
+# Without it, a token deleted or a user deactivated through one process is
+# still accepted by the others for up to AUTH_TOKEN_CACHE_TIMEOUT seconds.
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+AUTH_TOKEN_CACHE_MAX_ENTRIES = 10000
+AUTH_TOKEN_CACHE_ALIAS = os.environ.get("AUTH_TOKEN_CACHE_ALIAS")
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -138,3 +223,104 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = "/vol/web/media"
 
 AUTH_USER_MODEL = "core.UserProfile"
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+}
+
+# Objects rendered at a time by streamed lists, ?stream=true
+RECIPES_STREAM_CHUNK_SIZE = 500
+
+# Recipes read from a server side cursor at a time by exports, each chunk
+# fetching the names of their tags and ingredients in one query per relation
+RECIPES_EXPORT_CHUNK_SIZE = 2000
+
+# Renders recipe, tag and ingredient lists from values() rows instead of
+# model instances and serializer fields
+RECIPES_FAST_SERIALIZATION = True
+
+# Largest number of items accepted by a single bulk request
+RECIPES_BULK_MAX_ITEMS = 1000
+
+# Records of imported files written per transaction
+RECIPES_IMPORT_BATCH_SIZE = 1000
+
+# Background threads running uploaded imports, at most one per user
+RECIPES_IMPORT_WORKERS = int(os.environ.get("RECIPES_IMPORT_WORKERS", 1))
+
+# Imports pending or running at most, further uploads are turned away
+RECIPES_IMPORT_MAX_QUEUED = int(
+    os.environ.get("RECIPES_IMPORT_MAX_QUEUED", 20)
+)
+
+# Seconds a pending or running import may make no progress before it is
+# deemed lost with its worker, failed and made resumable
+RECIPES_IMPORT_STALE_SECONDS = int(
+    os.environ.get("RECIPES_IMPORT_STALE_SECONDS", 600)
+)
+
+# Runs uploaded imports inline with the upload request, for tests
+RECIPES_IMPORT_EAGER = False
+
+# Largest file accepted by import uploads, in bytes
+RECIPES_IMPORT_MAX_UPLOAD_SIZE = int(
+    os.environ.get("RECIPES_IMPORT_MAX_UPLOAD_SIZE", 1024 * 1024 * 1024)
+)
+
+# Longest side in pixels of each resized recipe image rendition
+RECIPE_IMAGE_RENDITIONS = {
+    "thumbnail": 200,
+    "medium": 640,
+    "large": 1280,
+}
+
+# Background threads rendering uploaded recipe images
+RECIPE_IMAGE_WORKERS = int(os.environ.get("RECIPE_IMAGE_WORKERS", 2))
+
+# Renders recipe images inline with the upload request, for tests
+RECIPE_IMAGE_PIPELINE_EAGER = False
+
+# Largest recipe image accepted by uploads, in bytes
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.environ.get("RECIPE_IMAGE_MAX_UPLOAD_SIZE", 20 * 1024 * 1024)
+)
+
+# Seconds an unfinished recipe image upload is kept
+RECIPE_IMAGE_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Seconds clients may cache content addressed media files
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Recipes returned by a search by default and at most
+RECIPES_SEARCH_LIMIT = 20
+RECIPES_SEARCH_MAX_LIMIT = 100
+
+# Users whose in-process search and autocomplete indexes each process
+# keeps, when the database can't serve these from its own indexes
+RECIPES_INDEX_MAX_USERS = 100
+
+# Tags or ingredients returned by an autocomplete by default and at most
+RECIPES_AUTOCOMPLETE_LIMIT = 10
+RECIPES_AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Width of the buckets recipe prices and times are rolled up into for
+# statistics, percentiles are rounded down to it. Run the
+# rebuild_recipe_rollups command after changing them.
+RECIPES_STATS_BUCKETS = {
+    "price": "1.00",
+    "time_minutes": 5,
+}
+
+# Percentiles of recipe prices and times reported by statistics
+RECIPES_STATS_PERCENTILES = (50, 90, 99)
+
+# Most used tags and ingredients reported by statistics
+RECIPES_STATS_HISTOGRAM_SIZE = 20
+
+# Seconds a content addressed media file is kept after it was last saved
+# before releasing it deletes it, covering saves still reusing it. Files
+# released sooner are deleted by collect_image_garbage.
+MEDIA_RELEASE_MIN_AGE = 60
@@ -18,8 +18,15 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import MetricsView, serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/profiles/", include("profiles.urls")),
     path("api/recipes/", include("recipes.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
+] + static(
+    settings.MEDIA_URL,
+    view=serve_media,
+    document_root=settings.MEDIA_ROOT,
+)
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        """Connects the core models signal receivers, registers checks"""
+        import core.checks  # noqa: F401
+        import core.signals  # noqa: F401
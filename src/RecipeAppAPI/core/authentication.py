@@ -0,0 +1,168 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from rest_framework.authentication import TokenAuthentication
+
+from core import metrics
+
+
+class TokenCache:
+    """
+    Bounded in-process LRU cache of authentication tokens with a TTL.
+
+    Entries hold plain field values rather than model instances, so every
+    request gets its own user object. When AUTH_TOKEN_CACHE_ALIAS names a
+    cache backend, entries are shared with other processes and read from
+    it on every lookup, so evictions by any process apply at once.
+    Otherwise each process caches tokens on its own, and other processes
+    keep accepting a deleted token or deactivated user for up to
+    AUTH_TOKEN_CACHE_TIMEOUT seconds.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = metrics.HitMissCounter()
+
+    @property
+    def timeout(self):
+        """Returns the seconds a token stays cached"""
+        return settings.AUTH_TOKEN_CACHE_TIMEOUT
+
+    @property
+    def max_entries(self):
+        """Returns the number of tokens cached by each process"""
+        return settings.AUTH_TOKEN_CACHE_MAX_ENTRIES
+
+    @property
+    def shared_cache(self):
+        """Returns the cache backend shared between processes if any"""
+        alias = settings.AUTH_TOKEN_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def shared_key(key):
+        """Returns the shared cache key of a token without exposing it"""
+        return f"auth-token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+    def get(self, key):
+        """Returns the cached payload of a token key or None"""
+        if self.shared_cache is not None:
+            payload = self.shared_cache.get(self.shared_key(key))
+            if payload is None:
+                self.stats.miss()
+            else:
+                self.stats.hit()
+
+            return payload
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, payload = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.stats.hit()
+                    return payload
+                del self._entries[key]
+
+        self.stats.miss()
+        return None
+
+    def set(self, key, payload):
+        """Caches the payload of a token key"""
+        if self.shared_cache is not None:
+            self.shared_cache.set(self.shared_key(key), payload, self.timeout)
+        else:
+            self._store(key, payload)
+
+    def _store(self, key, payload):
+        """Caches a payload locally, evicting the least recently used"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Removes a token key from the cache"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+        if self.shared_cache is not None:
+            self.shared_cache.delete(self.shared_key(key))
+
+    def evict_users(self, user_ids):
+        """Removes the tokens of users from the cache"""
+        from rest_framework.authtoken.models import Token
+        for key in Token.objects.filter(user_id__in=user_ids).values_list(
+            "key", flat=True
+        ):
+            self.delete(key)
+
+    def clear(self):
+        """Removes all the locally cached tokens"""
+        with self._lock:
+            self._entries.clear()
+
+    def as_dict(self):
+        """Returns the cache metrics"""
+        stats = self.stats.as_dict()
+        stats["size"] = len(self._entries)
+
+        return stats
+
+
+token_cache = TokenCache()
+metrics.register("token_cache", token_cache.as_dict)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication saving the token lookup of cached tokens"""
+    # User fields cached along tokens, those authentication, permissions and
+    # the profile read. Others, like the password hash, are never cached
+    # and are loaded from the database when accessed.
+    cached_user_fields = (
+        "email", "name", "is_active", "is_staff", "is_superuser",
+    )
+
+    def authenticate_credentials(self, key):
+        """Returns the user and token of a key, from the cache if possible"""
+        payload = token_cache.get(key)
+        if payload is not None:
+            return self.from_payload(payload)
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, self.to_payload(user, token))
+
+        return user, token
+
+    @classmethod
+    def to_payload(cls, user, token):
+        """Returns the cacheable field values of a user and its token"""
+        names = [user._meta.pk.attname, *cls.cached_user_fields]
+
+        return {
+            "user": [(name, getattr(user, name)) for name in names],
+            "token": [("key", token.key), ("created", token.created)],
+        }
+
+    def from_payload(self, payload):
+        """Returns new user and token objects built from a cached payload"""
+        user = get_user_model().from_db(
+            DEFAULT_DB_ALIAS,
+            [name for name, _ in payload["user"]],
+            [value for _, value in payload["user"]],
+        )
+        token = self.get_model()(user=user, **dict(payload["token"]))
+        token._state.adding = False
+        token._state.db = DEFAULT_DB_ALIAS
+
+        return user, token
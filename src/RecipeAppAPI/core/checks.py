@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+# Cache backends whose entries are only seen by the process setting them
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches)
+def check_replica_sticky_cache(app_configs, **kwargs):
+    """
+    Warns when replicas are used with a sticky cache local to processes,
+    which lets clients read stale data from replicas in other processes
+    right after writing
+    """
+    if not settings.DATABASE_REPLICAS:
+        return []
+
+    alias = settings.DATABASE_REPLICA_STICKY_CACHE
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+
+    return [Warning(
+        f"DATABASE_REPLICA_STICKY_CACHE uses the process local {backend}.",
+        hint=(
+            "Point it at a cache shared by all processes, like Redis or "
+            "Memcached, so that clients read their own writes whichever "
+            "process serves them."
+        ),
+        id="core.W001",
+    )]
@@ -0,0 +1,69 @@
+from functools import partial
+
+from core.db.pool import PoolTimeout, get_pool
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Database wrapper mixin taking connections from a pool shared by the
+    threads of the process, configured by the POOL dict of the database
+    settings, instead of opening a new connection each time.
+
+    Closed connections go back to the pool after rolling back anything left
+    open, unless errors made them unusable or they were closed within a
+    transaction. Without POOL, connections are opened and closed as usual.
+    """
+    # Pool the current connection was taken from
+    connection_pool = None
+
+    def get_pool(self):
+        """Returns the pool of the database settings, None if unpooled"""
+        if not self.settings_dict.get("POOL"):
+            return None
+
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        """Returns a connection of the pool, opening one if needed"""
+        pool = self.get_pool()
+        if pool is None:
+            self.connection_pool = None
+            return super().get_new_connection(conn_params)
+
+        try:
+            connection = pool.acquire(
+                partial(super().get_new_connection, conn_params)
+            )
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+
+        self.connection_pool = pool
+
+        return connection
+
+    def _close(self):
+        """Returns the connection to its pool instead of closing it"""
+        if self.connection_pool is None:
+            return super()._close()
+
+        self.connection_pool.release(self.connection, self.reset_connection())
+
+    def reset_connection(self):
+        """
+        Rolls back the transaction left open on the connection, returns
+        whether the connection can be reused by others
+        """
+        # Django keeps the connection of a transaction closed midway
+        if self.in_atomic_block:
+            return False
+
+        if self.errors_occurred and not self.is_usable():
+            return False
+
+        if not self.get_autocommit():
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                return False
+
+        return True
@@ -0,0 +1,17 @@
+from django.db.backends.postgresql import base, creation
+
+from core.db.backends.mixins import PooledDatabaseWrapperMixin
+from core.db.pool import close_idle_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Test database creation closing pooled connections before drops"""
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections to the test database would block the drop
+        close_idle_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """PostgreSQL database wrapper with connection pooling"""
+    creation_class = DatabaseCreation
@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from core.db.backends.mixins import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """SQLite database wrapper with connection pooling, for local runs"""
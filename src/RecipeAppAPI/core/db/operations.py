@@ -0,0 +1,109 @@
+from django.db.migrations.operations import AddIndex
+from django.db.migrations.operations.base import Operation
+
+
+def is_postgresql(schema_editor):
+    """Returns whether schema_editor edits a Postgres database"""
+    return schema_editor.connection.vendor == "postgresql"
+
+
+class AddIndexConcurrently(AddIndex):
+    """
+    Adds an index to a model like AddIndex, building it concurrently on
+    Postgres to not block writes to the table, which requires the migration
+    to be non-atomic. Other databases build it as AddIndex does.
+    """
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if not is_postgresql(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if not is_postgresql(schema_editor):
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+    def describe(self):
+        return f"{super().describe()}, concurrently on Postgres"
+
+
+class AddThroughIndex(Operation):
+    """
+    Adds an index on columns of the through table of a many to many field.
+
+    Auto-created through tables have no model state to declare indexes on,
+    so the index is created with SQL. On Postgres it is built concurrently
+    to not block writes to the table, which requires the migration to be
+    non-atomic.
+    """
+    reduces_to_sql = False
+
+    def __init__(self, model_name, field_name, name, columns):
+        self.model_name = model_name
+        self.field_name = field_name
+        self.name = name
+        self.columns = columns
+
+    def deconstruct(self):
+        return (
+            self.__class__.__name__,
+            [],
+            {
+                "model_name": self.model_name,
+                "field_name": self.field_name,
+                "name": self.name,
+                "columns": self.columns,
+            },
+        )
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def get_through_table(self, app_label, state):
+        """Returns the name of the through table of the field"""
+        model = state.apps.get_model(app_label, self.model_name)
+        field = model._meta.get_field(self.field_name)
+
+        return field.remote_field.through._meta.db_table
+
+    def concurrently(self, schema_editor):
+        """Returns the keyword building the index without locking writes"""
+        if is_postgresql(schema_editor):
+            return " CONCURRENTLY"
+
+        return ""
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            f"CREATE INDEX{self.concurrently(schema_editor)} IF NOT EXISTS "
+            f"{quote(self.name)} ON "
+            f"{quote(self.get_through_table(app_label, to_state))} "
+            f"({', '.join(quote(column) for column in self.columns)})"
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        schema_editor.execute(
+            f"DROP INDEX{self.concurrently(schema_editor)} IF EXISTS "
+            f"{schema_editor.quote_name(self.name)}"
+        )
+
+    def describe(self):
+        return (
+            f"Create index {self.name} on {self.model_name}."
+            f"{self.field_name} through table"
+        )
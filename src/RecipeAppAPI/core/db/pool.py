@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import deque
+from contextlib import closing
+
+from core import metrics
+
+
+class PoolTimeout(Exception):
+    """No connection of a full pool was released in time"""
+
+
+def ping(connection):
+    """Returns whether a DB-API connection still answers queries"""
+    try:
+        with closing(connection.cursor()) as cursor:
+            cursor.execute("SELECT 1")
+    except Exception:
+        return False
+
+    return True
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of DB-API connections shared by the threads of the
+    process.
+
+    Holds at most max_size connections, opened on demand. Acquiring from a
+    full pool waits up to timeout seconds for a connection to be released.
+    Idle connections are health checked before being reused once idle for
+    health_check_interval seconds, and connections are closed once released
+    after max_lifetime seconds.
+    """
+    def __init__(self, max_size=10, timeout=10, max_lifetime=None,
+                 health_check_interval=30, check=ping):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.check = check
+        self._condition = threading.Condition()
+        # Idle connections and when they were released, reused last first
+        self._idle = deque()
+        self._opened_at = {}
+        self.size = 0
+        self.connects = 0
+        self.acquires = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+        self.health_check_failures = 0
+
+    def acquire(self, connect):
+        """
+        Returns an idle connection, or a new one opened by connect while
+        the pool isn't full, waiting for one to be released otherwise.
+        Raises PoolTimeout if none is released in time.
+        """
+        started = time.monotonic()
+        waited = False
+        while True:
+            connection, released_at = self._take(started)
+            waited = waited or connection is False
+            if connection is None:
+                break
+
+            if connection is not False:
+                if (
+                    time.monotonic() - released_at
+                    < self.health_check_interval
+                    or self.check(connection)
+                ):
+                    self._record_acquire(started, waited)
+                    return connection
+
+                with self._condition:
+                    self.health_check_failures += 1
+                self._discard(connection)
+
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self.size -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self.connects += 1
+            self._opened_at[id(connection)] = time.monotonic()
+        self._record_acquire(started, waited)
+
+        return connection
+
+    def _take(self, started):
+        """
+        Returns an idle connection and when it was released, None to open a
+        new connection, or False once it waited for a released connection
+        """
+        with self._condition:
+            if self._idle:
+                return self._idle.pop()
+
+            if self.size < self.max_size:
+                self.size += 1
+                return None, None
+
+            remaining = self.timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                self.timeouts += 1
+                raise PoolTimeout(
+                    f"No connection of the pool of {self.max_size} was "
+                    f"released within {self.timeout} seconds."
+                )
+            self._condition.wait(remaining)
+
+            return False, None
+
+    def _record_acquire(self, started, waited):
+        """Counts an acquired connection and the time spent waiting for it"""
+        elapsed = time.monotonic() - started
+        with self._condition:
+            self.acquires += 1
+            if waited:
+                self.waits += 1
+                self.wait_time += elapsed
+                self.max_wait_time = max(self.max_wait_time, elapsed)
+
+    def release(self, connection, reusable=True):
+        """
+        Returns a connection to the pool, closing it instead if it isn't
+        reusable or outlived its maximum lifetime
+        """
+        opened_at = self._opened_at.get(id(connection), 0)
+        if not reusable or (
+            self.max_lifetime is not None
+            and time.monotonic() - opened_at >= self.max_lifetime
+        ):
+            self._discard(connection)
+            return
+
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def _discard(self, connection):
+        """Closes a connection and frees its place in the pool"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+        with self._condition:
+            self._opened_at.pop(id(connection), None)
+            self.size -= 1
+            self._condition.notify()
+
+    def close_idle(self):
+        """Closes the idle connections"""
+        with self._condition:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+
+        for connection in idle:
+            self._discard(connection)
+
+    def as_dict(self):
+        """Returns the pool size and wait time metrics"""
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": self.size - len(self._idle),
+                "connects": self.connects,
+                "acquires": self.acquires,
+                "waits": self.waits,
+                "wait_time_avg": (
+                    round(self.wait_time / self.waits, 6) if self.waits
+                    else 0.0
+                ),
+                "wait_time_max": round(self.max_wait_time, 6),
+                "timeouts": self.timeouts,
+                "health_check_failures": self.health_check_failures,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """
+    Returns the pool of the connections of a database, created once per
+    database from the POOL dict of its settings
+    """
+    key = (alias, *(
+        settings_dict.get(name) for name in ("NAME", "USER", "HOST", "PORT")
+    ))
+    with _pools_lock:
+        if key not in _pools:
+            options = settings_dict["POOL"]
+            _pools[key] = ConnectionPool(
+                max_size=options.get("MAX_SIZE", 10),
+                timeout=options.get("TIMEOUT", 10),
+                max_lifetime=options.get("MAX_LIFETIME"),
+                health_check_interval=options.get(
+                    "HEALTH_CHECK_INTERVAL", 30
+                ),
+            )
+            metrics.register(f"db_pool_{alias}", _pools[key].as_dict)
+
+    return _pools[key]
+
+
+def close_idle_pools(name):
+    """Closes the idle connections of the pools of the database name"""
+    with _pools_lock:
+        pools = [pool for key, pool in _pools.items() if key[1] == name]
+
+    for pool in pools:
+        pool.close_idle()
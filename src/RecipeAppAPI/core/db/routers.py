@@ -0,0 +1,144 @@
+import hashlib
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from core import metrics
+
+
+# Replica the reads of the current request go to, None for the primary
+replica_alias = ContextVar("replica_alias", default=None)
+
+
+class ReplicaSet:
+    """
+    The read replicas of DATABASE_REPLICAS, the ones found unavailable
+    being left out for DATABASE_REPLICA_RETRY_SECONDS, and whose clients
+    read their own writes from the primary for
+    DATABASE_REPLICA_STICKY_SECONDS after each write.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._down_until = {}
+        self.reads = {}
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self.failovers = 0
+
+    @property
+    def aliases(self):
+        """Returns the database aliases of the replicas"""
+        return settings.DATABASE_REPLICAS
+
+    def choose(self):
+        """
+        Returns a random available replica, connecting to it to make sure,
+        or None to read from the primary when none is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                alias for alias in self.aliases
+                if self._down_until.get(alias, 0) <= now
+            ]
+        random.shuffle(candidates)
+
+        for alias in candidates:
+            try:
+                connections[alias].ensure_connection()
+            except DatabaseError:
+                with self._lock:
+                    self.failovers += 1
+                    self._down_until[alias] = (
+                        now + settings.DATABASE_REPLICA_RETRY_SECONDS
+                    )
+                continue
+
+            with self._lock:
+                self.reads[alias] = self.reads.get(alias, 0) + 1
+            return alias
+
+        with self._lock:
+            self.primary_reads += 1
+
+        return None
+
+    @staticmethod
+    def sticky_key(credentials):
+        """Returns the cache key of the stickiness of client credentials"""
+        digest = hashlib.sha256(credentials.encode()).hexdigest()
+        return f"replica-sticky:{digest}"
+
+    def stick(self, credentials):
+        """Reads from the primary for the client of credentials for a while"""
+        timeout = settings.DATABASE_REPLICA_STICKY_SECONDS
+        if credentials and timeout:
+            cache = caches[settings.DATABASE_REPLICA_STICKY_CACHE]
+            cache.set(self.sticky_key(credentials), True, timeout)
+
+    def is_sticky(self, credentials):
+        """Returns whether the client of credentials wrote recently"""
+        if not (credentials and settings.DATABASE_REPLICA_STICKY_SECONDS):
+            return False
+
+        cache = caches[settings.DATABASE_REPLICA_STICKY_CACHE]
+        if cache.get(self.sticky_key(credentials)) is None:
+            return False
+
+        with self._lock:
+            self.sticky_reads += 1
+
+        return True
+
+    def as_dict(self):
+        """Returns the reads routed to each database and the failovers"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "replica_reads": dict(self.reads),
+                "primary_reads": self.primary_reads,
+                "sticky_reads": self.sticky_reads,
+                "failovers": self.failovers,
+                "down": sorted(
+                    alias for alias, until in self._down_until.items()
+                    if until > now
+                ),
+            }
+
+
+replicas = ReplicaSet()
+metrics.register("db_replicas", replicas.as_dict)
+
+
+class ReplicaRouter:
+    """
+    Routes the reads of requests marked by ReplicaRoutingMiddleware to
+    their replica, and all writes and migrations to the primary
+    """
+    def db_for_read(self, model, **hints):
+        """Returns the replica of the current request, if any"""
+        return replica_alias.get()
+
+    def db_for_write(self, model, **hints):
+        """Returns the primary, even for objects read from a replica"""
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allows relations between objects of the primary or replicas"""
+        databases = {DEFAULT_DB_ALIAS, *replicas.aliases}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Migrates the primary only, replicas copy its schema"""
+        if db in replicas.aliases:
+            return False
+
+        return None
@@ -0,0 +1,169 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.http import FileResponse
+from django.urls import set_script_prefix
+
+from core import metrics
+
+
+class ThreadPoolASGIHandler(ASGIHandler):
+    """
+    ASGI handler running the synchronous views in a bounded pool of
+    ASGI_THREADS threads.
+
+    The event loop reads request bodies and sends responses, so slow clients
+    only hold a thread while their view runs, and requests beyond the pool
+    size wait on the loop rather than in threads of their own. Streaming
+    responses are read by a thread as they're sent, since reading them may
+    query the database.
+    """
+    def __init__(self):
+        super().__init__()
+        self.threads = settings.ASGI_THREADS
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.threads,
+            thread_name_prefix="asgi",
+        )
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.max_waiting = 0
+        self.handled = 0
+        metrics.register("asgi", self.as_dict)
+
+    async def __call__(self, scope, receive, send):
+        """Reads the request, gets its response in a thread and sends it"""
+        if scope["type"] != "http":
+            raise ValueError(
+                "Django can only handle ASGI/HTTP connections, not "
+                f"{scope['type']}."
+            )
+
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+
+        response = await self.run_in_thread(
+            self.get_response_in_thread, scope, body_file
+        )
+        if response.streaming:
+            await self.run_in_thread(
+                self.stream_response, response, send,
+                asyncio.get_running_loop(),
+            )
+        else:
+            await self.send_response(response, send)
+
+    async def run_in_thread(self, func, *args):
+        """Runs func in a thread of the pool, in the current context"""
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(
+                contextvars.copy_context().run, self.run_counted, func, *args
+            )
+        )
+
+    def run_counted(self, func, *args):
+        """Runs func, counting it as running rather than waiting meanwhile"""
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def get_response_in_thread(self, scope, body_file):
+        """Returns the response to the request of scope"""
+        set_script_prefix(self.get_script_prefix(scope))
+        signals.request_started.send(sender=self.__class__, scope=scope)
+        request, error_response = self.create_request(scope, body_file)
+        if request is None:
+            return error_response
+
+        response = self.get_response(request)
+        response._handler_class = self.__class__
+        if isinstance(response, FileResponse):
+            response.block_size = self.chunk_size
+
+        with self._lock:
+            self.handled += 1
+
+        if not response.streaming:
+            # Content is rendered, connections of this thread are done with
+            close_old_connections()
+
+        return response
+
+    def stream_response(self, response, send, loop):
+        """Sends a streaming response out from a thread as it's read"""
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        try:
+            send_message({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": self.get_response_headers(response),
+            })
+            for part in response:
+                for chunk, _ in self.chunk_bytes(part):
+                    send_message({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": True,
+                    })
+            send_message({"type": "http.response.body"})
+        finally:
+            response.close()
+
+    @staticmethod
+    def get_response_headers(response):
+        """Returns the ASGI headers of a response, cookies included"""
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode("ascii")
+            if isinstance(value, str):
+                value = value.encode("latin1")
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append((
+                b"Set-Cookie",
+                cookie.output(header="").encode("ascii").strip(),
+            ))
+
+        return headers
+
+    def as_dict(self):
+        """Returns the requests waiting for and running in threads"""
+        with self._lock:
+            return {
+                "threads": self.threads,
+                "running": self.running,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "handled": self.handled,
+            }
+
+
+def get_asgi_application():
+    """Returns the ASGI callable running views in a pool of threads"""
+    django.setup(set_prefix=False)
+
+    return ThreadPoolASGIHandler()
@@ -0,0 +1,69 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import (
+    Recipe,
+    RecipeImageRendition,
+    recipe_image_file_path,
+    recipe_rendition_file_path,
+)
+from core.storage import DIGEST_NAME_RE
+
+
+class Command(BaseCommand):
+    """Django command to delete stored images no object refers to."""
+    help = "Deletes content addressed recipe images that are unreferenced."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age", type=int, default=3600,
+            help="Seconds a file is kept for uploads still in progress.",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        """The actual logic for the command"""
+        deleted = 0
+        for field, directory in (
+            (Recipe._meta.get_field("image"),
+             os.path.dirname(recipe_image_file_path(None, "_"))),
+            (RecipeImageRendition._meta.get_field("file"),
+             os.path.dirname(recipe_rendition_file_path(None, "_"))),
+        ):
+            deleted += self.collect(field, directory, options)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} unreferenced files"
+        ))
+
+    def collect(self, field, directory, options):
+        """Deletes the files of directory not referenced by field"""
+        referenced = set(
+            field.model._default_manager.exclude(**{field.name: ""})
+            .values_list(field.name, flat=True).iterator()
+        )
+        storage = field.storage
+        root = storage.path(directory)
+        oldest = time.time() - options["min_age"]
+        deleted = 0
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, storage.location)
+                name = name.replace(os.sep, "/")
+                if (
+                    not DIGEST_NAME_RE.search(name)
+                    or name in referenced
+                    or os.path.getmtime(path) >= oldest
+                ):
+                    continue
+
+                if options["dry_run"] or storage.delete_if_idle(
+                    name, options["min_age"]
+                ):
+                    self.stdout.write(f"Deleting {name}")
+                    deleted += 1
+
+        return deleted
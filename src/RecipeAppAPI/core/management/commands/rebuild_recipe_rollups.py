@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.models import RecipeRollup
+
+
+class Command(BaseCommand):
+    """Django command to recompute the recipe rollups of users."""
+    help = "Rebuilds the recipe statistics rollups of all or given users."
+
+    def add_arguments(self, parser):
+        parser.add_argument("emails", nargs="*")
+
+    def handle(self, *args, **options):
+        """The actual logic for the command"""
+        users = get_user_model().objects.order_by("pk")
+        if options["emails"]:
+            users = users.filter(email__in=options["emails"])
+
+        rebuilt = 0
+        for user_id in users.values_list("pk", flat=True).iterator():
+            RecipeRollup.objects.rebuild(user_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the recipe rollups of {rebuilt} users"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Tag, Ingredient
+
+
+class Command(BaseCommand):
+    """Django command to fix drifted tag and ingredient recipe counts."""
+    help = "Recounts the recipes of tags and ingredients whose counts drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """The actual logic for the command"""
+        for model in (Tag, Ingredient):
+            drifted = model.objects.annotate(actual=Coalesce(
+                Subquery(model.objects.recipe_count_queryset()), 0
+            )).exclude(recipe_count=F("actual")).values_list("pk", flat=True)
+            pks = list(drifted)
+            for start in range(0, len(pks), options["batch_size"]):
+                model.objects.refresh_recipe_counts(
+                    pks[start:start + options["batch_size"]]
+                )
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Fixed the recipe counts of {len(pks)} "
+                f"{model._meta.verbose_name_plural}"
+            ))
@@ -0,0 +1,44 @@
+import threading
+
+
+_providers = {}
+
+
+def register(name, provider):
+    """Registers a callable returning the metrics dict of a component"""
+    _providers[name] = provider
+
+
+def collect():
+    """Returns the current metrics of all registered components"""
+    return {name: provider() for name, provider in _providers.items()}
+
+
+class HitMissCounter:
+    """Thread safe hit and miss counters of a cache"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        """Counts a cache hit"""
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        """Counts a cache miss"""
+        with self._lock:
+            self.misses += 1
+
+    def as_dict(self):
+        """Returns the counters and the hit ratio"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,66 @@
+from core.db.routers import replica_alias, replicas
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Methods of the requests whose reads may go to replicas
+REPLICA_METHODS = ("GET", "HEAD")
+
+
+def stick_credentials(request, credentials):
+    """
+    Makes the client of credentials, like a token issued by an unsafe
+    request, read its own writes once the request is answered
+    """
+    request = getattr(request, "_request", request)
+    # Unset when the middleware isn't installed
+    if hasattr(request, "sticky_credentials"):
+        request.sticky_credentials.append(credentials)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sends the reads of safe requests to views having replica_reads set to a
+    read replica, unless the client wrote within the sticky window so that
+    it reads its own writes. Clients are told apart by a digest of their
+    Authorization header, or of the credentials issued to them by an unsafe
+    request, see stick_credentials().
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        credentials = request.META.get("HTTP_AUTHORIZATION", "")
+        request.sticky_credentials = [credentials]
+        request.replica_reset = None
+        try:
+            response = self.get_response(request)
+        finally:
+            # Streamed content read after this point reads the primary
+            if request.replica_reset is not None:
+                replica_alias.reset(request.replica_reset)
+
+        if request.method not in SAFE_METHODS:
+            for credentials in request.sticky_credentials:
+                replicas.stick(credentials)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Picks the replica of safe requests to views reading replicas"""
+        view_class = getattr(view_func, "cls", None)
+        if not (
+            request.method in REPLICA_METHODS
+            and getattr(view_class, "replica_reads", False)
+            and replicas.aliases
+        ):
+            return None
+
+        if replicas.is_sticky(request.META.get("HTTP_AUTHORIZATION", "")):
+            return None
+
+        alias = replicas.choose()
+        if alias is not None:
+            request.replica_reset = replica_alias.set(alias)
+
+        return None
@@ -0,0 +1,24 @@
+# Generated by Django 3.0.2 on 2026-10-18 17:38
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_user_scoped_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='collection_modified',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='collection_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
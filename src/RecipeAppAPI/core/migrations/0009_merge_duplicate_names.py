@@ -0,0 +1,45 @@
+# Generated by Django 3.0.2 on 2026-10-18 17:43
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merges the tags and ingredients sharing a name for the same user"""
+    Recipe = apps.get_model("core", "Recipe")
+    for model_name, relation in (("Tag", "tags"), ("Ingredient", "ingredients")):
+        model = apps.get_model("core", model_name)
+        through = getattr(Recipe, relation).through
+        column = f"{model_name.lower()}_id"
+        duplicates = model.objects.values("user_id", "name").annotate(
+            keep_id=Min("id"), count=Count("id"),
+        ).filter(count__gt=1)
+
+        for duplicate in duplicates:
+            keep_id = duplicate["keep_id"]
+            drop_ids = list(model.objects.filter(
+                user_id=duplicate["user_id"], name=duplicate["name"],
+            ).exclude(id=keep_id).values_list("id", flat=True))
+            kept_recipe_ids = set(through.objects.filter(
+                **{column: keep_id}
+            ).values_list("recipe_id", flat=True))
+            moved_recipe_ids = set(through.objects.filter(
+                **{f"{column}__in": drop_ids}
+            ).values_list("recipe_id", flat=True)) - kept_recipe_ids
+
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{column: keep_id})
+                for recipe_id in moved_recipe_ids
+            ])
+            model.objects.filter(id__in=drop_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_userprofile_collection_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.0.2 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+def fill_search_documents(apps, schema_editor):
+    """Computes the search documents of the existing recipes"""
+    Recipe = apps.get_model("core", "Recipe")
+    names = {}
+    for relation, column in (("tags", "tag__name"),
+                             ("ingredients", "ingredient__name")):
+        through = getattr(Recipe, relation).through
+        for recipe_id, name in through.objects.values_list(
+            "recipe_id", column
+        ).iterator():
+            names.setdefault((recipe_id, column), []).append(name)
+
+    recipes = []
+    for pk, title in Recipe.objects.values_list("pk", "title").iterator():
+        recipes.append(Recipe(pk=pk, search_document=" ".join([
+            title,
+            *sorted(names.get((pk, "tag__name"), ())),
+            *sorted(names.get((pk, "ingredient__name"), ())),
+        ])))
+        if len(recipes) == 1000:
+            Recipe.objects.bulk_update(recipes, ["search_document"])
+            recipes = []
+    Recipe.objects.bulk_update(recipes, ["search_document"])
+
+
+def create_search_index(apps, schema_editor):
+    """Creates the full text GIN index of search documents on Postgres"""
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX recipe_search_document_gin ON core_recipe "
+            "USING GIN (to_tsvector('english'::regconfig, search_document))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    """Drops the full text GIN index of search documents on Postgres"""
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX recipe_search_document_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_document',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.0.2 on 2026-10-18 17:58
+
+from django.db import migrations
+
+
+TABLES = ("core_tag", "core_ingredient")
+
+
+def create_prefix_indexes(apps, schema_editor):
+    """
+    Creates the case insensitive name prefix indexes on Postgres, built
+    concurrently to not block writes to the tables
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        for table in TABLES:
+            schema_editor.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                f"{table}_name_prefix_idx ON {table} "
+                '(user_id, (UPPER(name) COLLATE "C"), id)'
+            )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    """Drops the case insensitive name prefix indexes on Postgres"""
+    if schema_editor.connection.vendor == "postgresql":
+        for table in TABLES:
+            schema_editor.execute(
+                f"DROP INDEX CONCURRENTLY IF EXISTS {table}_name_prefix_idx"
+            )
+
+
+class Migration(migrations.Migration):
+    # Postgres can't create indexes concurrently inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_recipe_search_document'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
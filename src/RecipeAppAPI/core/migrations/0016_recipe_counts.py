@@ -0,0 +1,46 @@
+# Generated by Django 3.0.2 on 2026-10-18 18:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_recipes(apps, schema_editor):
+    """Counts the recipes of the existing tags and ingredients"""
+    Recipe = apps.get_model("core", "Recipe")
+    for model_name, relation in (("Tag", "tags"), ("Ingredient", "ingredients")):
+        model = apps.get_model("core", model_name)
+        column = f"{model_name.lower()}_id"
+        counts = getattr(Recipe, relation).through.objects.filter(
+            **{column: OuterRef("pk")}
+        ).order_by().values(column).annotate(count=Count("*")).values("count")
+        model.objects.update(recipe_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'recipe_count'], name='ingredient_usage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count'], name='tag_usage_idx'),
+        ),
+    ]
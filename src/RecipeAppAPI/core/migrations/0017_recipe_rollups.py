@@ -0,0 +1,73 @@
+# Generated by Django 3.0.2 on 2026-10-18 18:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import Counter
+from decimal import Decimal
+
+
+def fill_rollups(apps, schema_editor):
+    """Rolls up the existing recipes of every user"""
+    Recipe = apps.get_model("core", "Recipe")
+    RecipeRollup = apps.get_model("core", "RecipeRollup")
+    RecipeRollupBucket = apps.get_model("core", "RecipeRollupBucket")
+    scales = {"price": 100, "time_minutes": 1}
+    widths = {
+        field: int(Decimal(str(settings.RECIPES_STATS_BUCKETS[field])) * scale)
+        for field, scale in scales.items()
+    }
+    rollups = {}
+    buckets = Counter()
+    for user_id, price, time_minutes in Recipe.objects.values_list(
+        "user_id", "price", "time_minutes"
+    ).iterator():
+        rollup = rollups.setdefault(user_id, RecipeRollup(user_id=user_id))
+        rollup.recipe_count += 1
+        rollup.price_total += price
+        rollup.time_minutes_total += time_minutes
+        for field, value in (("price", price), ("time_minutes", time_minutes)):
+            units = int(Decimal(str(value)) * scales[field])
+            buckets[user_id, field, units // widths[field]] += 1
+
+    RecipeRollup.objects.bulk_create(rollups.values())
+    RecipeRollupBucket.objects.bulk_create([
+        RecipeRollupBucket(
+            user_id=user_id, field=field, bucket=bucket, recipe_count=count,
+        )
+        for (user_id, field, bucket), count in buckets.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_recipe_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRollup',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_rollup', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('time_minutes_total', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeRollupBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=20)),
+                ('bucket', models.IntegerField()),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_rollup_buckets', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='reciperollupbucket',
+            constraint=models.UniqueConstraint(fields=('user', 'field', 'bucket'), name='unique_rollup_bucket'),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.0.2 on 2026-10-18 18:08
+
+from django.db import migrations, models
+
+from core.db.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Postgres can't create indexes concurrently inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0017_recipe_rollups'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'price', 'id'], name='recipe_user_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'time_minutes', 'id'], name='recipe_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.2 on 2026-10-18 18:40
+
+from django.db import migrations
+
+from core.db.operations import AddThroughIndex
+
+
+class Migration(migrations.Migration):
+    # Postgres can't create indexes concurrently inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0019_recipe_imports'),
+    ]
+
+    operations = [
+        AddThroughIndex(
+            model_name='recipe',
+            field_name='tags',
+            name='recipe_tags_reverse_idx',
+            columns=['tag_id', 'recipe_id'],
+        ),
+        AddThroughIndex(
+            model_name='recipe',
+            field_name='ingredients',
+            name='recipe_ingredients_reverse_idx',
+            columns=['ingredient_id', 'recipe_id'],
+        ),
+    ]
@@ -1,24 +1,78 @@
 import os
 import uuid
+from collections import defaultdict
+from decimal import Decimal
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 from django.conf import settings
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce, Floor, Round
+from django.utils import timezone
 
+from core.storage import ContentAddressedStorage
+
+
+content_addressed_storage = ContentAddressedStorage()
 
-def recipe_image_file_path(instance, filename):
-    """Returns the appropriate location to save Recipe image"""
-    ext = os.path.splitext(filename)[1]
-    filename = f"{uuid.uuid4()}{ext}"
 
+def recipe_image_file_path(instance, filename):
+    """
+    Returns the appropriate location to save Recipe image, the storage names
+    the file by the digest of its content
+    """
     return os.path.join("uploads/recipe/images", filename)
 
 
-class UserProfileManager(BaseUserManager):
+def recipe_rendition_file_path(instance, filename):
+    """Returns the appropriate location to save Recipe image renditions"""
+    return os.path.join("uploads/recipe/renditions", filename)
+
+
+def upload_temp_path(filename):
+    """Returns the absolute path to write an upload in progress to"""
+    directory = os.path.join(settings.MEDIA_ROOT, "uploads/tmp")
+    os.makedirs(directory, exist_ok=True)
+
+    return os.path.join(directory, filename)
+
+
+class UserProfileQuerySet(models.QuerySet):
+    # Fields updated on every collection write, unused by authentication
+    BOOKKEEPING_FIELDS = {"collection_version", "collection_modified"}
+
+    def update(self, **kwargs):
+        """
+        Updates the users, dropping their cached authentication tokens
+        since updates skip the signals doing so on save
+        """
+        if set(kwargs) <= self.BOOKKEEPING_FIELDS:
+            return super().update(**kwargs)
+
+        from core.authentication import token_cache
+        pks = list(self.values_list("pk", flat=True))
+        rows = super().update(**kwargs)
+        token_cache.evict_users(pks)
+
+        return rows
+
+
+class UserProfileManager(BaseUserManager.from_queryset(UserProfileQuerySet)):
     """Model manager for UserProfile model."""
     def create_user(self, email, password=None, **extra_fields):
         """Creates and saves a new user"""
@@ -40,6 +94,255 @@ class UserProfileManager(BaseUserManager):
 
         return user
 
+    def touch_collection(self, user_id):
+        """Marks the recipes, tags and ingredients of a user as changed"""
+        self.filter(pk=user_id).update(
+            collection_version=F("collection_version") + 1,
+            collection_modified=timezone.now(),
+        )
+
+
+class NamedObjectManager(models.Manager):
+    """Model manager for models having a name unique per user."""
+    def get_or_create_by_names(self, user_id, names):
+        """
+        Returns the user's objects having names by name, bulk creating the
+        missing ones. Safe against concurrent writers thanks to the unique
+        name per user constraint.
+        """
+        names = set(names)
+        objs = {
+            obj.name: obj
+            for obj in self.filter(user_id=user_id, name__in=names)
+        }
+        missing = names - set(objs)
+        if missing:
+            self.bulk_create(
+                [self.model(user_id=user_id, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            objs.update(
+                (obj.name, obj)
+                for obj in self.filter(user_id=user_id, name__in=missing)
+            )
+
+        return objs
+
+    def recipe_count_queryset(self):
+        """Returns the actual recipe count of objects, for subqueries"""
+        column = f"{self.model._meta.model_name}_id"
+        through = self.model.recipe_set.through
+
+        return through.objects.filter(**{column: OuterRef("pk")}).order_by(
+        ).values(column).annotate(count=Count("*")).values("count")
+
+    def add_recipe_count(self, pks, delta):
+        """Adds delta to the recipe counts of the objects of pks"""
+        if pks:
+            self.filter(pk__in=pks).update(
+                recipe_count=F("recipe_count") + delta
+            )
+
+    def count_created_recipes(self, recipe_pks):
+        """
+        Adds the just created recipes of recipe_pks to the recipe counts of
+        their objects, in a query per distinct count added
+        """
+        column = f"{self.model._meta.model_name}_id"
+        through = self.model.recipe_set.through
+        pks_by_count = defaultdict(list)
+        for pk, count in through.objects.filter(
+            recipe_id__in=recipe_pks
+        ).order_by().values_list(column).annotate(count=Count("*")):
+            pks_by_count[count].append(pk)
+
+        for count, pks in pks_by_count.items():
+            self.add_recipe_count(pks, count)
+
+    def refresh_recipe_counts(self, pks):
+        """Recounts the recipes of the objects of pks"""
+        if pks:
+            self.filter(pk__in=pks).update(recipe_count=Coalesce(
+                Subquery(self.recipe_count_queryset()), 0
+            ))
+
+
+class RecipeManager(models.Manager):
+    """Model manager for Recipe model."""
+    # Recipes whose search documents are refreshed per batch of queries
+    search_batch_size = 500
+
+    @staticmethod
+    def build_search_document(title, tag_names, ingredient_names):
+        """Returns the text recipes are searched by"""
+        return " ".join([title, *sorted(tag_names), *sorted(ingredient_names)])
+
+    def refresh_search_documents(self, recipe_ids):
+        """
+        Recomputes the search documents of recipe_ids from their titles, tag
+        names and ingredient names, with a few queries per batch of recipes
+        """
+        recipe_ids = sorted(set(recipe_ids))
+        for start in range(0, len(recipe_ids), self.search_batch_size):
+            batch = recipe_ids[start:start + self.search_batch_size]
+            names = {}
+            for relation, column in (
+                (self.model.tags.through, "tag__name"),
+                (self.model.ingredients.through, "ingredient__name"),
+            ):
+                for recipe_id, name in relation.objects.filter(
+                    recipe_id__in=batch
+                ).values_list("recipe_id", column):
+                    names.setdefault((recipe_id, column), []).append(name)
+
+            recipes = [
+                self.model(pk=pk, search_document=self.build_search_document(
+                    title,
+                    names.get((pk, "tag__name"), ()),
+                    names.get((pk, "ingredient__name"), ()),
+                ))
+                for pk, title in self.filter(pk__in=batch).values_list(
+                    "pk", "title"
+                )
+            ]
+            self.bulk_update(recipes, ["search_document"])
+
+
+class RecipeRollupManager(models.Manager):
+    """Model manager for RecipeRollup model."""
+    # Recipe fields whose distributions are rolled up into buckets
+    bucket_fields = ("price", "time_minutes")
+
+    @staticmethod
+    def bucket_scale(field):
+        """Returns the factor turning values of a recipe field into units"""
+        field = Recipe._meta.get_field(field)
+        return 10 ** (getattr(field, "decimal_places", None) or 0)
+
+    def bucket_width(self, field):
+        """Returns the bucket width of a recipe field, in units"""
+        width = Decimal(str(settings.RECIPES_STATS_BUCKETS[field]))
+        return int(width * self.bucket_scale(field))
+
+    def bucket_of(self, field, value):
+        """Returns the bucket of a recipe field value"""
+        units = int(Decimal(str(value)) * self.bucket_scale(field))
+        return units // self.bucket_width(field)
+
+    def bucket_expression(self, field):
+        """Returns the bucket of a recipe field, computed by the database"""
+        scale = self.bucket_scale(field)
+        units = F(field)
+        if scale != 1:
+            units = Cast(Round(ExpressionWrapper(
+                units * Value(scale), output_field=DecimalField()
+            )), IntegerField())
+
+        # Floored like bucket_of(), integer division truncating toward zero
+        # would bucket negative values apart from it
+        return Cast(Floor(ExpressionWrapper(
+            Cast(units, FloatField()) / Value(self.bucket_width(field)),
+            output_field=FloatField(),
+        )), IntegerField())
+
+    def add_recipe(self, user_id, values, delta):
+        """
+        Adds delta recipes having values by field to a user's rollup. A
+        missing rollup is rebuilt from the user's recipes instead.
+        """
+        updated = self.filter(user_id=user_id).update(
+            recipe_count=F("recipe_count") + delta,
+            price_total=F("price_total") + delta * Decimal(
+                str(values["price"])
+            ),
+            time_minutes_total=(
+                F("time_minutes_total") + delta * values["time_minutes"]
+            ),
+        )
+        if not updated:
+            if delta > 0:
+                self.rebuild(user_id)
+            return
+
+        for field in self.bucket_fields:
+            self.add_to_bucket(
+                user_id, field, self.bucket_of(field, values[field]), delta
+            )
+
+    def add_recipes(self, user_id, recipes):
+        """
+        Adds the just created recipes of a queryset to a user's rollup, in
+        a query per bucket they fall in rather than rebuilding the rollup
+        from all the user's recipes. A missing rollup is rebuilt instead.
+        """
+        recipes = recipes.order_by()
+        totals = self.aggregate_totals(recipes)
+        if not totals["recipe_count"]:
+            return
+
+        updated = self.filter(user_id=user_id).update(**{
+            name: F(name) + (value or 0) for name, value in totals.items()
+        })
+        if not updated:
+            self.rebuild(user_id)
+            return
+
+        for field in self.bucket_fields:
+            for row in recipes.values(
+                bucket=self.bucket_expression(field)
+            ).annotate(recipe_count=Count("pk")):
+                self.add_to_bucket(
+                    user_id, field, row["bucket"], row["recipe_count"]
+                )
+
+    def add_to_bucket(self, user_id, field, bucket, delta):
+        """Adds delta recipes to a bucket of a user's rollup"""
+        lookup = {"user_id": user_id, "field": field, "bucket": bucket}
+        buckets = RecipeRollupBucket.objects.filter(**lookup)
+        if buckets.update(recipe_count=F("recipe_count") + delta):
+            return
+        if delta > 0:
+            try:
+                with transaction.atomic():
+                    buckets.create(recipe_count=delta, **lookup)
+            except IntegrityError:
+                buckets.update(recipe_count=F("recipe_count") + delta)
+
+    @staticmethod
+    def aggregate_totals(recipes):
+        """Returns the rolled up totals of a queryset of recipes"""
+        return recipes.aggregate(
+            recipe_count=Count("pk"),
+            price_total=Sum("price", output_field=DecimalField(
+                max_digits=14, decimal_places=2,
+            )),
+            time_minutes_total=Sum("time_minutes"),
+        )
+
+    def rebuild(self, user_id):
+        """Recomputes a user's rollup from their recipes"""
+        recipes = Recipe.objects.filter(user_id=user_id).order_by()
+        totals = self.aggregate_totals(recipes)
+        buckets = [
+            RecipeRollupBucket(
+                user_id=user_id,
+                field=field,
+                bucket=row["bucket"],
+                recipe_count=row["recipe_count"],
+            )
+            for field in self.bucket_fields
+            for row in recipes.values(
+                bucket=self.bucket_expression(field)
+            ).annotate(recipe_count=Count("pk"))
+        ]
+
+        with transaction.atomic():
+            self.update_or_create(user_id=user_id, defaults={
+                name: value or 0 for name, value in totals.items()
+            })
+            RecipeRollupBucket.objects.filter(user_id=user_id).delete()
+            RecipeRollupBucket.objects.bulk_create(buckets)
+
 
 class UserProfile(AbstractBaseUser, PermissionsMixin):
     """Custom user model."""
@@ -48,6 +351,9 @@ class UserProfile(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
+    # Bumped on every change to the user's recipes, tags or ingredients
+    collection_version = models.BigIntegerField(default=0)
+    collection_modified = models.DateTimeField(default=timezone.now)
 
     objects = UserProfileManager()
 
@@ -66,6 +372,25 @@ class Tag(models.Model):
     )
     name = models.CharField(max_length=255)
 
+    # Number of recipes using the object, maintained by core.signals
+    recipe_count = models.IntegerField(default=0)
+
+    objects = NamedObjectManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"],
+                name="unique_tag_name_per_user",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "recipe_count"],
+                name="tag_usage_idx",
+            ),
+        ]
+
     def __str__(self):
         """Returns a string representation for model object"""
         return self.name
@@ -78,6 +403,25 @@ class Ingredient(models.Model):
     )
     name = models.CharField(max_length=255)
 
+    # Number of recipes using the object, maintained by core.signals
+    recipe_count = models.IntegerField(default=0)
+
+    objects = NamedObjectManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"],
+                name="unique_ingredient_name_per_user",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "recipe_count"],
+                name="ingredient_usage_idx",
+            ),
+        ]
+
     def __str__(self):
         """Returns a string representation of model object"""
         return self.name
@@ -85,6 +429,15 @@ class Ingredient(models.Model):
 
 class Recipe(models.Model):
     """Represents a recipe object"""
+    IMAGE_PENDING = "pending"
+    IMAGE_READY = "ready"
+    IMAGE_FAILED = "failed"
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, "Pending"),
+        (IMAGE_READY, "Ready"),
+        (IMAGE_FAILED, "Failed"),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -95,8 +448,174 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField(Ingredient)
     tags = models.ManyToManyField(Tag)
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=content_addressed_storage,
+    )
+    image_status = models.CharField(
+        max_length=10,
+        blank=True,
+        choices=IMAGE_STATUS_CHOICES,
+    )
+    # Title, tag names and ingredient names, maintained by core.signals
+    search_document = models.TextField(blank=True, default="")
+
+    objects = RecipeManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"], name="recipe_user_id_idx"),
+            models.Index(
+                fields=["user", "price", "id"],
+                name="recipe_user_price_idx",
+            ),
+            models.Index(
+                fields=["user", "time_minutes", "id"],
+                name="recipe_user_time_idx",
+            ),
+        ]
 
     def __str__(self):
         """Returns string representation for model object"""
         return self.title
+
+
+class RecipeRollup(models.Model):
+    """Aggregates of a user's recipes, maintained by core.signals"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="recipe_rollup",
+    )
+    recipe_count = models.IntegerField(default=0)
+    price_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    time_minutes_total = models.BigIntegerField(default=0)
+
+    objects = RecipeRollupManager()
+
+    def __str__(self):
+        """Returns string representation for model object"""
+        return f"{self.user_id} {self.recipe_count}"
+
+
+class RecipeRollupBucket(models.Model):
+    """Number of a user's recipes whose field value falls in a bucket"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="recipe_rollup_buckets",
+    )
+    field = models.CharField(max_length=20)
+    # Index of the bucket, its values start at bucket times the width
+    bucket = models.IntegerField()
+    recipe_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "field", "bucket"],
+                name="unique_rollup_bucket",
+            ),
+        ]
+
+    def __str__(self):
+        """Returns string representation for model object"""
+        return f"{self.user_id} {self.field} {self.bucket}"
+
+
+class RecipeImageRendition(models.Model):
+    """Resized copy of a Recipe image in a given format"""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="image_renditions",
+    )
+    name = models.CharField(max_length=50)
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.FileField(
+        upload_to=recipe_rendition_file_path,
+        storage=content_addressed_storage,
+    )
+
+    def __str__(self):
+        """Returns string representation for model object"""
+        return f"{self.recipe_id} {self.name} {self.format}"
+
+
+class RecipeImageUpload(models.Model):
+    """Resumable upload of a Recipe image received in chunks"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="image_uploads",
+    )
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    image_format = models.CharField(max_length=10, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def path(self):
+        """Returns the absolute path of the received bytes"""
+        return upload_temp_path(f"{self.pk}.part")
+
+    def __str__(self):
+        """Returns string representation for model object"""
+        return f"{self.recipe_id} {self.name}"
+
+
+class RecipeImport(models.Model):
+    """Import of a file of recipes into a user's library, in batches"""
+    FORMAT_NDJSON = "ndjson"
+    FORMAT_CSV = "csv"
+    FORMAT_CHOICES = (
+        (FORMAT_NDJSON, "NDJSON"),
+        (FORMAT_CSV, "CSV"),
+    )
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="recipe_imports",
+    )
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    # Records read by committed batches, an import resumes after them
+    records_done = models.BigIntegerField(default=0)
+    recipes_created = models.BigIntegerField(default=0)
+    records_rejected = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    @property
+    def path(self):
+        """Returns the absolute path of the file being imported"""
+        return upload_temp_path(f"{self.pk}.import")
+
+    def __str__(self):
+        """Returns string representation for model object"""
+        return f"{self.user_id} {self.format} {self.status}"
@@ -0,0 +1,179 @@
+import csv
+import io
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer encoding with orjson when it is installed, falling back
+    to the standard library otherwise or when indenting is requested.
+
+    Renders the same bytes as JSONRenderer: types orjson doesn't encode the
+    same way, like Decimal, datetimes or lazy strings, are encoded by DRF's
+    encoder.
+    """
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Renders data into JSON, returning a bytestring"""
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b""
+
+        ret = orjson.dumps(
+            data,
+            default=self.encoder.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+
+        # Like JSONRenderer, output JSON that is a strict javascript subset
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+    def stream(self, chunks, renderer_context=None):
+        """
+        Yields a JSON array of the items of chunks, rendering a list of
+        items at a time so that the whole array is never held in memory.
+
+        With the rows layout of the renderer context, yields an object of
+        the field names and an array of the values of each item instead.
+        """
+        context = renderer_context or {}
+        if context.get("layout") != "rows":
+            yield from self.stream_array(chunks, renderer_context)
+            return
+
+        fields = context["fields"]
+        yield b'{"fields":' + self.render(
+            fields, renderer_context=renderer_context
+        ) + b',"rows":'
+        yield from self.stream_array((
+            [[item[name] for name in fields] for item in chunk]
+            for chunk in chunks
+        ), renderer_context)
+        yield b"}"
+
+    def stream_array(self, chunks, renderer_context=None):
+        """Yields a JSON array of the items of chunks a chunk at a time"""
+        yield b"["
+        separator = b""
+        for chunk in chunks:
+            if chunk:
+                yield separator + self.render(
+                    chunk, renderer_context=renderer_context
+                )[1:-1]
+                separator = b","
+        yield b"]"
+
+
+class NDJSONRenderer(ORJSONRenderer):
+    """Renderer of newline delimited JSON, one line per listed item"""
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Renders each item of a list, or data itself, as a JSON line"""
+        if data is None:
+            return b""
+
+        items = data if isinstance(data, list) else [data]
+        render = super().render
+
+        # The JSON renderer renders None as an empty body rather than null
+        return b"".join(
+            (b"null" if item is None else render(item)) + b"\n"
+            for item in items
+        )
+
+    def stream(self, chunks, renderer_context=None):
+        """
+        Yields the JSON lines of the items of chunks a chunk at a time.
+
+        With the rows layout of the renderer context, the first line holds
+        the field names and each following line the values of an item.
+        """
+        context = renderer_context or {}
+        if context.get("layout") == "rows":
+            fields = context["fields"]
+            yield self.render([fields], renderer_context=renderer_context)
+            chunks = (
+                [[item[name] for name in fields] for item in chunk]
+                for chunk in chunks
+            )
+
+        for chunk in chunks:
+            if chunk:
+                yield self.render(chunk, renderer_context=renderer_context)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renderer of comma separated values, one row per listed dict under a
+    header row of their keys. List values are joined by semicolons.
+    """
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+    list_separator = "; "
+
+    def write(self, rows, fields, header=False):
+        """Returns rows written as CSV, under a header row if asked to"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(fields)
+        for row in rows:
+            writer.writerow([
+                self.list_separator.join(map(str, value))
+                if isinstance(value, list) else value
+                for value in (row.get(name) for name in fields)
+            ])
+
+        return buffer.getvalue().encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Renders a list of dicts, or a single dict, as CSV"""
+        if data is None:
+            return b""
+
+        rows = data if isinstance(data, list) else [data]
+        fields = (renderer_context or {}).get("fields")
+        if fields is None:
+            fields = list(rows[0]) if rows else []
+
+        return self.write(rows, fields, header=True)
+
+    def stream(self, chunks, renderer_context=None):
+        """
+        Yields the CSV rows of the dicts of chunks a chunk at a time, under
+        a header row of the fields of the renderer context, or else of the
+        keys of the first dict
+        """
+        fields = (renderer_context or {}).get("fields")
+        if fields is not None:
+            yield self.write([], fields, header=True)
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+
+            if fields is None:
+                fields = list(chunk[0])
+                yield self.write(chunk, fields, header=True)
+            else:
+                yield self.write(chunk, fields)
@@ -0,0 +1,343 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    post_init,
+    pre_save,
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver, Signal
+
+from rest_framework.authtoken.models import Token
+
+from core import storage
+from core.authentication import token_cache
+from core.models import (
+    Tag,
+    Ingredient,
+    Recipe,
+    RecipeImageRendition,
+    RecipeImageUpload,
+    RecipeImport,
+    RecipeRollup,
+    UserProfile,
+)
+
+
+# Sent with the owner user_id, the written pks and the related_pks of the
+# changed relations by field name, by code writing many objects at once
+# without the per-object model signals. created is set when all the pks
+# are of objects just created, whose relations are all new.
+bulk_changed = Signal()
+
+
+# Search documents are refreshed by receivers connected before the ones
+# bumping collection versions, so that search indexes built for a version
+# never hold outdated documents.
+
+def related_recipe_ids(model, pks):
+    """Returns the ids of the recipes related to objects of model"""
+    field = "tags" if model is Tag else "ingredients"
+    return Recipe.objects.filter(**{f"{field}__in": pks}).values_list(
+        "pk", flat=True
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+def fill_new_recipe_search_document(sender, instance, **kwargs):
+    """Sets the search document of a new recipe, having no relations yet"""
+    if instance._state.adding:
+        instance.search_document = Recipe.objects.build_search_document(
+            instance.title, (), ()
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_recipe_search_document(sender, instance, created, update_fields,
+                                   **kwargs):
+    """Refreshes the search document of a changed recipe"""
+    if created or (update_fields and "title" not in update_fields):
+        return
+
+    Recipe.objects.refresh_search_documents([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_related_search_documents(sender, instance, action, reverse,
+                                     pk_set, **kwargs):
+    """Refreshes the search documents of recipes whose relations changed"""
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == "pre_clear":
+        instance._cleared_recipe_ids = list(
+            related_recipe_ids(type(instance), [instance.pk])
+        )
+        return
+    elif action == "post_clear":
+        recipe_ids = instance._cleared_recipe_ids
+    else:
+        recipe_ids = pk_set
+
+    if action in ("post_add", "post_remove", "post_clear"):
+        Recipe.objects.refresh_search_documents(recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def refresh_renamed_search_documents(sender, instance, created, **kwargs):
+    """Refreshes the search documents of recipes of a renamed object"""
+    if not created:
+        Recipe.objects.refresh_search_documents(
+            related_recipe_ids(sender, [instance.pk])
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_related_recipes(sender, instance, **kwargs):
+    """Remembers the recipes of an object before its relations go"""
+    instance._related_recipe_ids = list(
+        related_recipe_ids(sender, [instance.pk])
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_deleted_search_documents(sender, instance, **kwargs):
+    """Refreshes the search documents of recipes of a deleted object"""
+    Recipe.objects.refresh_search_documents(instance._related_recipe_ids)
+
+
+@receiver(bulk_changed)
+def refresh_bulk_search_documents(sender, pks, **kwargs):
+    """Refreshes the search documents of bulk written objects"""
+    if sender is Recipe:
+        Recipe.objects.refresh_search_documents(pks)
+    elif sender in (Tag, Ingredient):
+        Recipe.objects.refresh_search_documents(
+            related_recipe_ids(sender, pks)
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_relation_changes(sender, instance, action, reverse, model, pk_set,
+                           **kwargs):
+    """Keeps the recipe counts of tags and ingredients in step"""
+    named_model = type(instance) if reverse else model
+    named_column = f"{named_model._meta.model_name}_id"
+    source, target = (
+        (named_column, "recipe_id") if reverse else ("recipe_id", named_column)
+    )
+
+    if action in ("pre_remove", "pre_clear"):
+        # Only the existing rows are removed, whatever pk_set holds
+        rows = sender.objects.filter(**{source: instance.pk})
+        if pk_set is not None:
+            rows = rows.filter(**{f"{target}__in": pk_set})
+        instance._removed_relations = list(
+            rows.values_list(target, flat=True)
+        )
+        return
+
+    if action == "post_add":
+        changed, delta = pk_set, 1
+    elif action in ("post_remove", "post_clear"):
+        changed, delta = instance._removed_relations, -1
+    else:
+        return
+
+    if reverse:
+        named_model.objects.add_recipe_count(
+            [instance.pk], delta * len(changed)
+        )
+    else:
+        named_model.objects.add_recipe_count(changed, delta)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_recipe_relations(sender, instance, **kwargs):
+    """Remembers the tags and ingredients of a recipe before it goes"""
+    instance._related_pks = {
+        named_model: list(
+            getattr(instance, relation).values_list("pk", flat=True)
+        )
+        for named_model, relation in (
+            (Tag, "tags"), (Ingredient, "ingredients")
+        )
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    """Stops counting a deleted recipe for its tags and ingredients"""
+    for named_model, pks in instance._related_pks.items():
+        named_model.objects.add_recipe_count(pks, -1)
+
+
+@receiver(bulk_changed, sender=Recipe)
+def recount_bulk_relations(sender, pks, related_pks, created=False,
+                           **kwargs):
+    """
+    Recounts the recipes of the objects of bulk written relations, or only
+    adds created recipes to their counts
+    """
+    for named_model, relation in ((Tag, "tags"), (Ingredient, "ingredients")):
+        if created:
+            named_model.objects.count_created_recipes(pks)
+        else:
+            named_model.objects.refresh_recipe_counts(
+                related_pks.get(relation)
+            )
+
+
+def rolled_up_values(instance):
+    """Returns the rolled up field values of a recipe, None if deferred"""
+    values = {
+        field: instance.__dict__.get(field)
+        for field in RecipeRollup.objects.bucket_fields
+    }
+    if None in values.values():
+        return None
+
+    return values
+
+
+@receiver(post_init, sender=Recipe)
+def remember_rolled_up_values(sender, instance, **kwargs):
+    """Remembers the rolled up values to take them back once changed"""
+    instance._rolled_up_values = rolled_up_values(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def roll_up_saved_recipe(sender, instance, created, **kwargs):
+    """Updates the owner's recipe rollup with a new or changed recipe"""
+    old_values = instance._rolled_up_values
+    values = rolled_up_values(instance)
+    instance._rolled_up_values = values
+
+    if created:
+        RecipeRollup.objects.add_recipe(instance.user_id, values, 1)
+    elif old_values is None:
+        # Deferred values set since loading can't be taken back
+        if any(
+            field in instance.__dict__
+            for field in RecipeRollup.objects.bucket_fields
+        ):
+            RecipeRollup.objects.rebuild(instance.user_id)
+    elif values != old_values:
+        RecipeRollup.objects.add_recipe(instance.user_id, old_values, -1)
+        RecipeRollup.objects.add_recipe(instance.user_id, values, 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def roll_up_deleted_recipe(sender, instance, **kwargs):
+    """Takes a deleted recipe out of the owner's recipe rollup"""
+    values = instance._rolled_up_values
+    if values is not None:
+        RecipeRollup.objects.add_recipe(instance.user_id, values, -1)
+    else:
+        RecipeRollup.objects.rebuild(instance.user_id)
+
+
+@receiver(bulk_changed, sender=Recipe)
+def roll_up_bulk_recipes(sender, user_id, pks, created=False, **kwargs):
+    """
+    Rebuilds the recipe rollup of the owner of bulk written recipes, or
+    only adds created recipes to it
+    """
+    if created:
+        RecipeRollup.objects.add_recipes(
+            user_id, Recipe.objects.filter(pk__in=pks)
+        )
+    else:
+        RecipeRollup.objects.rebuild(user_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def touch_owner_collection(sender, instance, **kwargs):
+    """Bumps the collection version of the changed object owner"""
+    get_user_model().objects.touch_collection(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_relation_owner_collection(sender, instance, action, **kwargs):
+    """Bumps the collection version when recipe relations change"""
+    if action in ("post_add", "post_remove", "post_clear"):
+        get_user_model().objects.touch_collection(instance.user_id)
+
+
+@receiver(bulk_changed)
+def touch_bulk_owner_collection(sender, user_id, **kwargs):
+    """Bumps the collection version of the owner of bulk written objects"""
+    get_user_model().objects.touch_collection(user_id)
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """Stops authenticating with a deleted token from the cache"""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=UserProfile)
+def evict_user_tokens(sender, instance, created, **kwargs):
+    """Drops the cached copies of a changed, maybe deactivated, user"""
+    if not created:
+        token_cache.evict_users([instance.pk])
+
+
+@receiver(post_delete, sender=RecipeImageRendition)
+def release_rendition_file(sender, instance, **kwargs):
+    """Deletes the file of a deleted rendition unless others share it"""
+    storage.release(sender._meta.get_field("file"), instance.file.name)
+
+
+def loaded_image_name(instance):
+    """Returns the recipe image name unless the field is deferred"""
+    value = instance.__dict__.get("image")
+    return getattr(value, "name", value)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_recipe_image(sender, instance, **kwargs):
+    """Remembers the stored image to release it once replaced"""
+    instance._stored_image = loaded_image_name(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_recipe_image(sender, instance, **kwargs):
+    """Deletes a replaced recipe image unless other recipes share it"""
+    image = loaded_image_name(instance)
+    if instance._stored_image and instance._stored_image != image:
+        storage.release(
+            sender._meta.get_field("image"), instance._stored_image
+        )
+    instance._stored_image = image
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image(sender, instance, **kwargs):
+    """Deletes the image of a deleted recipe unless other recipes share it"""
+    storage.release(
+        sender._meta.get_field("image"), loaded_image_name(instance)
+    )
+
+
+@receiver(post_delete, sender=RecipeImageUpload)
+@receiver(post_delete, sender=RecipeImport)
+def delete_upload_part(sender, instance, **kwargs):
+    """Removes the bytes received by a deleted upload or import"""
+    try:
+        os.remove(instance.path)
+    except FileNotFoundError:
+        pass
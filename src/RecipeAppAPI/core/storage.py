@@ -0,0 +1,120 @@
+import hashlib
+import os
+import re
+import time
+import uuid
+from functools import partial
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+# Matches the names of files stored by ContentAddressedStorage
+DIGEST_NAME_RE = re.compile(r"(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$")
+
+
+class BlobExists(Exception):
+    """Raised when a blob of the same content is already stored"""
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming files by the SHA-256 digest of their content.
+
+    Identical files are stored once, whatever their original names, and a
+    stored file never changes so it can be cached forever. Files may be
+    shared by many objects, they are deleted with release().
+
+    Saving content already stored refreshes the modification time of its
+    file, which keeps it from being deleted by delete_if_idle() while the
+    object referring to it is being saved.
+    """
+    def save(self, name, content, max_length=None):
+        """
+        Stores content under its digest in the directory of name, unless a
+        file of the same content is already stored. Returns the stored name.
+        """
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        digest = getattr(content, "digest", None) or self.digest(content)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, digest[:2], f"{digest}{extension}")
+
+        if not self.touch(name):
+            try:
+                name = self._save(name, content)
+            except BlobExists:
+                pass
+
+        return name.replace("\\", "/")
+
+    def touch(self, name):
+        """Refreshes the modification time of a file, False if it's missing"""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def delete_if_idle(self, name, min_age):
+        """
+        Deletes a file unless it was saved within min_age seconds, returns
+        whether it was deleted.
+
+        The file is moved aside before its age is checked. A save reusing it
+        either refreshed its modification time before, which moves it back,
+        or finds it missing afterwards and writes it again.
+        """
+        path = self.path(name)
+        aside = f"{path}.{uuid.uuid4().hex}.deleting"
+        try:
+            os.rename(path, aside)
+        except FileNotFoundError:
+            return False
+
+        if os.path.getmtime(aside) > time.time() - min_age:
+            os.rename(aside, path)
+            return False
+
+        os.remove(aside)
+        return True
+
+    def get_available_name(self, name, max_length=None):
+        """Refuses renaming, a file of the same name has the same content"""
+        raise BlobExists(name)
+
+    @staticmethod
+    def digest(content):
+        """Returns the hex SHA-256 digest of content, read in chunks"""
+        hasher = hashlib.sha256()
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        content.seek(0)
+
+        return hasher.hexdigest()
+
+
+def release(field, name):
+    """
+    Deletes a stored file once the current transaction commits, if no
+    object of the field's model refers to it anymore by then. Files saved
+    within MEDIA_RELEASE_MIN_AGE seconds are left to collect_image_garbage.
+    """
+    if name:
+        transaction.on_commit(partial(delete_unreferenced, field, name))
+
+
+def delete_unreferenced(field, name):
+    """Deletes a stored file no object of the field's model refers to"""
+    references = field.model._default_manager.filter(**{field.name: name})
+    if not references.exists():
+        field.storage.delete_if_idle(name, settings.MEDIA_RELEASE_MIN_AGE)
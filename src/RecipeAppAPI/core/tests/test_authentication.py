@@ -0,0 +1,161 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+
+
+ME_URL = reverse("profiles:me")
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens"""
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="ebram96@gmail.com",
+            password="testPass",
+            name="Ebram",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_cached_token_skips_lookup(self):
+        """Test a recently used token is authenticated without queries"""
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted cached token is not accepted anymore"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user_rejected(self):
+        """Test the cached token of a deactivated user is not accepted"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_deactivated_by_update_rejected(self):
+        """Test users deactivated by a queryset update are not accepted"""
+        self.client.get(ME_URL)
+
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_collection_touch_keeps_tokens(self):
+        """Test collection writes don't evict the owner's cached tokens"""
+        self.client.get(ME_URL)
+
+        get_user_model().objects.touch_collection(self.user.pk)
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+    def test_updated_user_not_stale(self):
+        """Test updating the logged user refreshes its cached copy"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"name": "Ebram Shehata"})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["name"], "Ebram Shehata")
+
+    @override_settings(AUTH_TOKEN_CACHE_TIMEOUT=60)
+    def test_expired_token_looked_up(self):
+        """Test a token cached longer than the timeout is looked up again"""
+        with patch("time.monotonic", return_value=1000):
+            self.client.get(ME_URL)
+
+        with patch("time.monotonic", return_value=1061):
+            with self.assertNumQueries(1):
+                self.client.get(ME_URL)
+
+    @override_settings(AUTH_TOKEN_CACHE_MAX_ENTRIES=1)
+    def test_least_recently_used_evicted(self):
+        """Test the cache keeps the most recently used tokens only"""
+        another_user = get_user_model().objects.create_user(
+            email="another@gmail.com",
+            password="testPass",
+        )
+        another_token = Token.objects.create(user=another_user)
+        self.client.get(ME_URL)
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {another_token.key}"
+        )
+        self.client.get(ME_URL)
+
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertIsNotNone(token_cache.get(another_token.key))
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS="default")
+    def test_token_shared_between_processes(self):
+        """Test tokens are shared through the configured cache backend"""
+        self.client.get(ME_URL)
+
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS="default")
+    def test_eviction_by_other_process_applies(self):
+        """Test tokens evicted from the shared cache elsewhere are reread"""
+        self.client.get(ME_URL)
+
+        # Another process evicts the token, like when deactivating its user
+        caches["default"].delete(token_cache.shared_key(self.token.key))
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS="default")
+    def test_password_hash_not_cached(self):
+        """Test the password hash of users is left out of cached tokens"""
+        self.client.get(ME_URL)
+
+        payload = caches["default"].get(token_cache.shared_key(self.token.key))
+        user_fields = dict(payload["user"])
+
+        self.assertNotIn("password", user_fields)
+        self.assertNotIn(self.user.password, map(str, user_fields.values()))
+        self.assertEqual(user_fields["email"], self.user.email)
+
+    def test_cached_user_loads_uncached_fields(self):
+        """Test users of cached tokens still change their password"""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {"password": "newPass123"})
+
+        self.user.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.user.check_password("newPass123"))
+        self.assertEqual(self.user.name, "Ebram")
@@ -0,0 +1,283 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+from unittest.mock import patch
+
+from django.apps import apps
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.state import ProjectState
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core import metrics
+from core.db.backends.sqlite3.base import DatabaseWrapper
+from core.db.operations import AddThroughIndex
+from core.db.pool import ConnectionPool, PoolTimeout, get_pool, ping
+
+
+class FakeConnection:
+    """DB-API connection stand-in tracking whether it was closed"""
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the pool of connections shared by threads"""
+    def setUp(self):
+        self.opened = []
+
+    def connect(self):
+        """Opens a fake connection"""
+        self.opened.append(FakeConnection())
+        return self.opened[-1]
+
+    def create_pool(self, **kwargs):
+        """Returns a pool checking fake connections"""
+        kwargs.setdefault("check", lambda connection: connection.alive)
+        return ConnectionPool(**kwargs)
+
+    def test_released_connections_reused(self):
+        """Test released connections are reused instead of opening more"""
+        pool = self.create_pool(max_size=2)
+
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        second = pool.acquire(self.connect)
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(pool.as_dict()["in_use"], 1)
+
+    def test_dead_idle_connections_replaced(self):
+        """Test idle connections failing health checks are replaced"""
+        pool = self.create_pool(health_check_interval=0)
+        dead = pool.acquire(self.connect)
+        pool.release(dead)
+        dead.alive = False
+
+        connection = pool.acquire(self.connect)
+
+        self.assertIsNot(connection, dead)
+        self.assertTrue(dead.closed)
+        self.assertEqual(pool.as_dict()["health_check_failures"], 1)
+        self.assertEqual(pool.size, 1)
+
+    def test_recent_idle_connections_not_checked(self):
+        """Test connections idle for less than the interval aren't checked"""
+        pool = self.create_pool(health_check_interval=60)
+        connection = pool.acquire(self.connect)
+        pool.release(connection)
+        connection.alive = False
+
+        self.assertIs(pool.acquire(self.connect), connection)
+
+    def test_old_connections_closed(self):
+        """Test connections are closed once they outlived their lifetime"""
+        pool = self.create_pool(max_lifetime=0)
+        connection = pool.acquire(self.connect)
+
+        pool.release(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.size, 0)
+
+    def test_unusable_connections_closed(self):
+        """Test connections released as unusable are closed"""
+        pool = self.create_pool()
+        connection = pool.acquire(self.connect)
+
+        pool.release(connection, reusable=False)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.as_dict()["idle"], 0)
+
+    def test_full_pool_times_out(self):
+        """Test acquiring from a full pool fails once the timeout elapses"""
+        pool = self.create_pool(max_size=1, timeout=0.01)
+        pool.acquire(self.connect)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(self.connect)
+
+        self.assertEqual(pool.as_dict()["timeouts"], 1)
+
+    def test_full_pool_waits_for_release(self):
+        """Test acquiring from a full pool waits for a released connection"""
+        pool = self.create_pool(max_size=1, timeout=5)
+        connection = pool.acquire(self.connect)
+        timer = threading.Timer(0.05, pool.release, (connection,))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.assertIs(pool.acquire(self.connect), connection)
+        stats = pool.as_dict()
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreater(stats["wait_time_max"], 0)
+
+    def test_failed_connect_frees_place(self):
+        """Test a connection failing to open doesn't take a place"""
+        pool = self.create_pool(max_size=1)
+
+        with self.assertRaises(ConnectionError):
+            pool.acquire(lambda: exec("raise ConnectionError"))
+
+        self.assertEqual(pool.size, 0)
+        pool.acquire(self.connect)
+
+    def test_ping(self):
+        """Test live connections answer health checks"""
+        connection = sqlite3.connect(":memory:")
+        self.assertTrue(ping(connection))
+
+        connection.close()
+        self.assertFalse(ping(connection))
+
+
+class PooledDatabaseWrapperTests(SimpleTestCase):
+    """Test database connections are taken from and given back to pools"""
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.name = os.path.join(directory, "pooled.sqlite3")
+        self.connections = []
+
+    def tearDown(self):
+        for wrapper in self.connections:
+            wrapper.close()
+        get_pool("pooled", self.settings()).close_idle()
+
+    def settings(self, **settings):
+        """Returns the settings of the pooled test database"""
+        return {
+            "ENGINE": "core.db.backends.sqlite3",
+            "NAME": self.name,
+            "USER": "",
+            "PASSWORD": "",
+            "HOST": "",
+            "PORT": "",
+            "ATOMIC_REQUESTS": False,
+            "AUTOCOMMIT": True,
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": {},
+            "TIME_ZONE": None,
+            "POOL": {"MAX_SIZE": 2, "TIMEOUT": 1},
+            **settings,
+        }
+
+    def connect(self, **settings):
+        """Returns a connection of its own, like the ones of threads"""
+        connection = DatabaseWrapper(self.settings(**settings), "pooled")
+        self.connections.append(connection)
+        connection.ensure_connection()
+
+        return connection
+
+    def test_connections_reused(self):
+        """Test closed connections are reused by other database wrappers"""
+        first = self.connect()
+        raw = first.connection
+        first.close()
+
+        second = self.connect()
+
+        self.assertIs(second.connection, raw)
+        self.assertEqual(first.connection_pool.as_dict()["connects"], 1)
+        self.assertIn("db_pool_pooled", metrics.collect())
+
+    def test_open_transactions_rolled_back(self):
+        """Test transactions left open are rolled back on release"""
+        connection = self.connect()
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (name TEXT)")
+        connection.set_autocommit(False)
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO item VALUES ('leftover')")
+        connection.close()
+
+        with self.connect().cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM item")
+            self.assertEqual(cursor.fetchone(), (0,))
+
+    def test_closed_in_transaction_not_reused(self):
+        """Test connections closed within a transaction are discarded"""
+        connection = self.connect()
+        raw = connection.connection
+
+        get_connection = "django.db.transaction.get_connection"
+        with patch(get_connection, return_value=connection):
+            with transaction.atomic():
+                connection.close()
+
+        self.assertIsNot(self.connect().connection, raw)
+        self.assertEqual(connection.connection_pool.size, 1)
+
+    def test_full_pool_operational_error(self):
+        """Test connections fail like the database once the pool is full"""
+        self.connect(POOL={"MAX_SIZE": 1, "TIMEOUT": 0})
+
+        with self.assertRaises(OperationalError):
+            self.connect(POOL={"MAX_SIZE": 1, "TIMEOUT": 0})
+
+    def test_unpooled_connections_closed(self):
+        """Test connections are closed as usual without pool settings"""
+        connection = self.connect(POOL=None)
+        raw = connection.connection
+
+        connection.close()
+
+        self.assertIsNone(connection.connection_pool)
+        self.assertFalse(ping(raw))
+
+
+class AddThroughIndexTests(TransactionTestCase):
+    """Test indexes are added to the through tables of M2M fields"""
+    def get_columns(self, table, name):
+        """Returns the columns of an index of table, None if there's none"""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, table
+            )
+
+        return constraints[name]["columns"] if name in constraints else None
+
+    def test_reverse_indexes_migrated(self):
+        """Test the through tables are indexed from the related side"""
+        self.assertEqual(
+            self.get_columns("core_recipe_tags", "recipe_tags_reverse_idx"),
+            ["tag_id", "recipe_id"],
+        )
+        self.assertEqual(
+            self.get_columns(
+                "core_recipe_ingredients", "recipe_ingredients_reverse_idx"
+            ),
+            ["ingredient_id", "recipe_id"],
+        )
+
+    def test_add_and_remove_index(self):
+        """Test the index is created forwards and dropped backwards"""
+        operation = AddThroughIndex(
+            model_name="recipe",
+            field_name="tags",
+            name="recipe_tags_test_idx",
+            columns=["recipe_id", "tag_id"],
+        )
+        state = ProjectState.from_apps(apps)
+
+        with connection.schema_editor(atomic=False) as editor:
+            operation.database_forwards("core", editor, state, state)
+        self.assertEqual(
+            self.get_columns("core_recipe_tags", "recipe_tags_test_idx"),
+            ["recipe_id", "tag_id"],
+        )
+
+        with connection.schema_editor(atomic=False) as editor:
+            operation.database_backwards("core", editor, state, state)
+        self.assertIsNone(
+            self.get_columns("core_recipe_tags", "recipe_tags_test_idx")
+        )
@@ -0,0 +1,100 @@
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.handlers import ThreadPoolASGIHandler
+from core.models import Recipe, Tag
+
+
+TAGS_URL = reverse("recipes:tag-list")
+EXPORT_URL = reverse("recipes:recipe-export")
+
+
+@override_settings(ASGI_THREADS=1)
+class ThreadPoolASGIHandlerTests(TransactionTestCase):
+    """Test requests served under ASGI run in a bounded pool of threads"""
+
+    def setUp(self):
+        caches["recipes"].clear()
+        self.user = get_user_model().objects.create_user(
+            email="ebram96@gmail.com", password="testPass"
+        )
+        self.token = Token.objects.create(user=self.user)
+        Tag.objects.create(user=self.user, name="Vegan")
+        self.handler = ThreadPoolASGIHandler()
+        self.addCleanup(self.handler.executor.shutdown)
+
+    def request(self, path, query_string=b"", body_sent=None):
+        """
+        Sends a GET request to the handler, the client sending its body
+        once body_sent is set, and returns the status and the body
+        """
+        messages = []
+
+        async def receive():
+            if body_sent is not None:
+                await body_sent.wait()
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        async def get():
+            await self.handler({
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "query_string": query_string,
+                "headers": [
+                    (b"host", b"testserver"),
+                    (b"authorization", f"Token {self.token.key}".encode()),
+                ],
+            }, receive, send)
+
+            return messages[0]["status"], b"".join(
+                message.get("body", b"") for message in messages[1:]
+            )
+
+        return get()
+
+    def test_views_served(self):
+        """Test views are served with their usual authentication"""
+        status, body = asyncio.run(self.request(TAGS_URL))
+
+        self.assertEqual(status, 200)
+        self.assertIn(b"Vegan", body)
+        self.assertEqual(self.handler.as_dict()["handled"], 1)
+
+    def test_slow_clients_hold_no_thread(self):
+        """Test requests are served while other clients send their bodies"""
+        async def main():
+            body_sent = asyncio.Event()
+            slow = asyncio.ensure_future(
+                self.request(TAGS_URL, body_sent=body_sent)
+            )
+            status, _ = await asyncio.wait_for(self.request(TAGS_URL), 10)
+            self.assertFalse(slow.done())
+            body_sent.set()
+
+            return status, (await slow)[0]
+
+        self.assertEqual(asyncio.run(main()), (200, 200))
+        self.assertEqual(self.handler.as_dict()["running"], 0)
+
+    def test_streaming_responses_read_in_threads(self):
+        """Test streamed content querying the database is sent"""
+        Recipe.objects.create(
+            user=self.user, title="Soup", time_minutes=10, price=5
+        )
+
+        status, body = asyncio.run(
+            self.request(EXPORT_URL, query_string=b"format=ndjson")
+        )
+
+        self.assertEqual(status, 200)
+        self.assertIn(b'"title":"Soup"', body)
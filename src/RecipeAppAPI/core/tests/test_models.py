@@ -1,6 +1,8 @@
-from unittest.mock import patch
+from io import StringIO
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError
 from django.test import TestCase
 
 from core import models
@@ -65,6 +67,27 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user can't have two tags with the same name"""
+        user = create_sample_user()
+        models.Tag.objects.create(user=user, name="Spicy")
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name="Spicy")
+
+    def test_get_or_create_tags_by_names(self):
+        """Test tags are looked up by names and missing ones created"""
+        user = create_sample_user()
+        tag = models.Tag.objects.create(user=user, name="Spicy")
+
+        tags = models.Tag.objects.get_or_create_by_names(
+            user.id, ["Spicy", "Vegan"]
+        )
+
+        self.assertEqual(tags["Spicy"], tag)
+        self.assertEqual(tags["Vegan"].user, user)
+        self.assertEqual(models.Tag.objects.count(), 2)
+
     # Test Ingredient model
     def test_ingredient_str_representation_correct(self):
         """Test Ingredient model object string representation is correct"""
@@ -85,11 +108,76 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(recipe), recipe.title)
 
-    @patch("uuid.uuid4")
-    def test_recipe_image_filename_uuid(self, mock_uuid):
+    def test_recipe_image_file_path(self):
         """Test that Recipe image is saved in the correct location"""
-        uuid = "test_uuid"
-        mock_uuid.return_value = uuid
         file_path = models.recipe_image_file_path(None, "testImage.png")
-        expected_path = f"uploads/recipe/images/{uuid}.png"
+        expected_path = "uploads/recipe/images/testImage.png"
         self.assertEqual(file_path, expected_path)
+
+
+class RecipeCountTests(TestCase):
+    """Test tags and ingredients count the recipes using them"""
+    def setUp(self):
+        self.user = create_sample_user()
+        self.tag = models.Tag.objects.create(user=self.user, name="Spicy")
+        self.ingredient = models.Ingredient.objects.create(
+            user=self.user, name="Tomato"
+        )
+        self.recipe = models.Recipe.objects.create(
+            user=self.user, title="Koshary", time_minutes=40, price=10.0,
+        )
+
+    def assertRecipeCount(self, obj, count):
+        obj.refresh_from_db()
+        self.assertEqual(obj.recipe_count, count)
+
+    def test_recipe_count_follows_relations(self):
+        """Test adding, removing and clearing relations updates counts"""
+        self.recipe.tags.add(self.tag)
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+        self.assertRecipeCount(self.tag, 1)
+        self.assertRecipeCount(self.ingredient, 1)
+
+        self.recipe.tags.remove(self.tag)
+        self.recipe.tags.remove(self.tag)
+        self.recipe.ingredients.clear()
+        self.assertRecipeCount(self.tag, 0)
+        self.assertRecipeCount(self.ingredient, 0)
+
+    def test_recipe_count_follows_reverse_relations(self):
+        """Test relations changed from the tag side update its count"""
+        other = models.Recipe.objects.create(
+            user=self.user, title="Molokhia", time_minutes=30, price=5.0,
+        )
+        self.tag.recipe_set.add(self.recipe, other)
+        self.assertRecipeCount(self.tag, 2)
+
+        self.tag.recipe_set.remove(other)
+        self.assertRecipeCount(self.tag, 1)
+
+        self.tag.recipe_set.clear()
+        self.assertRecipeCount(self.tag, 0)
+
+    def test_recipe_count_after_recipe_delete(self):
+        """Test deleting a recipe stops counting it"""
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+        self.recipe.delete()
+
+        self.assertRecipeCount(self.tag, 0)
+        self.assertRecipeCount(self.ingredient, 0)
+
+    def test_reconcile_recipe_counts(self):
+        """Test the reconcile command fixes drifted counts"""
+        self.recipe.tags.add(self.tag)
+        models.Tag.objects.update(recipe_count=7)
+        models.Ingredient.objects.update(recipe_count=3)
+        out = StringIO()
+
+        call_command("reconcile_recipe_counts", stdout=out)
+
+        self.assertRecipeCount(self.tag, 1)
+        self.assertRecipeCount(self.ingredient, 0)
+        self.assertIn("Fixed the recipe counts of 1 tags", out.getvalue())
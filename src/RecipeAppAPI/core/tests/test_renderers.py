@@ -0,0 +1,115 @@
+import datetime
+from collections import OrderedDict
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import CSVRenderer, NDJSONRenderer, ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer renders like DRF's JSON renderer"""
+    data = OrderedDict([
+        ("price", Decimal("12.50")),
+        ("created", datetime.datetime(
+            2020, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc
+        )),
+        ("day", datetime.date(2020, 1, 2)),
+        ("time", datetime.time(3, 4, 5, 678901)),
+        ("message", gettext_lazy("Not found.")),
+        ("names", ["Koshary", "Ta3meya é  ", None, True]),
+        (1, {"nested": [1.5, -2]}),
+    ])
+
+    def test_render_same_as_json_renderer(self):
+        """Test the rendered bytes are identical to JSONRenderer's"""
+        self.assertEqual(
+            ORJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data),
+        )
+
+    def test_render_indented(self):
+        """Test indenting requested by the media type is honored"""
+        media_type = "application/json; indent=4"
+
+        self.assertEqual(
+            ORJSONRenderer().render(self.data, media_type),
+            JSONRenderer().render(self.data, media_type),
+        )
+
+    @patch("core.renderers.orjson", None)
+    def test_render_without_orjson(self):
+        """Test rendering falls back to the standard library"""
+        self.assertEqual(
+            ORJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data),
+        )
+
+    def test_render_none(self):
+        """Test no data renders an empty body"""
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_stream_chunks(self):
+        """Test chunks of items are streamed as a single JSON array"""
+        renderer = ORJSONRenderer()
+
+        self.assertEqual(
+            b"".join(renderer.stream([[1, {"a": "b"}], [], [3]])),
+            b'[1,{"a":"b"},3]',
+        )
+        self.assertEqual(b"".join(renderer.stream([])), b"[]")
+
+    def test_stream_rows_layout(self):
+        """Test dicts are streamed as arrays of values under field names"""
+        chunks = [[{"a": 1, "b": "x"}], [], [{"a": 2, "b": None}]]
+
+        self.assertEqual(
+            b"".join(ORJSONRenderer().stream(
+                chunks, {"fields": ["b", "a"], "layout": "rows"}
+            )),
+            b'{"fields":["b","a"],"rows":[["x",1],[null,2]]}',
+        )
+
+
+class ExportRendererTests(SimpleTestCase):
+    """Test the renderers of streamed exports"""
+    def test_ndjson_stream(self):
+        """Test items are streamed one JSON document per line"""
+        chunks = [[{"a": 1}, [2]], [], [None]]
+
+        self.assertEqual(
+            b"".join(NDJSONRenderer().stream(chunks)),
+            b'{"a":1}\n[2]\nnull\n',
+        )
+
+    def test_ndjson_stream_rows_layout(self):
+        """Test field names are streamed in a line before the values"""
+        chunks = [[{"a": 1, "b": "x"}], [{"a": 2, "b": None}]]
+
+        self.assertEqual(
+            b"".join(NDJSONRenderer().stream(
+                chunks, {"fields": ["a", "b"], "layout": "rows"}
+            )),
+            b'["a","b"]\n[1,"x"]\n[2,null]\n',
+        )
+
+    def test_csv_stream(self):
+        """Test dicts are streamed as rows of the fields, lists joined"""
+        chunks = [[{"b": "x,y", "a": ["p", "q"]}], [{"a": [], "c": 1}]]
+
+        self.assertEqual(
+            b"".join(CSVRenderer().stream(chunks, {"fields": ["a", "b"]})),
+            b'a,b\r\np; q,"x,y"\r\n,\r\n',
+        )
+
+    def test_csv_render_error(self):
+        """Test a single dict, like an error, renders under its keys"""
+        self.assertEqual(
+            CSVRenderer().render({"detail": "Not found."}),
+            b"detail\r\nNot found.\r\n",
+        )
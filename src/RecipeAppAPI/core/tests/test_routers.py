@@ -0,0 +1,187 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connections
+from django.test import (
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.checks import check_replica_sticky_cache
+from core.db.routers import replicas
+from core.models import Tag
+
+
+TAGS_URL = reverse("recipes:tag-list")
+ME_URL = reverse("profiles:me")
+TOKEN_URL = reverse("profiles:generate_token")
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica"],
+    DATABASE_REPLICA_STICKY_SECONDS=10,
+    DATABASE_REPLICA_STICKY_CACHE="default",
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test reads of safe requests are routed to read replicas"""
+    databases = {"default", "replica"}
+
+    @classmethod
+    def setUpClass(cls):
+        # A second connection to the test database stands for a replica
+        connections.databases["replica"] = {
+            **connections.databases["default"],
+            "TEST": {"MIRROR": "default"},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections.databases["replica"]
+        del connections._connections.replica
+
+    def setUp(self):
+        caches["default"].clear()
+        caches["recipes"].clear()
+        self.user = get_user_model().objects.create_user(
+            email="ebram96@gmail.com", password="testPass"
+        )
+        self.client = APIClient()
+        self.log_in(self.user)
+        Tag.objects.create(user=self.user, name="Vegan")
+
+    def log_in(self, user):
+        """Authenticates the client requests with a token of user"""
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def request(self, method, url, data=None):
+        """
+        Sends a request, returning its response and the number of queries
+        sent to the primary and to the replica
+        """
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            res = getattr(self.client, method)(url, data, format="json")
+
+        return res, len(primary), len(replica)
+
+    def test_safe_requests_read_replica(self):
+        """Test lists and the profile are read from the replica"""
+        for url in (TAGS_URL, ME_URL):
+            # Tokens are looked up again rather than read from the cache
+            token_cache.clear()
+            res, primary, replica = self.request("get", url)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(primary, 0)
+            self.assertGreater(replica, 0)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_writes_go_to_primary(self):
+        """Test writes and the reads of writing requests use the primary"""
+        res, primary, replica = self.request(
+            "post", TAGS_URL, {"name": "Spicy"}
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_writers_read_their_writes(self):
+        """Test clients read from the primary for a while after writing"""
+        self.request("post", TAGS_URL, {"name": "Spicy"})
+
+        res, primary, replica = self.request("get", TAGS_URL)
+        self.log_in(get_user_model().objects.create_user(
+            email="other@gmail.com", password="testPass"
+        ))
+        _res, _primary, other_replica = self.request("get", TAGS_URL)
+
+        self.assertEqual(
+            {tag["name"] for tag in res.data["results"]}, {"Spicy", "Vegan"}
+        )
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        self.assertGreater(other_replica, 0)
+
+    def test_new_tokens_read_primary(self):
+        """Test the first requests with a new token read it from the primary"""
+        Token.objects.filter(user=self.user).delete()
+        self.client.credentials()
+
+        res, _primary, _replica = self.request("post", TOKEN_URL, {
+            "email": self.user.email, "password": "testPass",
+        })
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {res.data['token']}"
+        )
+        res, primary, replica = self.request("get", TAGS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    @override_settings(DATABASE_REPLICA_STICKY_SECONDS=0)
+    def test_stickiness_disabled(self):
+        """Test reads go to replicas right after writes without a window"""
+        self.request("post", TAGS_URL, {"name": "Spicy"})
+
+        _res, primary, replica = self.request("get", TAGS_URL)
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_failover_to_primary(self):
+        """Test reads go to the primary while the replica is unavailable"""
+        self.addCleanup(replicas._down_until.clear)
+        connections["replica"].close()
+        replica_settings = connections["replica"].settings_dict
+        name = replica_settings["NAME"]
+        replica_settings["NAME"] = "/nonexistent/replica.sqlite3"
+        try:
+            with CaptureQueriesContext(connections["default"]) as primary:
+                res = self.client.get(TAGS_URL)
+        finally:
+            replica_settings["NAME"] = name
+
+        self.assertEqual(res.status_code, 200)
+        self.assertGreater(len(primary), 0)
+        self.assertIn("replica", replicas.as_dict()["down"])
+
+        # Left out until the retry delay elapses
+        _res, primary, replica = self.request("get", TAGS_URL)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+
+class ReplicaStickyCacheCheckTests(SimpleTestCase):
+    """Test the sticky cache of replicas must be shared by processes"""
+    def test_process_local_cache_warned(self):
+        """Test a local memory sticky cache is warned about with replicas"""
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(check_replica_sticky_cache(None), [])
+
+        with override_settings(DATABASE_REPLICAS=["replica"]):
+            warnings = check_replica_sticky_cache(None)
+
+        self.assertEqual([warning.id for warning in warnings], ["core.W001"])
+
+    @override_settings(
+        DATABASE_REPLICAS=["replica"],
+        DATABASE_REPLICA_STICKY_CACHE="shared",
+        CACHES={"shared": {
+            "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        }},
+    )
+    def test_shared_cache_accepted(self):
+        """Test a cache shared by processes passes the check"""
+        self.assertEqual(check_replica_sticky_cache(None), [])
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import (
+    RequestFactory,
+    TransactionTestCase,
+    override_settings,
+)
+
+from core import models
+from core.views import serve_media
+
+
+def sample_recipe(user, **params):
+    """Creates and returns a sample recipe"""
+    return models.Recipe.objects.create(
+        user=user,
+        title="Spicy Salad",
+        time_minutes=5,
+        price=5.0,
+        **params
+    )
+
+
+class ContentAddressedStorageTests(TransactionTestCase):
+    """Test recipe images are stored once by content and released"""
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_settings = override_settings(
+            MEDIA_ROOT=self.media_root, MEDIA_RELEASE_MIN_AGE=0
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.user = get_user_model().objects.create_user(
+            email="ebram96@gmail.com",
+            password="testPassword",
+        )
+
+    def save_image(self, recipe, content=b"image bytes", name="photo.PNG"):
+        """Saves content as the image of recipe"""
+        recipe.image.save(name, ContentFile(content))
+
+    def test_image_named_by_content_digest(self):
+        """Test stored images are named by the digest of their content"""
+        recipe = sample_recipe(self.user)
+
+        self.save_image(recipe)
+
+        digest = hashlib.sha256(b"image bytes").hexdigest()
+        self.assertEqual(
+            recipe.image.name,
+            f"uploads/recipe/images/{digest[:2]}/{digest}.png",
+        )
+        self.assertTrue(os.path.exists(recipe.image.path))
+
+    def test_identical_images_stored_once(self):
+        """Test recipes with identical images share one file"""
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user)
+
+        self.save_image(recipe1, name="first.png")
+        self.save_image(recipe2, name="second.png")
+
+        self.assertEqual(recipe1.image.name, recipe2.image.name)
+        directory = os.path.dirname(recipe1.image.path)
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_shared_image_deleted_with_last_recipe(self):
+        """Test an image is deleted once no recipe refers to it"""
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user)
+        self.save_image(recipe1)
+        self.save_image(recipe2)
+        path = recipe1.image.path
+
+        recipe1.delete()
+
+        self.assertTrue(os.path.exists(path))
+
+        recipe2.delete()
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_replaced_image_deleted(self):
+        """Test replacing the image of a recipe deletes the old one"""
+        recipe = models.Recipe.objects.get(pk=sample_recipe(self.user).pk)
+        self.save_image(recipe, content=b"old image")
+        old_path = recipe.image.path
+
+        self.save_image(recipe, content=b"new image")
+
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(recipe.image.path))
+
+    def test_released_image_kept_on_rollback(self):
+        """Test images of deletes rolled back are not deleted"""
+        recipe = sample_recipe(self.user)
+        self.save_image(recipe)
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                recipe.delete()
+                raise RuntimeError
+
+        self.assertTrue(models.Recipe.objects.exists())
+        self.assertTrue(os.path.exists(recipe.image.path))
+
+    @override_settings(MEDIA_RELEASE_MIN_AGE=60)
+    def test_recently_saved_image_kept(self):
+        """Test images saved again recently are left to garbage collection"""
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user)
+        self.save_image(recipe1)
+        path = recipe1.image.path
+        os.utime(path, (0, 0))
+
+        # Another recipe saving the same image is still being written
+        with transaction.atomic():
+            self.save_image(recipe2)
+            recipe2.image = ""
+            recipe2.save()
+            recipe1.delete()
+
+        self.assertTrue(os.path.exists(path))
+
+    def test_save_restores_image_deleted_meanwhile(self):
+        """Test saving content whose file was deleted writes it again"""
+        storage = models.content_addressed_storage
+        name = storage.save("uploads/photo.png", ContentFile(b"image"))
+        os.utime(storage.path(name), (0, 0))
+
+        self.assertTrue(storage.delete_if_idle(name, 60))
+        self.assertEqual(
+            storage.save("uploads/photo.png", ContentFile(b"image")), name
+        )
+        self.assertTrue(storage.exists(name))
+
+    def test_serve_media_immutable_headers(self):
+        """Test content addressed files are cacheable forever"""
+        recipe = sample_recipe(self.user)
+        self.save_image(recipe)
+        request = RequestFactory().get(recipe.image.url)
+
+        res = serve_media(request, recipe.image.name, self.media_root)
+
+        self.assertIn("immutable", res["Cache-Control"])
+
+    def test_collect_image_garbage(self):
+        """Test the command deletes only unreferenced images"""
+        recipe = sample_recipe(self.user)
+        self.save_image(recipe)
+        orphan = models.content_addressed_storage.save(
+            "uploads/recipe/images/orphan.png", ContentFile(b"orphan")
+        )
+
+        call_command(
+            "collect_image_garbage", "--min-age=-1", stdout=StringIO()
+        )
+
+        self.assertTrue(os.path.exists(recipe.image.path))
+        self.assertFalse(models.content_addressed_storage.exists(orphan))
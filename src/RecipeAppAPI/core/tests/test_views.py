@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+METRICS_URL = reverse("metrics")
+
+
+class MetricsAPITests(TestCase):
+    """Test the metrics API"""
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_metrics_admin_required(self):
+        """Test metrics are not reported to regular users"""
+        user = get_user_model().objects.create_user(
+            email="ebram96@gmail.com",
+            password="testPass",
+        )
+        self.client.force_authenticate(user)
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_reported_to_admin(self):
+        """Test metrics of registered components are reported to admins"""
+        admin = get_user_model().objects.create_superuser(
+            email="admin@gmail.com",
+            password="testPass",
+        )
+        self.client.force_authenticate(admin)
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("response_cache", res.data)
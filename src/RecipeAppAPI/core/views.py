@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.views.static import serve
+
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import metrics
+from core.authentication import CachedTokenAuthentication
+from core.storage import DIGEST_NAME_RE
+
+
+class MetricsView(APIView):
+    """Reports the in-process metrics of caches and pools to admins"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        """Returns the metrics of all registered components"""
+        return Response(metrics.collect())
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """
+    Serves media files, letting clients and CDNs cache content addressed
+    files forever since their content never changes
+    """
+    response = serve(request, path, document_root, show_indexes)
+    if DIGEST_NAME_RE.search(path):
+        response["Cache-Control"] = (
+            f"public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable"
+        )
+
+    return response
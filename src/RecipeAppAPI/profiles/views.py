@@ -1,7 +1,10 @@
-from rest_framework import generics, permissions, authentication
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
+from core.middleware import stick_credentials
+
 from profiles.serializers import UserProfileSerializer, AuthTokenSerializer
 
 
@@ -15,12 +18,26 @@ class GenerateAuthTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        """
+        Returns the token of the user, whose first requests with it read it
+        from the primary rather than a replica that may lag behind
+        """
+        response = super().post(request, *args, **kwargs)
+        stick_credentials(request, " ".join((
+            CachedTokenAuthentication.keyword, response.data["token"],
+        )))
+
+        return response
+
 
 class ManageUserProfileView(generics.RetrieveUpdateAPIView):
     """Manage a user data"""
     serializer_class = UserProfileSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    authentication_classes = (authentication.TokenAuthentication,)
+    # Safe requests read from a replica, see core.middleware
+    replica_reads = True
+    authentication_classes = (CachedTokenAuthentication,)
 
     def get_object(self):
         """Get the current logged on user"""
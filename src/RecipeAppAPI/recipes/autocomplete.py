@@ -0,0 +1,59 @@
+from functools import partial
+
+from django.db import connection
+from django.db.models import CharField, F, Func
+
+from core.models import Tag, Ingredient
+
+from recipes.indexes import PrefixIndex, VersionedIndexCache
+
+
+class NameKey(Func):
+    """
+    Upper cased name in the C collation, matching the prefix indexes of tag
+    and ingredient names on Postgres
+    """
+    template = '(UPPER(%(expressions)s) COLLATE "C")'
+    output_field = CharField()
+
+
+def autocomplete_queryset(model, user, prefix):
+    """Returns the user's objects whose names start with prefix, on Postgres"""
+    return model.objects.annotate(name_key=NameKey(F("name"))).filter(
+        user=user,
+        name_key__startswith=prefix.upper(),
+    ).order_by("name_key", "id")
+
+
+def build_prefix_index(model, user_id):
+    """Returns the prefix index of the names of a user's objects"""
+    return PrefixIndex(
+        model.objects.filter(user_id=user_id).values_list(
+            "pk", "name"
+        ).iterator()
+    )
+
+
+prefix_indexes = {
+    model: VersionedIndexCache(
+        f"{model._meta.model_name}_prefix_index",
+        partial(build_prefix_index, model),
+    )
+    for model in (Tag, Ingredient)
+}
+
+
+def complete_names(model, user, version, prefix, limit):
+    """
+    Returns the ids and names of the user's first objects whose names start
+    with prefix, ignoring case, from an index on Postgres and an in-process
+    prefix index elsewhere
+    """
+    if connection.vendor == "postgresql":
+        return list(
+            autocomplete_queryset(model, user, prefix).values_list(
+                "pk", "name"
+            )[:limit]
+        )
+
+    return prefix_indexes[model].get(user.pk, version).complete(prefix, limit)
@@ -0,0 +1,342 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Prefetch, Subquery
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipes.autocomplete import (
+    autocomplete_queryset,
+    complete_names,
+    prefix_indexes,
+)
+from recipes.fastpath import ValuesSerializer
+from recipes.filters import filter_recipes
+from recipes.search import index_cache, search_queryset, search_recipes
+from recipes.serializers import RecipeSerializer
+
+
+SCENARIOS = {}
+
+# Indexes designed for the user scoped access patterns of the views, which
+# benchmarks may compare against. (user, name) lookups of tags and
+# ingredients are served by their unique constraints.
+DESIGNED_INDEXES = (
+    "recipe_user_id_idx",
+    "recipe_tags_reverse_idx",
+    "recipe_ingredients_reverse_idx",
+)
+
+
+def scenario(name):
+    """Registers a function returning the benchmark cases of a scenario"""
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+
+    return register
+
+
+class BenchmarkCase:
+    """A labelled workload measured by the benchmark_queries command"""
+    def __init__(self, label, queryset=None, run=None):
+        self.label = label
+        self.queryset = queryset
+        self.run = run or (lambda: len(list(queryset.all())))
+
+    def explain(self):
+        """Returns the query plan of the case queryset if there is one"""
+        if self.queryset is None:
+            return ""
+
+        if connection.vendor == "postgresql":
+            return self.queryset.explain(analyze=True, buffers=True)
+
+        return self.queryset.explain()
+
+    def measure(self, repeat):
+        """Runs the case repeat times, returns the row count and timings"""
+        rows = 0
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = self.run()
+            timings.append(time.perf_counter() - start)
+
+        return rows, timings
+
+
+def summarize(rows, timings):
+    """Returns printable latency and throughput statistics of timings"""
+    ordered = sorted(timings)
+    median = statistics.median(ordered)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    return {
+        "rows": rows,
+        "min_ms": round(ordered[0] * 1000, 2),
+        "median_ms": round(median * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+        "rows_per_sec": round(rows / median) if median else 0,
+    }
+
+
+@contextmanager
+def without_indexes(names=DESIGNED_INDEXES):
+    """
+    Drops indexes for the duration of the block, restoring them by rolling
+    its transaction back. Tables of the indexes are locked until then.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute(
+                    f"DROP INDEX IF EXISTS {connection.ops.quote_name(name)}"
+                )
+        try:
+            yield
+        finally:
+            transaction.set_rollback(True)
+
+
+def sample_names(model, user, count=2):
+    """Returns the names of some of the user's objects"""
+    return list(
+        model.objects.filter(user=user).order_by("id").values_list(
+            "name", flat=True
+        )[:count]
+    )
+
+
+@scenario("filters")
+def filter_cases(user):
+    """Compares JOIN based and semi-join based name filtering"""
+    tags = sample_names(Tag, user)
+    ingredients = sample_names(Ingredient, user)
+    recipes = Recipe.objects.filter(user=user)
+    params = {"tags": ",".join(tags), "ingredients": ",".join(ingredients)}
+
+    return [
+        BenchmarkCase(
+            "join: tags",
+            recipes.filter(tags__name__in=tags),
+        ),
+        BenchmarkCase(
+            "join: tags + ingredients",
+            recipes.filter(tags__name__in=tags).filter(
+                ingredients__name__in=ingredients
+            ),
+        ),
+        BenchmarkCase(
+            "semi-join: tags any",
+            filter_recipes(recipes, user, {"tags": params["tags"]}),
+        ),
+        BenchmarkCase(
+            "semi-join: tags all",
+            filter_recipes(
+                recipes, user, {"tags": params["tags"], "tags_match": "all"}
+            ),
+        ),
+        BenchmarkCase(
+            "semi-join: tags + ingredients any",
+            filter_recipes(recipes, user, params),
+        ),
+    ]
+
+
+@scenario("relations")
+def relation_cases(user):
+    """
+    Measures reading the through tables from tags and ingredients, served
+    by the (tag_id, recipe_id) and (ingredient_id, recipe_id) indexes
+    """
+    tag_ids = list(
+        Tag.objects.filter(user=user).order_by("id").values_list(
+            "id", flat=True
+        )[:2]
+    )
+    through = Recipe.tags.through
+
+    return [
+        BenchmarkCase(
+            "reverse: recipes of tags",
+            through.objects.filter(tag_id__in=tag_ids).values_list(
+                "recipe_id", flat=True
+            ),
+        ),
+        BenchmarkCase(
+            "reverse: tag recipe counts",
+            Tag.objects.filter(user=user).annotate(actual=Subquery(
+                Tag.objects.recipe_count_queryset()
+            )).values_list("id", "actual"),
+        ),
+        BenchmarkCase(
+            "reverse: ingredient recipe counts",
+            Ingredient.objects.filter(user=user).annotate(actual=Subquery(
+                Ingredient.objects.recipe_count_queryset()
+            )).values_list("id", "actual"),
+        ),
+        BenchmarkCase(
+            "user: latest recipes",
+            Recipe.objects.filter(user=user).order_by("-id").values_list(
+                "id", flat=True
+            )[:100],
+        ),
+    ]
+
+
+@scenario("ranges")
+def range_cases(user):
+    """
+    Compares scanning all recipes for cheap quick ones with range filters
+    served by the (user, price) and (user, time_minutes) indexes
+    """
+    tags = sample_names(Tag, user)
+    recipes = Recipe.objects.filter(user=user)
+    params = {"max_price": "10", "max_time_minutes": "30"}
+
+    def scan():
+        return len([
+            pk for pk, price, time_minutes in recipes.values_list(
+                "pk", "price", "time_minutes"
+            ).iterator()
+            if price <= 10 and time_minutes <= 30
+        ])
+
+    return [
+        BenchmarkCase("scan: all recipes", run=scan),
+        BenchmarkCase(
+            "range: price",
+            filter_recipes(recipes, user, {"max_price": "10"}).order_by(
+                "price", "id"
+            ),
+        ),
+        BenchmarkCase(
+            "range: price + time",
+            filter_recipes(recipes, user, params),
+        ),
+        BenchmarkCase(
+            "range: time + tags",
+            filter_recipes(recipes, user, {
+                "tags": ",".join(tags), "max_time_minutes": "30",
+            }).order_by("time_minutes", "id"),
+        ),
+    ]
+
+
+@scenario("serializers")
+def serializer_cases(user):
+    """
+    Compares rendering a page of recipes through RecipeSerializer with
+    rendering it from values() rows through the fast path
+    """
+    recipes = Recipe.objects.filter(user=user).order_by("-id")[:1000]
+    renderer = JSONRenderer()
+
+    def model_serializer():
+        queryset = recipes.prefetch_related(
+            Prefetch("tags", Tag.objects.only("id").order_by("id")),
+            Prefetch("ingredients", Ingredient.objects.only("id").order_by(
+                "id"
+            )),
+        )
+        data = RecipeSerializer(queryset, many=True).data
+        renderer.render(data)
+        return len(data)
+
+    def values_serializer():
+        serializer = ValuesSerializer(RecipeSerializer())
+        data = serializer.render(serializer.rows(recipes))
+        renderer.render(data)
+        return len(data)
+
+    return [
+        BenchmarkCase("serializer: RecipeSerializer", run=model_serializer),
+        BenchmarkCase("fast path: values rows", run=values_serializer),
+    ]
+
+
+@scenario("search")
+def search_cases(user):
+    """
+    Compares scanning titles with full text search, on Postgres through the
+    GIN index and elsewhere through a cached or cold inverted index
+    """
+    words = " ".join(sample_names(Tag, user, count=1))
+    version = user.collection_version
+    limit = 20
+    cases = [
+        BenchmarkCase(
+            "scan: title icontains",
+            Recipe.objects.filter(user=user, title__icontains="1"),
+        ),
+    ]
+    if connection.vendor == "postgresql":
+        cases.append(BenchmarkCase(
+            "full text: ranked",
+            search_queryset(user, words)[:limit],
+        ))
+    else:
+        def cold_search():
+            index_cache.clear()
+            return len(search_recipes(user, version, words, limit))
+
+        cases.extend([
+            BenchmarkCase("inverted index: cold", run=cold_search),
+            BenchmarkCase(
+                "inverted index: cached",
+                run=lambda: len(search_recipes(user, version, words, limit)),
+            ),
+        ])
+
+    return cases
+
+
+@scenario("autocomplete")
+def autocomplete_cases(user):
+    """
+    Compares completing ingredient names by scanning with completing them
+    from an index, on Postgres the name prefix index and elsewhere a cached
+    or cold in-process prefix index
+    """
+    names = sample_names(Ingredient, user, count=1)
+    prefix = names[0][:3] if names else "a"
+    version = user.collection_version
+    limit = 10
+    cases = [
+        BenchmarkCase(
+            "scan: name istartswith",
+            Ingredient.objects.filter(
+                user=user, name__istartswith=prefix
+            ).order_by("name")[:limit],
+        ),
+    ]
+    if connection.vendor == "postgresql":
+        cases.append(BenchmarkCase(
+            "index: name prefix",
+            autocomplete_queryset(Ingredient, user, prefix)[:limit],
+        ))
+    else:
+        def cold_complete():
+            prefix_indexes[Ingredient].clear()
+            return len(
+                complete_names(Ingredient, user, version, prefix, limit)
+            )
+
+        cases.extend([
+            BenchmarkCase("prefix index: cold", run=cold_complete),
+            BenchmarkCase(
+                "prefix index: cached",
+                run=lambda: len(complete_names(
+                    Ingredient, user, version, prefix, limit
+                )),
+            ),
+        ])
+
+    return cases
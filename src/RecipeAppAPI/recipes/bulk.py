@@ -0,0 +1,346 @@
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import prefetch_related_objects
+from django.utils.translation import gettext as _
+
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.signals import bulk_changed
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field looking objects up among the ones preloaded in the
+    serializer context, so validating many items doesn't query per item.
+    Only the logged user's objects can be referenced.
+    """
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get("request")
+        if request is not None:
+            queryset = queryset.filter(user=request.user)
+
+        return queryset
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get("preloaded", {}).get(self.queryset.model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+        try:
+            return preloaded[int(data)]
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+def preload_related(serializer, items):
+    """Fetches the objects referenced by the relations of items at once"""
+    preloaded = {}
+    for name, field in serializer.child.fields.items():
+        relation = getattr(field, "child_relation", None)
+        if field.read_only or not isinstance(
+            relation, PreloadedPrimaryKeyRelatedField
+        ):
+            continue
+
+        pks = set()
+        for item in items:
+            values = item.get(name) if isinstance(item, dict) else None
+            for value in values if isinstance(values, list) else ():
+                try:
+                    pks.add(int(value))
+                except (TypeError, ValueError):
+                    pass
+
+        model = relation.queryset.model
+        preloaded.setdefault(model, {}).update(
+            relation.get_queryset().in_bulk(pks)
+        )
+
+    return preloaded
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """List serializer writing all of its items with bulk queries"""
+
+    def get_relation_fields(self):
+        """Returns the model many to many fields written by the child"""
+        model = self.child.Meta.model
+        names = set(self.child.fields)
+
+        return [f for f in model._meta.many_to_many if f.name in names]
+
+    def resolve_names(self, validated_data, user_id):
+        """Lets the child resolve relations given by names for all items"""
+        resolve_names = getattr(self.child, "resolve_names", None)
+        if resolve_names is not None:
+            resolve_names(validated_data, user_id)
+
+    def create(self, validated_data):
+        """Inserts all items and their relations"""
+        model = self.child.Meta.model
+        if validated_data:
+            self.resolve_names(validated_data, validated_data[0]["user"].pk)
+
+        relation_fields = self.get_relation_fields()
+        objs = []
+        relations = []
+        for attrs in validated_data:
+            relations.append({
+                field: attrs.pop(field.name)
+                for field in relation_fields if field.name in attrs
+            })
+            objs.append(model(**attrs))
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            model.objects.bulk_create(objs)
+        else:
+            # Primary keys of bulk inserted rows are unknown on this backend
+            for obj in objs:
+                obj.save()
+
+        related_pks = self.set_relations(objs, relations, replace=False)
+        self.notify(model, objs, related_pks)
+
+        return objs
+
+    def update(self, instances, validated_data):
+        """Updates all items and replaces their given relations"""
+        model = self.child.Meta.model
+        if instances:
+            self.resolve_names(validated_data, instances[0].user_id)
+
+        relation_fields = self.get_relation_fields()
+        relations = []
+        fields = set()
+        for obj, attrs in zip(instances, validated_data):
+            relations.append({
+                field: attrs.pop(field.name)
+                for field in relation_fields if field.name in attrs
+            })
+            for name, value in attrs.items():
+                setattr(obj, name, value)
+                fields.add(name)
+
+        if fields:
+            model.objects.bulk_update(instances, fields)
+
+        related_pks = self.set_relations(instances, relations, replace=True)
+        self.notify(model, instances, related_pks)
+
+        return instances
+
+    def set_relations(self, objs, relations, replace):
+        """
+        Writes the through rows of objs relations, replacing the existing
+        ones if asked to. Returns the related pks added or removed by field.
+        """
+        related_pks = {}
+        for field in self.get_relation_fields():
+            through = field.remote_field.through
+            source = f"{field.m2m_field_name()}_id"
+            target = f"{field.m2m_reverse_field_name()}_id"
+            pks = related_pks.setdefault(field.name, set())
+            changed = [
+                (obj, related[field])
+                for obj, related in zip(objs, relations) if field in related
+            ]
+            if not changed:
+                continue
+
+            if replace:
+                existing = through.objects.filter(**{
+                    f"{source}__in": [obj.pk for obj, _ in changed],
+                })
+                pks.update(existing.values_list(target, flat=True))
+                existing.delete()
+
+            rows = []
+            for obj, related_objs in changed:
+                for related_pk in {related.pk for related in related_objs}:
+                    rows.append(through(**{
+                        source: obj.pk,
+                        target: related_pk,
+                    }))
+                    pks.add(related_pk)
+
+            through.objects.bulk_create(rows)
+
+        names = [field.name for field in self.get_relation_fields()]
+        if names:
+            prefetch_related_objects(objs, *names)
+
+        return related_pks
+
+    def notify(self, model, objs, related_pks):
+        """Sends the bulk changed signal for each owner of objs"""
+        pks_by_user = {}
+        for obj in objs:
+            pks_by_user.setdefault(obj.user_id, []).append(obj.pk)
+
+        for user_id, pks in pks_by_user.items():
+            bulk_changed.send(
+                sender=model,
+                user_id=user_id,
+                pks=pks,
+                related_pks=related_pks,
+            )
+
+
+class BulkModelMixin:
+    """
+    Creates, partially updates or deletes many objects owned by the logged
+    user with one request. Each batch is validated as a whole and written in
+    a single transaction, nothing is written unless every item is valid.
+    """
+    @action(methods=["POST", "PATCH", "DELETE"], detail=False,
+            url_path="bulk")
+    def bulk(self, request):
+        """Dispatches bulk requests by method"""
+        items = request.data
+        if not isinstance(items, list):
+            msg = _("Expected a list of items.")
+            return Response(
+                {"non_field_errors": [msg]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if len(items) > settings.RECIPES_BULK_MAX_ITEMS:
+            msg = _("Ensure there are no more than %(max)d items.") % {
+                "max": settings.RECIPES_BULK_MAX_ITEMS,
+            }
+            return Response(
+                {"non_field_errors": [msg]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        handlers = {
+            "POST": self.bulk_create,
+            "PATCH": self.bulk_update,
+            "DELETE": self.bulk_destroy,
+        }
+
+        return handlers[request.method](items)
+
+    def get_bulk_serializer(self, items, instances=None, partial=False):
+        """Returns a list serializer validating items in one pass"""
+        serializer = self.get_serializer(
+            instances,
+            data=items,
+            many=True,
+            partial=partial,
+        )
+        serializer.context.update(
+            self.get_bulk_context(serializer, items, instances or [])
+        )
+
+        return serializer
+
+    def get_bulk_context(self, serializer, items, instances):
+        """Returns the context shared by the validation of all items"""
+        return {"preloaded": preload_related(serializer, items)}
+
+    def get_bulk_instances(self, pks):
+        """
+        Returns the logged user's objects of pks in order, and the per item
+        errors of the pks that are invalid or not found.
+        """
+        valid_pks = []
+        for pk in pks:
+            try:
+                valid_pks.append(int(pk))
+            except (TypeError, ValueError):
+                valid_pks.append(None)
+
+        found = self.get_queryset().order_by().in_bulk(
+            {pk for pk in valid_pks if pk is not None}
+        )
+        errors = []
+        seen = set()
+        for pk in valid_pks:
+            if pk is None:
+                errors.append({"id": [_("A valid integer is required.")]})
+            elif pk not in found:
+                errors.append({"id": [_("Not found.")]})
+            elif pk in seen:
+                errors.append({"id": [_("Duplicated item.")]})
+            else:
+                errors.append({})
+            seen.add(pk)
+
+        return [found.get(pk) for pk in valid_pks], errors
+
+    def save_bulk(self, serializer, get_serializer, response_status,
+                  **kwargs):
+        """
+        Validates the items of serializer and writes them in one
+        transaction. Writes conflicting with rows committed since validating,
+        like of names taken meanwhile, are rolled back and the items are
+        validated again by a serializer from get_serializer to report the
+        ones at fault.
+        """
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError:
+            serializer = get_serializer()
+            if serializer.is_valid():
+                raise
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(serializer.data, status=response_status)
+
+    def bulk_create(self, items):
+        """Creates all items for the logged user"""
+        return self.save_bulk(
+            self.get_bulk_serializer(items),
+            lambda: self.get_bulk_serializer(items),
+            status.HTTP_201_CREATED,
+            user=self.request.user,
+        )
+
+    def bulk_update(self, items):
+        """Partially updates all items, each identified by its id"""
+        pks = [item.get("id") if isinstance(item, dict) else None
+               for item in items]
+        instances, errors = self.get_bulk_instances(pks)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # The instances changed by a failed write are fetched again
+        return self.save_bulk(
+            self.get_bulk_serializer(items, instances, partial=True),
+            lambda: self.get_bulk_serializer(
+                items, self.get_bulk_instances(pks)[0], partial=True
+            ),
+            status.HTTP_200_OK,
+        )
+
+    def bulk_destroy(self, pks):
+        """Deletes the objects of all the given ids"""
+        instances, errors = self.get_bulk_instances(pks)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            self.queryset.filter(
+                pk__in=[instance.pk for instance in instances]
+            ).delete()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
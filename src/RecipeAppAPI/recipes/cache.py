@@ -0,0 +1,62 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core import metrics
+
+
+class ResponseCache:
+    """
+    Caches serialized list and detail payloads of the recipe models APIs.
+
+    Keys are made of the user, its collection version, the action and the
+    full request URL. Any change to a user's recipes, tags or ingredients
+    bumps the version, so the stale entries of that user are never read
+    again and age out of the backend by TTL or LRU eviction.
+    """
+    def __init__(self, prefix="recipes"):
+        self.prefix = prefix
+        self.stats = metrics.HitMissCounter()
+
+    @property
+    def cache(self):
+        """Returns the configured cache backend"""
+        return caches[settings.RECIPES_RESPONSE_CACHE_ALIAS]
+
+    def make_key(self, request, action, version, modified):
+        """Returns the cache key of a request payload"""
+        url = request.build_absolute_uri().encode()
+        digest = hashlib.md5(url).hexdigest()
+
+        return (
+            f"{self.prefix}:{request.user.pk}:{version}:"
+            f"{modified.timestamp()}:{action}:{digest}"
+        )
+
+    def respond(self, request, action, state, view):
+        """Returns the cached response of a request or caches view's one"""
+        key = self.make_key(request, action, *state)
+        data = self.cache.get(key)
+        if data is not None:
+            self.stats.hit()
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        self.stats.miss()
+        response = view()
+        if response.status_code == status.HTTP_200_OK and not getattr(
+            response, "streaming", False
+        ):
+            self.cache.set(key, response.data)
+        response["X-Cache"] = "MISS"
+
+        return response
+
+
+response_cache = ResponseCache()
+metrics.register("response_cache", response_cache.stats.as_dict)
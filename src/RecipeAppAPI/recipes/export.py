@@ -0,0 +1,17 @@
+from recipes.fastpath import ValuesSerializer
+
+
+class RecipeExportSerializer(ValuesSerializer):
+    """
+    Values rendering of recipes for exports, holding the names of their
+    tags and ingredients instead of their ids.
+
+    Exports are streamed a chunk of recipes at a time, so the names are
+    fetched with one query per relation per chunk rather than aggregated
+    by the rows query.
+    """
+    aggregate_relations = False
+
+    def related_column(self, relation):
+        """Returns the name column of the related objects"""
+        return f"{relation.field.m2m_reverse_field_name()}__name"
@@ -0,0 +1,158 @@
+from django.db import connection
+from django.db.models import IntegerField, OuterRef, Subquery
+
+from rest_framework import serializers
+
+
+# Fields whose values are rendered as the database returns them
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+)
+
+
+class ValuesSerializer:
+    """
+    Read only rendering of model rows fetched with values() into the plain
+    dicts a ModelSerializer renders for the same objects, without building
+    model instances or running the serializer field machinery per object.
+
+    Supports model fields and many to many primary key relations, rendered
+    as ids sorted ascending. Relation ids are aggregated into arrays by the
+    query itself on Postgres, and fetched with one query per relation per
+    page elsewhere.
+    """
+    # Whether relation ids may be aggregated by the rows query on Postgres
+    aggregate_relations = True
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.fields = []
+        self.columns = {}
+        self.relations = {}
+        self.converters = {}
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            self.fields.append(name)
+            if isinstance(field, serializers.ManyRelatedField) and isinstance(
+                field.child_relation, serializers.PrimaryKeyRelatedField
+            ):
+                self.relations[name] = getattr(self.model, field.source)
+            elif isinstance(field, serializers.BaseSerializer) or (
+                field.source == "*" or "." in field.source
+            ):
+                raise TypeError(f"Can't render {name} from values rows.")
+            else:
+                self.columns[name] = field.source
+                if not isinstance(field, PASSTHROUGH_FIELDS):
+                    self.converters[name] = field.to_representation
+
+    @staticmethod
+    def ids_key(name):
+        """Returns the row key of the related ids of a relation"""
+        return f"{name}_ids"
+
+    def through_columns(self, relation):
+        """Returns the recipe and related object columns of a relation"""
+        field = relation.field
+        return (
+            f"{field.m2m_field_name()}_id",
+            f"{field.m2m_reverse_field_name()}_id",
+        )
+
+    def related_column(self, relation):
+        """Returns the through table column rendered for related objects"""
+        return self.through_columns(relation)[1]
+
+    def rows(self, queryset, extra=()):
+        """
+        Returns the values queryset of the rows to render, also holding the
+        extra columns
+        """
+        columns = list(dict.fromkeys([*self.columns.values(), "id", *extra]))
+        queryset = queryset.prefetch_related(None).values(*columns)
+        if not (
+            self.aggregate_relations and connection.vendor == "postgresql"
+        ):
+            return queryset
+
+        # Imported here as they need the Postgres driver
+        from django.contrib.postgres.aggregates import ArrayAgg
+        from django.contrib.postgres.fields import ArrayField
+
+        return queryset.annotate(**{
+            self.ids_key(name): Subquery(
+                relation.through.objects.filter(**{
+                    source: OuterRef("pk"),
+                }).order_by().values(source).annotate(
+                    ids=ArrayAgg(target, ordering=target),
+                ).values("ids"),
+                output_field=ArrayField(IntegerField()),
+            )
+            for name, relation in self.relations.items()
+            for source, target in (self.through_columns(relation),)
+        })
+
+    def fetch_relations(self, rows):
+        """Adds the related ids of rows not aggregated by the query"""
+        if not rows:
+            return
+
+        pks = [row["id"] for row in rows]
+        for name, relation in self.relations.items():
+            key = self.ids_key(name)
+            if key in rows[0]:
+                continue
+
+            source, _ = self.through_columns(relation)
+            target = self.related_column(relation)
+            related = {pk: [] for pk in pks}
+            for pk, related_pk in relation.through.objects.filter(**{
+                f"{source}__in": pks,
+            }).order_by(source, target).values_list(source, target):
+                related[pk].append(related_pk)
+
+            for row in rows:
+                row[key] = related[row["id"]]
+
+    def stream(self, rows, chunk_size):
+        """
+        Yields the rendered dicts of rows fetched by rows() in lists of
+        chunk_size, reading rows from the database a chunk at a time
+        """
+        chunk = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield self.render(chunk)
+                chunk = []
+
+        if chunk:
+            yield self.render(chunk)
+
+    def render(self, rows):
+        """Returns the rendered dicts of rows fetched by rows()"""
+        rows = list(rows)
+        self.fetch_relations(rows)
+        sources = [
+            self.columns[name] if name in self.columns else self.ids_key(name)
+            for name in self.fields
+        ]
+        converters = self.converters.items()
+        rendered = []
+        for row in rows:
+            item = {
+                name: row[source]
+                for name, source in zip(self.fields, sources)
+            }
+            for name, convert in converters:
+                if item[name] is not None:
+                    item[name] = convert(item[name])
+            for name in self.relations:
+                item[name] = item[name] or []
+            rendered.append(item)
+
+        return rendered
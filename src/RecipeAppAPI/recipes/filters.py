@@ -0,0 +1,168 @@
+from decimal import Decimal
+
+from django.core import exceptions
+from django.db.models import Exists, OuterRef
+from django.utils.translation import gettext as _
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+
+from core.models import Tag, Ingredient, Recipe
+
+
+MATCH_ANY = "any"
+MATCH_ALL = "all"
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+
+
+def parse_names(value):
+    """Returns the unique non-empty names of a comma separated value"""
+    names = []
+    for name in value.split(","):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+
+    return names
+
+
+def resolve_names(model, user, names):
+    """Maps each name to the ids of the user's objects having that name"""
+    ids_by_name = {}
+    rows = model.objects.filter(user=user, name__in=names).values_list(
+        "name", "id"
+    )
+    for name, pk in rows:
+        ids_by_name.setdefault(name, []).append(pk)
+
+    return ids_by_name
+
+
+class RecipeRelatedNameFilter:
+    """
+    Filters recipes by the names of their tags or ingredients.
+
+    Names are resolved to ids once, then matched with EXISTS semi-joins
+    against the M2M through table, so a recipe is never repeated however
+    many of the requested names it matches.
+    """
+    def __init__(self, relation, model):
+        self.relation = relation
+        self.model = model
+        self.through = getattr(Recipe, relation).through
+        self.column = f"{model._meta.model_name}_id"
+
+    def get_match(self, query_params):
+        """Returns the requested matching mode of the relation names"""
+        match = query_params.get(f"{self.relation}_match", MATCH_ANY)
+        if match not in MATCH_CHOICES:
+            raise ValidationError({
+                f"{self.relation}_match": _(
+                    "Must be one of: %(choices)s."
+                ) % {"choices": ", ".join(MATCH_CHOICES)},
+            })
+
+        return match
+
+    def related_exists(self, ids):
+        """Returns a semi-join matching recipes related to any of ids"""
+        return Exists(self.through.objects.filter(
+            recipe_id=OuterRef("pk"),
+            **{f"{self.column}__in": ids}
+        ))
+
+    def filter_queryset(self, queryset, user, query_params):
+        """Returns the queryset narrowed by the relation query parameters"""
+        value = query_params.get(self.relation)
+        if not value:
+            return queryset
+
+        names = parse_names(value)
+        match = self.get_match(query_params)
+        if not names:
+            # Only separators, like an empty value, filter nothing out
+            return queryset
+
+        ids_by_name = resolve_names(self.model, user, names)
+
+        if match == MATCH_ALL:
+            if len(ids_by_name) < len(names):
+                return queryset.none()
+
+            for ids in ids_by_name.values():
+                queryset = queryset.filter(self.related_exists(ids))
+
+            return queryset
+
+        ids = [pk for ids in ids_by_name.values() for pk in ids]
+        if not ids:
+            return queryset.none()
+
+        return queryset.filter(self.related_exists(ids))
+
+
+class RecipeRangeFilter:
+    """
+    Filters recipes by a range of values of a field, given by the min_ and
+    max_ prefixed field query parameters.
+
+    Backed by the (user, field, id) index of the field on Recipe.
+    """
+    def __init__(self, field):
+        self.field = field
+        self.model_field = Recipe._meta.get_field(field)
+
+    def parse(self, name, value):
+        """Returns the value of a bound converted to the field type"""
+        try:
+            value = self.model_field.to_python(value)
+        except exceptions.ValidationError:
+            value = None
+
+        if value is None or not Decimal(value).is_finite():
+            raise ValidationError({name: [_("A valid number is required.")]})
+
+        return value
+
+    def filter_queryset(self, queryset, user, query_params):
+        """Returns the queryset narrowed to the requested range"""
+        for bound, lookup in (("min", "gte"), ("max", "lte")):
+            name = f"{bound}_{self.field}"
+            value = query_params.get(name)
+            if value:
+                queryset = queryset.filter(**{
+                    f"{self.field}__{lookup}": self.parse(name, value),
+                })
+
+        return queryset
+
+
+class KeysetOrderingFilter(OrderingFilter):
+    """
+    Orders objects by the ordering query parameter, ties being ordered by
+    id in the same direction so that every object has its own position in
+    the cursors of KeysetCursorPagination.
+    """
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if ordering and ordering[-1].lstrip("-") != "id":
+            descending = ordering[-1].startswith("-")
+            ordering.append("-id" if descending else "id")
+
+        return ordering
+
+
+RECIPE_FILTERS = (
+    RecipeRelatedNameFilter("tags", Tag),
+    RecipeRelatedNameFilter("ingredients", Ingredient),
+    RecipeRangeFilter("price"),
+    RecipeRangeFilter("time_minutes"),
+)
+
+
+def filter_recipes(queryset, user, query_params):
+    """Applies all recipe list filters requested by query_params"""
+    for recipe_filter in RECIPE_FILTERS:
+        queryset = recipe_filter.filter_queryset(queryset, user, query_params)
+
+    return queryset
@@ -0,0 +1,177 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from PIL import Image, ImageOps
+
+from core import storage
+from core.models import Recipe, RecipeImageRendition
+
+
+logger = logging.getLogger(__name__)
+
+# Pillow save options of each rendition format by file extension
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Returns the worker pool rendering images, creating it once"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix="recipe-images",
+            )
+
+    return _executor
+
+
+def schedule_renditions(recipe):
+    """
+    Drops the renditions of the replaced image, marks the recipe image as
+    pending and queues rendering it once the current transaction commits.
+    Runs inline when the pipeline is eager.
+    """
+    for rendition in recipe.image_renditions.all():
+        rendition.delete()
+    recipe.image_status = Recipe.IMAGE_PENDING if recipe.image else ""
+    Recipe.objects.filter(pk=recipe.pk).update(
+        image_status=recipe.image_status
+    )
+    if not recipe.image:
+        return
+
+    if settings.RECIPE_IMAGE_PIPELINE_EAGER:
+        render_recipe_image(recipe.pk, recipe.image.name)
+    else:
+        transaction.on_commit(lambda: get_executor().submit(
+            run_render_job, recipe.pk, recipe.image.name
+        ))
+
+
+def run_render_job(recipe_id, image_name):
+    """Renders a recipe image from a worker thread"""
+    try:
+        render_recipe_image(recipe_id, image_name)
+    except Exception:
+        logger.exception("Rendering image of recipe %s failed", recipe_id)
+        Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+            image_status=Recipe.IMAGE_FAILED
+        )
+    finally:
+        connection.close()
+
+
+def encode_renditions(image):
+    """Yields the name, extension, size and bytes of each rendition"""
+    for name, size in settings.RECIPE_IMAGE_RENDITIONS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        for extension, (image_format, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, format=image_format, **options)
+            yield name, extension, resized.size, buffer.getvalue()
+
+
+def shared_renditions(recipe_id, image_name):
+    """
+    Returns copies of the renditions of another recipe having the same
+    stored image, sharing their files, or None if there is no such recipe
+    """
+    source_id = Recipe.objects.filter(
+        image=image_name,
+        image_status=Recipe.IMAGE_READY,
+    ).exclude(pk=recipe_id).values_list("pk", flat=True).first()
+    if source_id is None:
+        return None
+
+    return [
+        RecipeImageRendition(
+            recipe_id=recipe_id,
+            name=rendition.name,
+            format=rendition.format,
+            width=rendition.width,
+            height=rendition.height,
+            file=rendition.file.name,
+        )
+        for rendition in RecipeImageRendition.objects.filter(
+            recipe_id=source_id
+        )
+    ]
+
+
+def create_renditions(recipe, image_name):
+    """Decodes a recipe image once and saves its resized renditions"""
+    with recipe.image.open("rb") as image_file:
+        image = Image.open(image_file)
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    renditions = []
+    for name, extension, (width, height), data in encode_renditions(image):
+        rendition = RecipeImageRendition(
+            recipe_id=recipe.pk,
+            name=name,
+            format=extension,
+            width=width,
+            height=height,
+        )
+        rendition.file.save(
+            f"{stem}-{name}.{extension}",
+            ContentFile(data),
+            save=False,
+        )
+        renditions.append(rendition)
+
+    return renditions
+
+
+def render_recipe_image(recipe_id, image_name):
+    """
+    Saves the renditions of a recipe image, replacing the previous ones.
+    Recipes sharing the same stored image share its renditions as well.
+    Renditions of an image that was replaced meanwhile are discarded.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only("image").first()
+    if recipe is None or recipe.image.name != image_name:
+        return
+
+    renditions = shared_renditions(recipe_id, image_name)
+    if renditions is None:
+        renditions = create_renditions(recipe, image_name)
+
+    with transaction.atomic():
+        updated = Recipe.objects.select_for_update().filter(
+            pk=recipe_id, image=image_name
+        ).first()
+        if updated is None:
+            for rendition in renditions:
+                storage.release(
+                    RecipeImageRendition._meta.get_field("file"),
+                    rendition.file.name,
+                )
+            return
+
+        # Created first, so that files shared with them aren't released
+        old_renditions = list(updated.image_renditions.all())
+        RecipeImageRendition.objects.bulk_create(renditions)
+        for old_rendition in old_renditions:
+            old_rendition.delete()
+        Recipe.objects.filter(pk=recipe_id).update(
+            image_status=Recipe.IMAGE_READY
+        )
+        get_user_model().objects.touch_collection(updated.user_id)
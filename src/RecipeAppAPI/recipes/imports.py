@@ -0,0 +1,389 @@
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from rest_framework import exceptions, serializers, status
+
+from core.models import Tag, Ingredient, Recipe, RecipeImport
+from core.renderers import CSVRenderer, NDJSONRenderer
+from core.signals import bulk_changed
+
+from recipes.serializers import RecipeRecordSerializer
+from recipes.uploads import CHUNK_SIZE, UploadTooLarge
+
+
+logger = logging.getLogger(__name__)
+
+# Import formats by the media type of uploaded files
+IMPORT_FORMATS = {
+    NDJSONRenderer.media_type: RecipeImport.FORMAT_NDJSON,
+    CSVRenderer.media_type: RecipeImport.FORMAT_CSV,
+}
+
+# Relations of imported recipes, given by names, and the models they name
+RELATIONS = (("ingredients", Ingredient), ("tags", Tag))
+
+# Errors of malformed files, reported to the user as is
+FILE_ERRORS = (UnicodeDecodeError, csv.Error)
+
+# Statuses of imports uploading, waiting for a worker or being written
+QUEUED_STATUSES = (RecipeImport.STATUS_PENDING, RecipeImport.STATUS_RUNNING)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ImportInProgress(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("An import of your recipes is already in progress.")
+    default_code = "import_in_progress"
+
+
+class ImportNotResumable(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("Only failed imports can be resumed.")
+    default_code = "import_not_resumable"
+
+
+class ImportsBusy(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many imports are queued, retry later.")
+    default_code = "imports_busy"
+    # Seconds sent in the Retry-After header
+    wait = 60
+
+
+class ImportAbandoned(Exception):
+    """Raised by a worker writing an import given up on as stale"""
+
+
+def get_executor():
+    """Returns the worker pool running imports, creating it once"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPES_IMPORT_WORKERS,
+                thread_name_prefix="recipe-imports",
+            )
+
+    return _executor
+
+
+def get_import_format(content_type):
+    """Returns the import format of a request content type"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type not in IMPORT_FORMATS:
+        raise exceptions.UnsupportedMediaType(media_type)
+
+    return IMPORT_FORMATS[media_type]
+
+
+def fail_stale_imports(queryset):
+    """
+    Marks the imports of queryset queued without any progress for
+    RECIPES_IMPORT_STALE_SECONDS as failed, so that they can be resumed.
+    Their worker was lost, like when its process was restarted.
+    """
+    now = timezone.now()
+    stale_seconds = settings.RECIPES_IMPORT_STALE_SECONDS
+
+    return queryset.filter(
+        status__in=QUEUED_STATUSES,
+        modified__lt=now - timedelta(seconds=stale_seconds),
+    ).update(
+        status=RecipeImport.STATUS_FAILED,
+        error=_("The import stopped making progress."),
+        modified=now,
+    )
+
+
+def touch_import(job):
+    """Records that job is making progress, keeping it from going stale"""
+    RecipeImport.objects.filter(
+        pk=job.pk, status__in=QUEUED_STATUSES
+    ).update(modified=timezone.now())
+
+
+def start_import(user, import_format, job=None):
+    """
+    Creates a pending import of user's recipes, or marks job as pending
+    again, unless one is already queued for the user or too many are
+    queued overall. Stale imports are failed first and don't count.
+    """
+    with transaction.atomic():
+        # Serializes the imports started by the same user
+        get_user_model().objects.select_for_update().filter(
+            pk=user.pk
+        ).exists()
+        fail_stale_imports(RecipeImport.objects.all())
+        queued = RecipeImport.objects.filter(status__in=QUEUED_STATUSES)
+        if queued.filter(user=user).exists():
+            raise ImportInProgress()
+        if queued.count() >= settings.RECIPES_IMPORT_MAX_QUEUED:
+            raise ImportsBusy()
+
+        if job is None:
+            return RecipeImport.objects.create(
+                user=user, format=import_format
+            )
+
+        job.status = RecipeImport.STATUS_PENDING
+        job.save(update_fields=["status", "modified"])
+
+        return job
+
+
+def receive_file(stream, path, max_size, heartbeat=None):
+    """
+    Writes stream to path a buffer at a time, raising UploadTooLarge once
+    more than max_size bytes are read. Calls heartbeat, if any, a few times
+    per RECIPES_IMPORT_STALE_SECONDS while receiving.
+    """
+    interval = settings.RECIPES_IMPORT_STALE_SECONDS / 4
+    beat = time.monotonic()
+    size = 0
+    with open(path, "wb") as file:
+        while stream is not None:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge()
+            file.write(chunk)
+            if heartbeat is not None and time.monotonic() - beat > interval:
+                heartbeat()
+                beat = time.monotonic()
+
+
+def read_ndjson(file):
+    """Yields the objects of the lines of a binary file, None if invalid"""
+    for line in file:
+        if not line.strip():
+            continue
+
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def read_csv(file):
+    """
+    Yields the rows of a binary CSV file as dicts of its header columns,
+    with the names of relation cells split on semicolons
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    for row in csv.DictReader(text):
+        for relation, _model in RELATIONS:
+            value = row.get(relation)
+            if isinstance(value, str):
+                row[relation] = [
+                    name.strip() for name in value.split(";") if name.strip()
+                ]
+        yield row
+
+
+READERS = {
+    RecipeImport.FORMAT_NDJSON: read_ndjson,
+    RecipeImport.FORMAT_CSV: read_csv,
+}
+
+
+def batched(records, size):
+    """Yields lists of up to size records, reading them lazily"""
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, size))
+        if not batch:
+            return
+
+        yield batch
+
+
+def validate_records(records):
+    """Returns the validated data of the valid records"""
+    serializer = RecipeRecordSerializer()
+    valid = []
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+
+        try:
+            valid.append(serializer.run_validation(record))
+        except serializers.ValidationError:
+            pass
+
+    return valid
+
+
+def write_batch(job, records):
+    """
+    Creates the recipes of the valid records and their relations in one
+    transaction, also advancing the progress of job. Names are resolved to
+    objects once for the whole batch.
+    """
+    valid = validate_records(records)
+    with transaction.atomic():
+        # Stops a worker given up on as stale, the import being resumable
+        if not RecipeImport.objects.select_for_update().filter(
+            pk=job.pk,
+            status=RecipeImport.STATUS_RUNNING,
+            records_done=job.records_done,
+        ).exists():
+            raise ImportAbandoned(job.pk)
+
+        named = {
+            relation: model.objects.get_or_create_by_names(
+                job.user_id,
+                {name for attrs in valid for name in attrs.get(relation, ())},
+            )
+            for relation, model in RELATIONS
+        }
+        objs = []
+        relations = []
+        for attrs in valid:
+            relations.append({
+                relation: set(attrs.pop(relation, ()))
+                for relation, _model in RELATIONS
+            })
+            objs.append(Recipe(user_id=job.user_id, **attrs))
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            write_recipes(job, objs, relations, named)
+        else:
+            # Primary keys of bulk inserted rows are unknown on this backend,
+            # recipes are saved one at a time along their model signals
+            for obj, names in zip(objs, relations):
+                obj.save()
+                for relation, _model in RELATIONS:
+                    getattr(obj, relation).add(*(
+                        named[relation][name] for name in names[relation]
+                    ))
+
+        job.records_done += len(records)
+        job.recipes_created += len(objs)
+        job.records_rejected += len(records) - len(objs)
+        job.save(update_fields=[
+            "records_done", "recipes_created", "records_rejected", "modified",
+        ])
+
+
+def write_recipes(job, objs, relations, named):
+    """
+    Bulk creates recipes and their relations to the named objects. Their
+    rollup and the recipe counts of the named objects are added to rather
+    than recomputed from the user's whole library.
+    """
+    Recipe.objects.bulk_create(objs)
+
+    related_pks = {}
+    for relation, model in RELATIONS:
+        through = getattr(Recipe, relation).through
+        column = f"{model._meta.model_name}_id"
+        rows = [
+            through(recipe_id=obj.pk, **{
+                column: named[relation][name].pk,
+            })
+            for obj, names in zip(objs, relations)
+            for name in names[relation]
+        ]
+        through.objects.bulk_create(rows)
+        related_pks[relation] = {getattr(row, column) for row in rows}
+
+    if objs:
+        bulk_changed.send(
+            sender=Recipe,
+            user_id=job.user_id,
+            pks=[obj.pk for obj in objs],
+            related_pks=related_pks,
+            created=True,
+        )
+
+
+def run_import(job, batch_size=None, progress=None):
+    """
+    Imports the records of a job's file in batches, resuming after the
+    records of the batches already written. Records are read lazily so
+    memory use is bounded by the batch size whatever the file size.
+    Calls progress with the job after each batch. The file is removed once
+    imported, and kept to resume from if the import fails.
+    """
+    batch_size = batch_size or settings.RECIPES_IMPORT_BATCH_SIZE
+    job.refresh_from_db()
+    job.status = RecipeImport.STATUS_RUNNING
+    job.error = ""
+    job.save(update_fields=["status", "error", "modified"])
+
+    try:
+        with open(job.path, "rb") as file:
+            records = itertools.islice(
+                READERS[job.format](file), job.records_done, None
+            )
+            for batch in batched(records, batch_size):
+                write_batch(job, batch)
+                if progress is not None:
+                    progress(job)
+    except ImportAbandoned:
+        # The import was failed, and maybe resumed, by another request
+        raise
+    except Exception as exc:
+        job.status = RecipeImport.STATUS_FAILED
+        if isinstance(exc, FILE_ERRORS):
+            job.error = str(exc)
+        else:
+            job.error = _("The import failed unexpectedly.")
+        # The progress of a failed batch was rolled back
+        job.save(update_fields=["status", "error", "modified"])
+        raise
+
+    job.status = RecipeImport.STATUS_DONE
+    job.save(update_fields=["status", "modified"])
+    try:
+        os.remove(job.path)
+    except FileNotFoundError:
+        pass
+
+
+def run_logged_import(job):
+    """Runs an import, logging its failure instead of raising it"""
+    try:
+        run_import(job)
+    except Exception:
+        logger.exception("Importing recipes of import %s failed", job.pk)
+
+
+def run_import_job(job_id):
+    """Runs an import from a worker thread"""
+    try:
+        run_logged_import(RecipeImport.objects.get(pk=job_id))
+    finally:
+        connection.close()
+
+
+def schedule_import(job):
+    """
+    Queues running an import once the current transaction commits. Runs
+    inline when imports are eager.
+    """
+    if settings.RECIPES_IMPORT_EAGER:
+        run_logged_import(job)
+    else:
+        transaction.on_commit(
+            lambda: get_executor().submit(run_import_job, job.pk)
+        )
@@ -0,0 +1,80 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core import metrics
+
+
+class VersionedIndexCache:
+    """
+    Bounded LRU cache of in-process indexes built per user. Indexes are
+    keyed by the collection version they were built at, so any change to a
+    user's recipes, tags or ingredients rebuilds the index on next use.
+    """
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+        self._lock = threading.Lock()
+        self._indexes = OrderedDict()
+        self.stats = metrics.HitMissCounter()
+        metrics.register(name, self.as_dict)
+
+    def get(self, user_id, version):
+        """Returns the index of a user's objects at a collection version"""
+        with self._lock:
+            entry = self._indexes.get(user_id)
+            if entry is not None and entry[0] == version:
+                self._indexes.move_to_end(user_id)
+                self.stats.hit()
+                return entry[1]
+
+        self.stats.miss()
+        index = self.build(user_id)
+        with self._lock:
+            self._indexes[user_id] = (version, index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > settings.RECIPES_INDEX_MAX_USERS:
+                self._indexes.popitem(last=False)
+
+        return index
+
+    def clear(self):
+        """Drops all the cached indexes"""
+        with self._lock:
+            self._indexes.clear()
+
+    def as_dict(self):
+        """Returns the cache metrics"""
+        stats = self.stats.as_dict()
+        stats["size"] = len(self._indexes)
+
+        return stats
+
+
+class PrefixIndex:
+    """
+    Case insensitive prefix index of object names, a sorted array searched
+    by bisection
+    """
+    def __init__(self, objects):
+        entries = sorted(
+            (name.casefold(), name, pk) for pk, name in objects
+        )
+        self.keys = [key for key, _name, _pk in entries]
+        self.entries = [(pk, name) for _key, name, pk in entries]
+
+    def complete(self, prefix, limit):
+        """Returns the ids and names of the first names starting by prefix"""
+        prefix = prefix.casefold()
+        start = bisect.bisect_left(self.keys, prefix)
+        results = []
+        for key, entry in zip(
+            self.keys[start:start + limit], self.entries[start:start + limit]
+        ):
+            if not key.startswith(prefix):
+                break
+            results.append(entry)
+
+        return results
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.benchmarks import SCENARIOS, summarize, without_indexes
+
+
+class Command(BaseCommand):
+    """Django command to report query plans and latencies of scenarios."""
+    help = "Benchmarks recipe queries against a user's library."
+
+    def add_arguments(self, parser):
+        parser.add_argument("email")
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=sorted(SCENARIOS),
+            help="Scenario to run, may be repeated. Defaults to all.",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--explain", action="store_true")
+        parser.add_argument(
+            "--compare-indexes",
+            action="store_true",
+            help="Also run the scenarios without the designed indexes, "
+                 "locking their tables meanwhile. Use a copy of the "
+                 "database rather than a live one.",
+        )
+        parser.add_argument(
+            "--allow-locking",
+            action="store_true",
+            help="Allow --compare-indexes to lock tables when DEBUG is off.",
+        )
+
+    def handle(self, *args, **options):
+        """The actual logic for the command"""
+        if options["compare_indexes"] and not (
+            settings.DEBUG or options["allow_locking"]
+        ):
+            raise CommandError(
+                "--compare-indexes locks the tables of the indexes until "
+                "the scenarios ran. Pass --allow-locking to run it against "
+                "a copy of the database, or with DEBUG on."
+            )
+
+        try:
+            user = get_user_model().objects.get(email=options["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['email']} does not exist")
+
+        if options["compare_indexes"]:
+            self.stdout.write(self.style.MIGRATE_LABEL("Without indexes:"))
+            with without_indexes():
+                self.run_scenarios(user, options)
+            self.stdout.write(self.style.MIGRATE_LABEL("With indexes:"))
+
+        self.run_scenarios(user, options)
+
+    def run_scenarios(self, user, options):
+        """Reports the latencies and plans of the cases of the scenarios"""
+        for name in options["scenario"] or sorted(SCENARIOS):
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}:"))
+            for case in SCENARIOS[name](user):
+                stats = summarize(*case.measure(options["repeat"]))
+                self.stdout.write(f"  {case.label}: " + ", ".join(
+                    f"{key}={value}" for key, value in stats.items()
+                ))
+                if options["explain"]:
+                    for line in case.explain().splitlines():
+                        self.stdout.write(f"    {line}")
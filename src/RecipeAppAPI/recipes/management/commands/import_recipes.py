@@ -0,0 +1,93 @@
+import os
+import shutil
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ValidationError
+
+from core.models import RecipeImport
+
+from recipes.imports import run_import
+
+
+class Command(BaseCommand):
+    """Django command to import a file of recipes into a user's library."""
+    help = (
+        "Imports the recipes of an NDJSON or CSV file, formatted like "
+        "exports, in batches. Failed imports are resumed with --resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", nargs="?")
+        parser.add_argument("path", nargs="?")
+        parser.add_argument(
+            "--format",
+            choices=[choice for choice, _ in RecipeImport.FORMAT_CHOICES],
+            help="File format, guessed from the file extension by default.",
+        )
+        parser.add_argument("--resume", metavar="IMPORT_ID")
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        """The actual logic for the command"""
+        if options["resume"]:
+            job = self.get_failed_import(options["resume"])
+        elif options["email"] and options["path"]:
+            job = self.create_import(
+                options["email"], options["path"], options["format"]
+            )
+        else:
+            raise CommandError("Give an email and a path, or --resume.")
+
+        self.stdout.write(f"Importing with import {job.pk}..")
+        try:
+            run_import(job, options["batch_size"], self.report)
+        except Exception as exc:
+            raise CommandError(
+                f"Import {job.pk} failed after {job.records_done} records: "
+                f"{exc}. Resume it with --resume {job.pk}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {job.recipes_created} recipes, rejected "
+            f"{job.records_rejected} invalid records"
+        ))
+
+    def get_failed_import(self, import_id):
+        """Returns the import of import_id unless it is done"""
+        try:
+            job = RecipeImport.objects.get(pk=import_id)
+        except (RecipeImport.DoesNotExist, ValidationError):
+            raise CommandError(f"Import {import_id} doesn't exist.")
+
+        if job.status == RecipeImport.STATUS_DONE:
+            raise CommandError(f"Import {import_id} is already done.")
+
+        return job
+
+    def create_import(self, email, path, import_format):
+        """Creates an import of a copy of the file of path"""
+        user = get_user_model().objects.filter(email=email).first()
+        if user is None:
+            raise CommandError(f"User {email} doesn't exist.")
+        if not os.path.isfile(path):
+            raise CommandError(f"File {path} doesn't exist.")
+
+        if import_format is None:
+            import_format = os.path.splitext(path)[1].lstrip(".").lower()
+            if import_format not in dict(RecipeImport.FORMAT_CHOICES):
+                raise CommandError("Give the file format with --format.")
+
+        job = RecipeImport.objects.create(user=user, format=import_format)
+        # Kept along the import to resume it, whatever happens to the file
+        with open(path, "rb") as source, open(job.path, "wb") as target:
+            shutil.copyfileobj(source, target)
+
+        return job
+
+    def report(self, job):
+        """Writes the progress of an import"""
+        self.stdout.write(
+            f"Read {job.records_done} records, created "
+            f"{job.recipes_created} recipes.."
+        )
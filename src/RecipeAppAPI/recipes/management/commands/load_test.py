@@ -0,0 +1,219 @@
+import asyncio
+import io
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.handlers import ThreadPoolASGIHandler
+from recipes.benchmarks import summarize
+
+
+HANDLERS = ("asgi", "wsgi")
+
+
+class InFlight:
+    """Thread safe count of the requests being served, and its maximum"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.max = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.max = max(self.max, self.current)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.current -= 1
+
+
+class Command(BaseCommand):
+    """Django command to compare the ASGI and WSGI handlers under load."""
+    help = (
+        "Sends concurrent requests of slow clients to the recipe, tag and "
+        "ingredient lists through the ASGI and WSGI handlers, reporting the "
+        "requests served at once and their latencies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("email")
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Path to request, may be repeated. Defaults to the lists.",
+        )
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument(
+            "--client-delay",
+            type=float,
+            default=0.05,
+            help="Seconds clients take to send requests and read responses.",
+        )
+        parser.add_argument(
+            "--wsgi-threads",
+            type=int,
+            default=settings.ASGI_THREADS,
+            help="Threads of the WSGI server, defaults to ASGI_THREADS.",
+        )
+        parser.add_argument(
+            "--handler",
+            action="append",
+            choices=HANDLERS,
+            help="Handler to load, may be repeated. Defaults to both.",
+        )
+        parser.add_argument("--host", default="localhost")
+
+    def handle(self, *args, **options):
+        """The actual logic for the command"""
+        try:
+            user = get_user_model().objects.get(email=options["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['email']} does not exist")
+
+        token, _ = Token.objects.get_or_create(user=user)
+        paths = options["path"] or [
+            reverse("recipes:recipe-list"),
+            reverse("recipes:tag-list"),
+            reverse("recipes:ingredient-list"),
+        ]
+        requests = list(itertools.islice(
+            itertools.cycle(paths), options["requests"]
+        ))
+        headers = {
+            "host": options["host"],
+            "authorization": f"Token {token.key}",
+        }
+
+        for name in options["handler"] or HANDLERS:
+            run = getattr(self, f"run_{name}")
+            start = time.perf_counter()
+            statuses, timings, in_flight = run(requests, headers, options)
+            elapsed = time.perf_counter() - start
+
+            stats = {
+                "requests": len(timings),
+                "errors": sum(status >= 400 for status in statuses),
+                "max_in_flight": in_flight.max,
+                "requests_per_sec": round(len(timings) / elapsed),
+                **{
+                    key: value
+                    for key, value in summarize(0, timings).items()
+                    if key.endswith("_ms")
+                },
+            }
+            self.stdout.write(f"{name}: " + ", ".join(
+                f"{key}={value}" for key, value in stats.items()
+            ))
+
+    def run_asgi(self, requests, headers, options):
+        """
+        Serves the requests through the ASGI handler, from clients sharing
+        the event loop
+        """
+        handler = ThreadPoolASGIHandler()
+        in_flight = InFlight()
+        statuses = []
+        timings = []
+        delay = options["client_delay"]
+        scope_headers = [
+            (key.encode(), value.encode()) for key, value in headers.items()
+        ]
+
+        async def request(path):
+            async def receive():
+                await asyncio.sleep(delay)
+                return {"type": "http.request", "body": b""}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    statuses.append(message["status"])
+                elif not message.get("more_body", False):
+                    await asyncio.sleep(delay)
+
+            start = time.perf_counter()
+            with in_flight:
+                await handler({
+                    "type": "http",
+                    "method": "GET",
+                    "path": path,
+                    "query_string": b"",
+                    "headers": scope_headers,
+                }, receive, send)
+            timings.append(time.perf_counter() - start)
+
+        async def client(pending):
+            for path in pending:
+                await request(path)
+
+        async def main():
+            pending = iter(requests)
+            await asyncio.gather(*(
+                client(pending) for _ in range(options["concurrency"])
+            ))
+
+        try:
+            asyncio.run(main())
+        finally:
+            handler.executor.shutdown()
+
+        return statuses, timings, in_flight
+
+    def run_wsgi(self, requests, headers, options):
+        """
+        Serves the requests through the WSGI handler, from a pool of
+        threads each holding a request from its first to its last byte,
+        like the workers of a threaded WSGI server
+        """
+        handler = WSGIHandler()
+        in_flight = InFlight()
+        statuses = []
+        timings = []
+        delay = options["client_delay"]
+
+        def serve(path):
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": path,
+                "wsgi.input": io.BytesIO(),
+                **{
+                    f"HTTP_{key.upper()}": value
+                    for key, value in headers.items()
+                },
+            }
+            setup_testing_defaults(environ)
+
+            def start_response(status, response_headers):
+                statuses.append(int(status.split()[0]))
+
+            with in_flight:
+                time.sleep(delay)
+                response = handler(environ, start_response)
+                try:
+                    for _ in response:
+                        pass
+                finally:
+                    response.close()
+                time.sleep(delay)
+
+        with ThreadPoolExecutor(options["wsgi_threads"]) as server:
+            def request(path):
+                start = time.perf_counter()
+                server.submit(serve, path).result()
+                timings.append(time.perf_counter() - start)
+
+            with ThreadPoolExecutor(options["concurrency"]) as clients:
+                list(clients.map(request, requests))
+
+        return statuses, timings, in_flight
@@ -0,0 +1,39 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import RecipeImageUpload, upload_temp_path
+
+
+class Command(BaseCommand):
+    """Django command to remove abandoned recipe image uploads."""
+    help = "Deletes unfinished recipe image uploads older than the expiry."
+
+    def handle(self, *args, **options):
+        """The actual logic for the command"""
+        expiry = settings.RECIPE_IMAGE_UPLOAD_EXPIRY
+        expired = RecipeImageUpload.objects.filter(
+            created__lt=timezone.now() - timedelta(seconds=expiry)
+        )
+        uploads = 0
+        for upload in expired:
+            upload.delete()
+            uploads += 1
+
+        # Streamed files left behind by interrupted multipart requests
+        files = 0
+        directory = os.path.dirname(upload_temp_path("_"))
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".upload") and (
+                entry.stat().st_mtime < time.time() - expiry
+            ):
+                os.remove(entry.path)
+                files += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {uploads} uploads and {files} files"
+        ))
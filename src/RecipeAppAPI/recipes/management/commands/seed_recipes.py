@@ -0,0 +1,115 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Tag, Ingredient, Recipe
+from core.signals import bulk_changed
+
+
+class Command(BaseCommand):
+    """Django command to fill a user's library with synthetic recipes."""
+    help = "Creates synthetic recipes, tags and ingredients for benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("email")
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--tags", type=int, default=50)
+        parser.add_argument("--ingredients", type=int, default=200)
+        parser.add_argument("--per-recipe", type=int, default=3)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        """The actual logic for the command"""
+        rand = random.Random(options["seed"])
+        users = get_user_model().objects
+        user = users.filter(email=options["email"]).first()
+        if user is None:
+            user = users.create_user(email=options["email"])
+        tag_ids = self.create_named(Tag, user, "Tag", options["tags"])
+        ingredient_ids = self.create_named(
+            Ingredient, user, "Ingredient", options["ingredients"]
+        )
+
+        created = 0
+        while created < options["recipes"]:
+            size = min(options["batch_size"], options["recipes"] - created)
+            with transaction.atomic():
+                recipe_ids = self.create_recipes(user, created, size, rand)
+                related_pks = {
+                    "tags": self.relate(
+                        Recipe.tags.through, "tag_id", recipe_ids, tag_ids,
+                        options["per_recipe"], rand,
+                    ),
+                    "ingredients": self.relate(
+                        Recipe.ingredients.through, "ingredient_id",
+                        recipe_ids, ingredient_ids, options["per_recipe"],
+                        rand,
+                    ),
+                }
+                bulk_changed.send(
+                    sender=Recipe,
+                    user_id=user.pk,
+                    pks=recipe_ids,
+                    related_pks=related_pks,
+                    created=True,
+                )
+            created += size
+            self.stdout.write(f"Created {created} recipes..")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {created} recipes for {user.email}"
+        ))
+
+    def create_named(self, model, user, prefix, count):
+        """Bulk creates count named objects and returns their ids"""
+        names = [f"{prefix} {i}" for i in range(count)]
+        queryset = model.objects.filter(user=user, name__in=names)
+        existing = set(queryset.values_list("name", flat=True))
+        model.objects.bulk_create([
+            model(user=user, name=name)
+            for name in names if name not in existing
+        ])
+
+        return list(queryset.values_list("id", flat=True))
+
+    def create_recipes(self, user, offset, count, rand):
+        """Bulk creates count recipes and returns their ids"""
+        last_id = Recipe.objects.filter(user=user).order_by("-id").values_list(
+            "id", flat=True
+        ).first() or 0
+        Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f"Recipe {offset + i}",
+                time_minutes=rand.randint(5, 240),
+                price=rand.randint(100, 99999) / 100,
+            )
+            for i in range(count)
+        ])
+
+        return list(
+            Recipe.objects.filter(user=user, id__gt=last_id).values_list(
+                "id", flat=True
+            )
+        )
+
+    def relate(self, through, column, recipe_ids, related_ids, count, rand):
+        """
+        Bulk relates each recipe to count random related objects, returns
+        the ids of the related objects
+        """
+        if not related_ids:
+            return set()
+
+        count = min(count, len(related_ids))
+        rows = [
+            through(recipe_id=recipe_id, **{column: related_id})
+            for recipe_id in recipe_ids
+            for related_id in rand.sample(related_ids, count)
+        ]
+        through.objects.bulk_create(rows)
+
+        return {getattr(row, column) for row in rows}
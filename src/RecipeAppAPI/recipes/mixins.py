@@ -0,0 +1,146 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from rest_framework.response import Response
+
+from recipes.cache import response_cache
+from recipes.fastpath import ValuesSerializer
+
+
+def get_collection_state(request):
+    """Returns the logged user's collection version and modification time"""
+    if not hasattr(request, "collection_state"):
+        request.collection_state = get_user_model().objects.filter(
+            pk=request.user.pk
+        ).values_list("collection_version", "collection_modified").get()
+
+    return request.collection_state
+
+
+def collection_etag(request, *args, **kwargs):
+    """Returns a weak ETag of the logged user's collection version"""
+    version, _ = get_collection_state(request)
+    renderer_format = request.accepted_renderer.format
+
+    return f'W/"{request.user.pk}-{version}-{renderer_format}"'
+
+
+def collection_last_modified(request, *args, **kwargs):
+    """
+    Returns the last time the logged user's collection changed, or None
+    while that is within the current second. Last-Modified has a 1 second
+    resolution, so a write later in the same second wouldn't change it and
+    clients revalidating with If-Modified-Since would get a stale 304.
+    """
+    _, modified = get_collection_state(request)
+    if int(modified.timestamp()) >= int(timezone.now().timestamp()):
+        return None
+
+    return modified
+
+
+conditional_collection = method_decorator(condition(
+    etag_func=collection_etag,
+    last_modified_func=collection_last_modified,
+))
+
+
+class ConditionalListMixin:
+    """
+    Answers list requests with 304 Not Modified while the logged user's
+    collection is unchanged, without querying or serializing the list.
+    """
+    @conditional_collection
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class ConditionalRetrieveMixin:
+    """
+    Answers retrieve requests with 304 Not Modified while the logged user's
+    collection is unchanged, without querying or serializing the object.
+    """
+    @conditional_collection
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class CachedListMixin:
+    """Serves list payloads from the response cache when possible"""
+    def list(self, request, *args, **kwargs):
+        return response_cache.respond(
+            request,
+            "list",
+            get_collection_state(request),
+            partial(super().list, request, *args, **kwargs),
+        )
+
+
+class CachedRetrieveMixin:
+    """Serves retrieve payloads from the response cache when possible"""
+    def retrieve(self, request, *args, **kwargs):
+        return response_cache.respond(
+            request,
+            "retrieve",
+            get_collection_state(request),
+            partial(super().retrieve, request, *args, **kwargs),
+        )
+
+
+class ValuesListMixin:
+    """
+    Lists objects from values() rows rendered by a ValuesSerializer, which
+    renders the same payload as the serializer class several times faster.
+    Disabled by the RECIPES_FAST_SERIALIZATION setting.
+
+    With ?stream=true, all the objects are streamed by the accepted
+    renderer a chunk at a time instead of being paginated, when it can
+    stream them.
+    """
+    def list(self, request, *args, **kwargs):
+        stream = bool(request.query_params.get("stream")) and hasattr(
+            request.accepted_renderer, "stream"
+        )
+        if not (stream or settings.RECIPES_FAST_SERIALIZATION):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = ValuesSerializer(self.get_serializer())
+        # Keyset pagination reads the ordering columns of the page ends
+        ordering = [
+            name.lstrip("-") for name in queryset.query.order_by
+            if isinstance(name, str)
+        ]
+        rows = serializer.rows(queryset, extra=ordering)
+        if stream:
+            return self.get_streaming_response(serializer, rows)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.render(page))
+
+        return Response(serializer.render(rows))
+
+    def get_stream_context(self, serializer):
+        """Returns the renderer context of streamed lists"""
+        return {"fields": serializer.fields}
+
+    def get_streaming_response(self, serializer, rows):
+        """Streams the rendered rows with the accepted renderer"""
+        renderer = self.request.accepted_renderer
+        context = self.get_stream_context(serializer)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+
+        chunks = serializer.stream(rows, settings.RECIPES_STREAM_CHUNK_SIZE)
+
+        return StreamingHttpResponse(
+            renderer.stream(chunks, context), content_type=content_type
+        )
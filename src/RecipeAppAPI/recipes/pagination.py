@@ -0,0 +1,162 @@
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination whose cursors hold the values of all the ordering
+    fields of the last seen object rather than of the first one only.
+
+    DRF's cursors locate pages by the first ordering field, telling apart
+    the objects sharing its value by an offset capped at offset_cutoff, so
+    pages of more ties than that loop forever. Orderings ending with a
+    unique field, like the id, give every object its own position here, so
+    pages never need an offset. Ordering fields must not be null.
+    """
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the page of the cursor, filtered by its position like
+        CursorPagination.paginate_queryset() but on every ordering field
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*(
+                name[1:] if name.startswith("-") else f"-{name}"
+                for name in self.ordering
+            ))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(queryset, current_position, reverse)
+            )
+
+        # An extra object tells whether a page follows
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_position_filter(self, queryset, position, reverse):
+        """
+        Returns the condition of the objects past position in the order of
+        the page, as in (a, b) > (x, y) being a > x or (a = x and b > y)
+        """
+        try:
+            values = json.loads(position)
+            if not (
+                isinstance(values, list) and len(values) == len(self.ordering)
+            ):
+                raise ValueError(position)
+
+            fields = [name.lstrip("-") for name in self.ordering]
+            values = [
+                queryset.model._meta.get_field(name).to_python(value)
+                for name, value in zip(fields, values)
+            ]
+        except (ValueError, FieldDoesNotExist, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+
+        conditions = []
+        for index, order in enumerate(self.ordering):
+            # Past the position is below it when either the field or the
+            # page is in descending order, but not both
+            lookup = "lt" if order.startswith("-") != reverse else "gt"
+            conditions.append(Q(
+                **dict(zip(fields[:index], values[:index])),
+                **{f"{fields[index]}__{lookup}": values[index]},
+            ))
+
+        return reduce(or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Returns the values of the ordering fields of instance as JSON"""
+        values = []
+        for order in ordering:
+            name = order.lstrip("-")
+            if isinstance(instance, dict):
+                values.append(str(instance[name]))
+            else:
+                values.append(str(getattr(instance, name)))
+
+        return json.dumps(values, separators=(",", ":"))
+
+
+class RecipeCursorPagination(KeysetCursorPagination):
+    """
+    Keyset pagination for recipes, newest first, or by price or time with
+    ties ordered by id.
+
+    Pages are located by the last seen object instead of an offset, so
+    fetching any page costs the same and rows inserted meanwhile don't shift
+    pages. Backed by the (user, id) index on Recipe.
+    """
+    ordering = "-id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class NameCursorPagination(KeysetCursorPagination):
+    """
+    Keyset pagination for tags and ingredients ordered by name, or by
+    recipe count with ties ordered by id.
+
+    Backed by the unique (user, name) constraints of Tag and Ingredient, the
+    id only makes the ordering by name explicit.
+    """
+    ordering = ("-name", "-id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
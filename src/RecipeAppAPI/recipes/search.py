@@ -0,0 +1,102 @@
+import math
+import re
+from collections import Counter
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVectorField,
+)
+from django.db import connection
+from django.db.models import F, Func
+
+from core.models import Recipe
+
+from recipes.indexes import VersionedIndexCache
+
+
+TOKEN_RE = re.compile(r"\w+")
+SEARCH_CONFIG = "english"
+
+
+def tokenize(text):
+    """Returns the lower cased words of text"""
+    return TOKEN_RE.findall(text.lower())
+
+
+class DocumentVector(Func):
+    """
+    Text search vector of a recipe search document, matching the expression
+    of its GIN index on Postgres
+    """
+    function = "to_tsvector"
+    template = f"%(function)s('{SEARCH_CONFIG}'::regconfig, %(expressions)s)"
+    output_field = SearchVectorField()
+
+
+def search_queryset(user, query):
+    """Returns the user's recipes matching query ranked, on Postgres"""
+    vector = DocumentVector(F("search_document"))
+    search_query = SearchQuery(query, config=SEARCH_CONFIG)
+
+    return Recipe.objects.annotate(
+        vector=vector,
+        rank=SearchRank(vector, search_query),
+    ).filter(user=user, vector=search_query).order_by("-rank", "-id")
+
+
+class InvertedIndex:
+    """
+    In-process index of the words of a user's recipe search documents, for
+    databases without full text search. Ranks matches by TF-IDF.
+    """
+    def __init__(self, documents):
+        self.postings = {}
+        self.size = 0
+        for pk, document in documents:
+            self.size += 1
+            for token in tokenize(document):
+                postings = self.postings.setdefault(token, {})
+                postings[pk] = postings.get(pk, 0) + 1
+
+    def search(self, query, limit):
+        """Returns the ids and ranks of recipes having every query word"""
+        scores = Counter()
+        matches = None
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token, {})
+            idf = math.log(1 + self.size / (1 + len(postings)))
+            for pk, frequency in postings.items():
+                scores[pk] += frequency * idf
+            matches = set(postings) if matches is None else (
+                matches & set(postings)
+            )
+
+        ranked = sorted(matches or (), key=lambda pk: (-scores[pk], -pk))
+
+        return [(pk, scores[pk]) for pk in ranked[:limit]]
+
+
+def build_inverted_index(user_id):
+    """Returns the inverted index of a user's recipes"""
+    return InvertedIndex(
+        Recipe.objects.filter(user_id=user_id).values_list(
+            "pk", "search_document"
+        ).iterator()
+    )
+
+
+index_cache = VersionedIndexCache("search_index", build_inverted_index)
+
+
+def search_recipes(user, version, query, limit):
+    """
+    Returns the ids and ranks of the user's recipes best matching query,
+    using full text search on Postgres and an inverted index elsewhere
+    """
+    if connection.vendor == "postgresql":
+        return list(
+            search_queryset(user, query).values_list("pk", "rank")[:limit]
+        )
+
+    return index_cache.get(user.pk, version).search(query, limit)
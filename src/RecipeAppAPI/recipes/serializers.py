@@ -1,40 +1,155 @@
+from django.conf import settings
+from django.utils.translation import gettext as _
+
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import (
+    Tag,
+    Ingredient,
+    Recipe,
+    RecipeImageRendition,
+    RecipeImageUpload,
+    RecipeImport,
+)
+
+from recipes.bulk import BulkListSerializer, PreloadedPrimaryKeyRelatedField
+from recipes.uploads import StreamedImageField
+
+
+class NamedObjectSerializer(serializers.ModelSerializer):
+    """Serializer of models having a name unique per user"""
+    def validate_name(self, value):
+        """Validates the user has no other object with the same name"""
+        taken_names = self.context.get("taken_names")
+        if taken_names is not None:
+            taken = value in taken_names
+        else:
+            queryset = self.Meta.model.objects.filter(
+                user=self.context["request"].user,
+                name=value,
+            )
+            if self.instance is not None:
+                queryset = queryset.exclude(pk=self.instance.pk)
+            taken = queryset.exists()
+
+        if taken:
+            raise serializers.ValidationError(
+                _("An object with this name already exists.")
+            )
+
+        return value
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(NamedObjectSerializer):
     """Tag model serializer"""
     class Meta:
         model = Tag
-        fields = ("id", "name")
-        read_only_fields = ("id",)
+        fields = ("id", "name", "recipe_count")
+        read_only_fields = ("id", "recipe_count")
+        list_serializer_class = BulkListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(NamedObjectSerializer):
     """Ingredient model serializer"""
     class Meta:
         model = Ingredient
-        fields = ("id", "name")
-        read_only_fields = ("id",)
+        fields = ("id", "name", "recipe_count")
+        read_only_fields = ("id", "recipe_count")
+        list_serializer_class = BulkListSerializer
+
 
+class SparseFieldsMixin:
+    """
+    Serializer mixin rendering only the fields selected by the fields list
+    of the context, if any. Write only fields are kept.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get("fields")
+        if selected is not None:
+            for name, field in list(self.fields.items()):
+                if name not in selected and not field.write_only:
+                    self.fields.pop(name)
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Recipe model serializer"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = PreloadedPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all(),
+        required=False,
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PreloadedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all(),
+        required=False,
+    )
+    ingredient_names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        write_only=True,
+        required=False,
+    )
+    tag_names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        write_only=True,
+        required=False,
+    )
+
+    # Relation fields and the name fields that may replace them
+    named_relations = (
+        ("ingredients", "ingredient_names", Ingredient),
+        ("tags", "tag_names", Tag),
     )
 
     class Meta:
         model = Recipe
         fields = ("id", "title", "ingredients", "tags", "time_minutes",
-                  "price", "link")
+                  "price", "link", "ingredient_names", "tag_names")
         read_only_fields = ("id",)
+        list_serializer_class = BulkListSerializer
+
+    def validate(self, attrs):
+        """Requires full writes to give each relation by ids or by names"""
+        if not self.partial:
+            errors = {
+                relation: [_("This field is required.")]
+                for relation, names, _model in self.named_relations
+                if relation not in attrs and names not in attrs
+            }
+            if errors:
+                raise serializers.ValidationError(errors)
+
+        return attrs
+
+    @classmethod
+    def resolve_names(cls, items, user_id):
+        """
+        Replaces the names of each items relation with the user's objects
+        of these names, looking them up or creating them once for all items.
+        """
+        for relation, names, model in cls.named_relations:
+            requested = [item for item in items if names in item]
+            if not requested:
+                continue
+
+            objs = model.objects.get_or_create_by_names(
+                user_id,
+                {name for item in requested for name in item[names]},
+            )
+            for item in requested:
+                related = list(item.get(relation, []))
+                related.extend(objs[name] for name in item.pop(names))
+                item[relation] = related
+
+    def create(self, validated_data):
+        """Creates a recipe, resolving its relations given by names"""
+        self.resolve_names([validated_data], validated_data["user"].pk)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        """Updates a recipe, resolving its relations given by names"""
+        self.resolve_names([validated_data], instance.user_id)
+        return super().update(instance, validated_data)
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -43,9 +158,69 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
+class RecipeImageRenditionSerializer(serializers.ModelSerializer):
+    """Serializer of the resized copies of recipe images"""
+    class Meta:
+        model = RecipeImageRendition
+        fields = ("name", "format", "width", "height", "file")
+        read_only_fields = fields
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
+    image = StreamedImageField(allow_null=True)
+    renditions = RecipeImageRenditionSerializer(
+        source="image_renditions",
+        many=True,
+        read_only=True,
+    )
+
     class Meta:
         model = Recipe
-        fields = ("id", "image")
-        read_only_fields = ("id",)
+        fields = ("id", "image", "image_status", "renditions")
+        read_only_fields = ("id", "image_status")
+
+
+class RecipeImageUploadSerializer(serializers.ModelSerializer):
+    """Serializer of resumable recipe image uploads"""
+    class Meta:
+        model = RecipeImageUpload
+        fields = ("id", "name", "size", "offset", "created")
+        read_only_fields = ("id", "offset", "created")
+
+    def validate_size(self, value):
+        """Validates the image size is within the upload limit"""
+        max_size = settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+        if not 0 < value <= max_size:
+            raise serializers.ValidationError(_(
+                "Ensure the size is between 1 and %(max)d bytes."
+            ) % {"max": max_size})
+
+        return value
+
+
+class RecipeRecordSerializer(serializers.ModelSerializer):
+    """Serializer validating imported recipes, relations given by names"""
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        required=False,
+    )
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        required=False,
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ("title", "ingredients", "tags", "time_minutes", "price",
+                  "link")
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Serializer of the status and progress of recipe imports"""
+    class Meta:
+        model = RecipeImport
+        fields = ("id", "format", "status", "records_done",
+                  "recipes_created", "records_rejected", "error", "created",
+                  "modified")
+        read_only_fields = fields
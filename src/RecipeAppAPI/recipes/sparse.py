@@ -0,0 +1,76 @@
+from django.utils.translation import gettext as _
+
+from rest_framework.exceptions import ValidationError
+
+
+LAYOUT_OBJECTS = "objects"
+LAYOUT_ROWS = "rows"
+LAYOUT_COLUMNS = "columns"
+LAYOUT_CHOICES = (LAYOUT_OBJECTS, LAYOUT_ROWS, LAYOUT_COLUMNS)
+
+
+def parse_fields(value, readable):
+    """
+    Returns the fields selected by a comma separated value in the order of
+    readable, or None when no fields are selected
+    """
+    selected = {
+        name.strip() for name in (value or "").split(",") if name.strip()
+    }
+    if not selected:
+        return None
+
+    unknown = selected.difference(readable)
+    if unknown:
+        raise ValidationError({"fields": [_(
+            "Unknown fields: %(unknown)s. Must be among: %(choices)s."
+        ) % {
+            "unknown": ", ".join(sorted(unknown)),
+            "choices": ", ".join(readable),
+        }]})
+
+    return [name for name in readable if name in selected]
+
+
+def get_layout(query_params):
+    """Returns the requested layout of listed objects"""
+    layout = query_params.get("layout", LAYOUT_OBJECTS)
+    if layout not in LAYOUT_CHOICES:
+        raise ValidationError({"layout": [_(
+            "Must be one of: %(choices)s."
+        ) % {"choices": ", ".join(LAYOUT_CHOICES)}]})
+
+    return layout
+
+
+def get_stream_layout(query_params):
+    """
+    Returns the requested layout of streamed objects, which can't be laid
+    out in columns a chunk at a time
+    """
+    layout = get_layout(query_params)
+    if layout == LAYOUT_COLUMNS:
+        raise ValidationError({"layout": [_(
+            "The %(layout)s layout can't be streamed."
+        ) % {"layout": layout}]})
+
+    return layout
+
+
+def apply_layout(items, fields, layout):
+    """
+    Returns serialized items as objects, or compacted into field names and
+    either one array of values per item or one array of values per field
+    """
+    if layout == LAYOUT_ROWS:
+        return {
+            "fields": fields,
+            "rows": [[item[name] for name in fields] for item in items],
+        }
+    elif layout == LAYOUT_COLUMNS:
+        return {
+            "fields": fields,
+            "columns": [[item[name] for item in items] for name in fields],
+        }
+
+    return items
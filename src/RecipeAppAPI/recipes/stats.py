@@ -0,0 +1,87 @@
+import math
+from decimal import Decimal
+
+from django.conf import settings
+
+from core.models import Recipe, RecipeRollup, RecipeRollupBucket
+
+
+def format_value(field, units):
+    """Returns a number of units of a recipe field as the API renders it"""
+    decimal_places = getattr(Recipe._meta.get_field(field), "decimal_places",
+                             None)
+    if not decimal_places:
+        return units
+
+    return str(Decimal(units).scaleb(-decimal_places))
+
+
+def percentile_bucket(buckets, count, percentile):
+    """
+    Returns the bucket holding the nearest rank percentile of count values
+    rolled up in sorted buckets
+    """
+    rank = max(1, math.ceil(percentile * count / 100))
+    seen = 0
+    for bucket, recipe_count in buckets:
+        seen += recipe_count
+        if seen >= rank:
+            return bucket
+
+    return buckets[-1][0]
+
+
+def field_stats(field, total, count, buckets):
+    """
+    Returns the average and percentiles of a recipe field, percentiles are
+    rounded down to the bucket width
+    """
+    scale = RecipeRollup.objects.bucket_scale(field)
+    width = RecipeRollup.objects.bucket_width(field)
+    stats = {
+        "average": None,
+        "bucket": format_value(field, width),
+        "percentiles": {},
+    }
+    if not count or not buckets:
+        return stats
+
+    average = Decimal(total) * scale / count
+    stats["average"] = format_value(field, int(average.to_integral_value()))
+    for percentile in settings.RECIPES_STATS_PERCENTILES:
+        bucket = percentile_bucket(buckets, count, percentile)
+        stats["percentiles"][str(percentile)] = format_value(
+            field, bucket * width
+        )
+
+    return stats
+
+
+def recipe_stats(user):
+    """
+    Returns the number of the user's recipes and the distributions of their
+    prices and times, read from the user's rollup in a couple of queries
+    """
+    rollup = RecipeRollup.objects.filter(user=user).first()
+    if rollup is None:
+        rollup = RecipeRollup(user=user)
+
+    buckets = {field: [] for field in RecipeRollup.objects.bucket_fields}
+    for field, bucket, recipe_count in RecipeRollupBucket.objects.filter(
+        user=user, recipe_count__gt=0,
+    ).order_by("field", "bucket").values_list(
+        "field", "bucket", "recipe_count"
+    ):
+        buckets.setdefault(field, []).append((bucket, recipe_count))
+
+    return {
+        "recipe_count": rollup.recipe_count,
+        "price": field_stats(
+            "price", rollup.price_total, rollup.recipe_count,
+            buckets["price"],
+        ),
+        "time_minutes": field_stats(
+            "time_minutes", rollup.time_minutes_total, rollup.recipe_count,
+            buckets["time_minutes"],
+        ),
+    }
@@ -1,8 +1,13 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 
 from core.models import Recipe, Tag, Ingredient
 
+from recipes.imports import validate_records
+
 
 def create_user(**params):
     """
@@ -11,6 +16,29 @@ def create_user(**params):
     return get_user_model().objects.create_user(**params)
 
 
+def run_commit_callbacks():
+    """
+    Runs the callbacks waiting for the commit of the test case transaction,
+    which is rolled back instead
+    """
+    callbacks, connection.run_on_commit = connection.run_on_commit, []
+    for _, callback in callbacks:
+        callback()
+
+
+def fail_import_batch(number):
+    """Patches imports to fail their batch of the given number, from 1"""
+    batches = []
+
+    def validate(records):
+        batches.append(records)
+        if len(batches) == number:
+            raise RuntimeError(f"Batch {number} failed")
+        return validate_records(records)
+
+    return patch("recipes.imports.validate_records", side_effect=validate)
+
+
 def sample_recipe(user, **params):
     """Creates and returns a sample recipe"""
     defaults = {
@@ -33,6 +61,24 @@ def recipe_image_upload_url(recipe_id):
     return reverse("recipes:recipe-image-upload", args=(recipe_id,))
 
 
+def recipe_image_url(recipe_id):
+    """Returns URL of a recipe image status and renditions"""
+    return reverse("recipes:recipe-image", args=(recipe_id,))
+
+
+def recipe_image_uploads_url(recipe_id):
+    """Returns URL starting resumable recipe image uploads"""
+    return reverse("recipes:recipe-image-uploads", args=(recipe_id,))
+
+
+def recipe_image_upload_chunk_url(recipe_id, upload_id):
+    """Returns URL of a resumable recipe image upload"""
+    return reverse(
+        "recipes:recipe-image-upload-chunk",
+        args=(recipe_id, upload_id),
+    )
+
+
 def sample_tag(user, name="Salad"):
     """Create and return a Tag object"""
     return Tag.objects.create(user=user, name=name)
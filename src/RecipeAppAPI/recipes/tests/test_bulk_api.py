@@ -0,0 +1,243 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+from recipes.bulk import BulkListSerializer
+from recipes.tests.helpers import (
+    create_user,
+    sample_recipe,
+    sample_tag,
+    sample_ingredient,
+)
+
+
+RECIPE_BULK_URL = reverse("recipes:recipe-bulk")
+TAG_BULK_URL = reverse("recipes:tag-bulk")
+
+
+class BulkRecipeAPITests(TestCase):
+    """Test creating, updating and deleting recipes in bulk"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes_success(self):
+        """Test creating many recipes with their relations at once"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        payload = [
+            {
+                "title": "Koshary",
+                "time_minutes": 40,
+                "price": "10.00",
+                "tags": [tag.id],
+                "ingredients": [ingredient.id],
+            },
+            {
+                "title": "Bashamel",
+                "time_minutes": 45,
+                "price": "20.00",
+                "tags": [],
+                "ingredients": [],
+            },
+        ]
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+        recipes = Recipe.objects.filter(user=self.user).order_by("id")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(res.data[0]["tags"], [tag.id])
+        self.assertEqual(
+            [recipe.title for recipe in recipes],
+            ["Koshary", "Bashamel"],
+        )
+        self.assertEqual(list(recipes[0].ingredients.all()), [ingredient])
+
+        tag.refresh_from_db()
+        ingredient.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+        self.assertEqual(ingredient.recipe_count, 1)
+
+    def test_bulk_create_recipes_with_names(self):
+        """Test names shared by bulk items resolve to the same object"""
+        payload = [
+            {
+                "title": title,
+                "time_minutes": 40,
+                "price": "10.00",
+                "tag_names": ["Egyptian"],
+                "ingredient_names": ["Rice"],
+            }
+            for title in ("Koshary", "Roz Bel Laban")
+        ]
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(res.data[0]["tags"], res.data[1]["tags"])
+
+    def test_bulk_create_invalid_item_creates_nothing(self):
+        """Test one invalid item fails the batch with per item errors"""
+        payload = [
+            {
+                "title": "Koshary",
+                "time_minutes": 40,
+                "price": "10.00",
+                "tags": [],
+                "ingredients": [],
+            },
+            {"title": "Bashamel", "time_minutes": 45, "tags": [999]},
+        ]
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn("price", res.data[1])
+        self.assertIn("tags", res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_other_user_tag_fails(self):
+        """Test recipes can't reference tags of other users"""
+        another_user = create_user(email="another@gmail.com", password="pass")
+        tag = sample_tag(user=another_user, name="Egyptian")
+        payload = [{
+            "title": "Koshary",
+            "time_minutes": 40,
+            "price": "10.00",
+            "tags": [tag.id],
+        }]
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        tag.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tags", res.data[0])
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(tag.recipe_count, 0)
+
+    def test_bulk_create_requires_list(self):
+        """Test bulk requests with a single object are rejected"""
+        payload = {"title": "Koshary", "time_minutes": 40, "price": "10.00"}
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPES_BULK_MAX_ITEMS=1)
+    def test_bulk_create_too_many_items(self):
+        """Test bulk requests can't exceed the maximum number of items"""
+        payload = [
+            {"title": "Koshary", "time_minutes": 40, "price": "10.00"},
+            {"title": "Bashamel", "time_minutes": 45, "price": "20.00"},
+        ]
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update_recipes_success(self):
+        """Test partially updating many recipes and their relations"""
+        recipe1 = sample_recipe(user=self.user, title="Koshary")
+        recipe2 = sample_recipe(user=self.user, title="Bashamel")
+        recipe1.tags.add(sample_tag(user=self.user, name="Egyptian"))
+        tag = sample_tag(user=self.user, name="Fast")
+        payload = [
+            {"id": recipe1.id, "tags": [tag.id]},
+            {"id": recipe2.id, "title": "Molokhia"},
+        ]
+        res = self.client.patch(RECIPE_BULK_URL, payload, format="json")
+
+        recipe2.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe1.tags.all()), [tag])
+        self.assertEqual(recipe2.title, "Molokhia")
+
+    def test_bulk_update_other_user_recipe_fails(self):
+        """Test recipes of other users can't be updated in bulk"""
+        another_user = create_user(email="another@gmail.com", password="pass")
+        recipe = sample_recipe(user=another_user, title="Koshary")
+        payload = [{"id": recipe.id, "title": "Molokhia"}]
+        res = self.client.patch(RECIPE_BULK_URL, payload, format="json")
+
+        recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", res.data[0])
+        self.assertEqual(recipe.title, "Koshary")
+
+    def test_bulk_delete_recipes_success(self):
+        """Test deleting many recipes at once"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        recipe3 = sample_recipe(user=self.user)
+        payload = [recipe1.id, recipe2.id]
+        res = self.client.delete(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Recipe.objects.all()), [recipe3])
+
+    def test_bulk_delete_unknown_recipe_deletes_nothing(self):
+        """Test deleting with an unknown id fails the whole batch"""
+        recipe = sample_recipe(user=self.user)
+        payload = [recipe.id, recipe.id + 100]
+        res = self.client.delete(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+
+class BulkTagAPITests(TestCase):
+    """Test creating tags in bulk"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags_success(self):
+        """Test creating many tags owned by the logged user at once"""
+        payload = [{"name": "Spicy"}, {"name": "Vegan"}]
+        res = self.client.post(TAG_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(Tag.objects.filter(user=self.user).values_list(
+                "name", flat=True
+            )),
+            ["Spicy", "Vegan"],
+        )
+
+    def test_bulk_create_tags_taken_names_fail(self):
+        """Test bulk tags can't reuse names taken or repeated in the batch"""
+        sample_tag(user=self.user, name="Spicy")
+        payload = [{"name": "Spicy"}, {"name": "Vegan"}, {"name": "Vegan"}]
+        res = self.client.post(TAG_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", res.data[0])
+        self.assertIn("name", res.data[2])
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_bulk_create_tags_taken_meanwhile_fail(self):
+        """Test names taken after validating fail the items using them"""
+        is_valid = BulkListSerializer.is_valid
+
+        def take_name(serializer, *args, **kwargs):
+            valid = is_valid(serializer, *args, **kwargs)
+            Tag.objects.get_or_create(user=self.user, name="Spicy")
+            return valid
+
+        payload = [{"name": "Spicy"}, {"name": "Vegan"}]
+        with patch.object(BulkListSerializer, "is_valid", take_name):
+            res = self.client.post(TAG_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", res.data[0])
+        self.assertEqual(res.data[1], {})
+        self.assertEqual(
+            list(Tag.objects.values_list("name", flat=True)), ["Spicy"]
+        )
@@ -0,0 +1,83 @@
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from recipes.cache import response_cache
+from recipes.tests.helpers import (
+    create_user,
+    sample_recipe,
+    sample_tag,
+    recipe_detail_url,
+)
+
+
+RECIPE_URL = reverse("recipes:recipe-list")
+TAGS_URL = reverse("recipes:tag-list")
+
+
+class ResponseCacheTests(TestCase):
+    """Test recipe models APIs responses caching"""
+    def setUp(self):
+        caches["recipes"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test repeating a list request serves the cached payload"""
+        sample_recipe(user=self.user)
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(res["X-Cache"], "HIT")
+        self.assertEqual(res.data, first.data)
+
+    def test_query_params_cached_separately(self):
+        """Test list requests with other query params aren't shared"""
+        sample_tag(user=self.user, name="Spicy")
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"], [])
+
+    def test_write_invalidates_user_cache(self):
+        """Test changing a recipe invalidates the cached detail"""
+        recipe = sample_recipe(user=self.user, title="Koshary")
+        self.client.get(recipe_detail_url(recipe.id))
+
+        self.client.patch(recipe_detail_url(recipe.id), {"title": "Molokhia"})
+        res = self.client.get(recipe_detail_url(recipe.id))
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["title"], "Molokhia")
+
+    def test_cache_limited_to_user(self):
+        """Test cached payloads of a user aren't served to another user"""
+        sample_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        self.client.force_authenticate(
+            create_user(email="another@gmail.com", password="testPass")
+        )
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"], [])
+
+    def test_hits_and_misses_counted(self):
+        """Test cache hits and misses are counted for monitoring"""
+        before = response_cache.stats.as_dict()
+
+        self.client.get(RECIPE_URL)
+        self.client.get(RECIPE_URL)
+        after = response_cache.stats.as_dict()
+
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
@@ -0,0 +1,207 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core.models import (
+    Recipe,
+    RecipeImageUpload,
+    RecipeImport,
+    Tag,
+    Ingredient,
+)
+
+from recipes.tests.helpers import (
+    create_user,
+    fail_import_batch,
+    sample_recipe,
+)
+
+
+class SeedRecipesCommandTests(TestCase):
+
+    def test_seed_recipes(self):
+        """Test seeding creates recipes related to tags and ingredients"""
+        call_command(
+            "seed_recipes", "seed@gmail.com",
+            "--recipes=25", "--tags=4", "--ingredients=6",
+            "--per-recipe=2", "--batch-size=10",
+            stdout=StringIO(),
+        )
+        recipes = Recipe.objects.filter(user__email="seed@gmail.com")
+
+        self.assertEqual(recipes.count(), 25)
+        self.assertEqual(Tag.objects.count(), 4)
+        self.assertEqual(Ingredient.objects.count(), 6)
+        self.assertEqual(Recipe.tags.through.objects.count(), 50)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 50)
+        self.assertFalse(recipes.filter(search_document="").exists())
+
+
+class BenchmarkQueriesCommandTests(TestCase):
+
+    def test_benchmark_queries_reports_cases(self):
+        """Test benchmarking reports every case of a scenario"""
+        user = create_user(email="bench@gmail.com", password="testPass")
+        call_command(
+            "seed_recipes", user.email, "--recipes=10", stdout=StringIO()
+        )
+        out = StringIO()
+        call_command(
+            "benchmark_queries", user.email,
+            "--scenario=filters", "--scenario=ranges",
+            "--scenario=serializers", "--repeat=1",
+            "--explain", stdout=out,
+        )
+
+        self.assertIn("semi-join: tags all", out.getvalue())
+        self.assertIn("fast path: values rows", out.getvalue())
+        self.assertIn("range: time + tags", out.getvalue())
+        self.assertIn("rows_per_sec", out.getvalue())
+
+    def test_benchmark_indexes(self):
+        """Test benchmarking search and autocomplete reports index cases"""
+        user = create_user(email="bench@gmail.com", password="testPass")
+        call_command(
+            "seed_recipes", user.email, "--recipes=10", stdout=StringIO()
+        )
+        out = StringIO()
+        call_command(
+            "benchmark_queries", user.email,
+            "--scenario=search", "--scenario=autocomplete", "--repeat=2",
+            stdout=out,
+        )
+
+        self.assertIn("scan: title icontains", out.getvalue())
+        self.assertIn("inverted index: cached", out.getvalue())
+        self.assertIn("prefix index: cached", out.getvalue())
+        self.assertIn("p99_ms", out.getvalue())
+
+    def test_benchmark_compare_indexes(self):
+        """Test benchmarking reports plans without and with the indexes"""
+        user = create_user(email="bench@gmail.com", password="testPass")
+        call_command(
+            "seed_recipes", user.email, "--recipes=10", stdout=StringIO()
+        )
+        out = StringIO()
+        call_command(
+            "benchmark_queries", user.email, "--scenario=relations",
+            "--repeat=1", "--explain", "--compare-indexes",
+            "--allow-locking", stdout=out,
+        )
+
+        without, with_indexes = out.getvalue().split("With indexes:")
+        self.assertIn("reverse: recipes of tags", without)
+        self.assertNotIn("recipe_tags_reverse_idx", without)
+        self.assertIn("recipe_tags_reverse_idx", with_indexes)
+
+    def test_benchmark_compare_indexes_locking_refused(self):
+        """Test comparing indexes must be allowed to lock tables"""
+        user = create_user(email="bench@gmail.com", password="testPass")
+
+        with self.assertRaisesMessage(CommandError, "--allow-locking"):
+            call_command(
+                "benchmark_queries", user.email, "--compare-indexes",
+                stdout=StringIO(),
+            )
+
+        # Local settings let developers compare without the flag
+        with self.settings(DEBUG=True):
+            call_command(
+                "benchmark_queries", user.email, "--scenario=relations",
+                "--repeat=1", "--compare-indexes", stdout=StringIO(),
+            )
+
+
+class LoadTestCommandTests(TransactionTestCase):
+
+    def test_load_test_reports_handlers(self):
+        """Test load testing reports the latencies of both handlers"""
+        user = create_user(email="load@gmail.com", password="testPass")
+        call_command(
+            "seed_recipes", user.email, "--recipes=10", stdout=StringIO()
+        )
+        out = StringIO()
+        call_command(
+            "load_test", user.email, "--requests=6", "--concurrency=3",
+            "--client-delay=0", "--wsgi-threads=2", "--host=testserver",
+            stdout=out,
+        )
+
+        asgi, wsgi = out.getvalue().splitlines()
+        self.assertIn("asgi: requests=6, errors=0", asgi)
+        self.assertIn("wsgi: requests=6, errors=0", wsgi)
+        self.assertIn("p99_ms", wsgi)
+
+
+class PurgeImageUploadsCommandTests(TestCase):
+
+    def test_purge_expired_uploads(self):
+        """Test only expired uploads and their bytes are deleted"""
+        recipe = sample_recipe(user=create_user(email="up@gmail.com"))
+        expired = RecipeImageUpload.objects.create(
+            recipe=recipe, name="old.png", size=10
+        )
+        RecipeImageUpload.objects.filter(pk=expired.pk).update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        open(expired.path, "wb").close()
+        recent = RecipeImageUpload.objects.create(
+            recipe=recipe, name="new.png", size=10
+        )
+
+        call_command("purge_image_uploads", stdout=StringIO())
+
+        self.assertEqual(list(RecipeImageUpload.objects.all()), [recent])
+        self.assertFalse(os.path.exists(expired.path))
+        recent.delete()
+
+
+class ImportRecipesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user(email="import@gmail.com")
+        file = tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False, encoding="utf-8"
+        )
+        with file:
+            file.write("title,tags,time_minutes,price\n")
+            for i in range(5):
+                file.write(f"Recipe {i},Vegan; Quick,{i + 1},{i}.50\n")
+        self.path = file.name
+        self.addCleanup(os.remove, self.path)
+
+    def test_import_recipes(self):
+        """Test the recipes of a file are imported in batches"""
+        out = StringIO()
+
+        call_command("import_recipes", self.user.email, self.path,
+                     batch_size=2, stdout=out)
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(
+            Tag.objects.get(user=self.user, name="Quick").recipe_count, 5
+        )
+        self.assertIn("Read 4 records", out.getvalue())
+        self.assertEqual(
+            RecipeImport.objects.get().status, RecipeImport.STATUS_DONE
+        )
+
+    def test_resume_import(self):
+        """Test a failed import is resumed without duplicating recipes"""
+        with fail_import_batch(2):
+            with self.assertRaises(CommandError):
+                call_command("import_recipes", self.user.email, self.path,
+                             batch_size=2, stdout=StringIO())
+        job = RecipeImport.objects.get()
+
+        call_command("import_recipes", resume=str(job.pk), stdout=StringIO())
+
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            [f"Recipe {i}" for i in range(5)],
+        )
@@ -0,0 +1,133 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.tests.helpers import (
+    create_user,
+    sample_recipe,
+    sample_tag,
+    sample_ingredient,
+    recipe_detail_url,
+)
+
+
+RECIPE_URL = reverse("recipes:recipe-list")
+TAGS_URL = reverse("recipes:tag-list")
+INGREDIENTS_URL = reverse("recipes:ingredient-list")
+
+
+class ConditionalGetTests(TestCase):
+    """Test conditional GET requests on recipe models APIs"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_list_not_modified(self):
+        """Test polling an unchanged list returns 304 without querying it"""
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPE_URL)
+        etag = res["ETag"]
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_list_modified_after_recipe_change(self):
+        """Test changing a recipe changes the list ETag"""
+        recipe = sample_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        recipe.title = "Koshary"
+        recipe.save()
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_list_modified_after_relation_change(self):
+        """Test adding a tag to a recipe changes the list ETag"""
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user)
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_modified_after_delete(self):
+        """Test deleting an ingredient changes the ingredients ETag"""
+        ingredient = sample_ingredient(user=self.user)
+        etag = self.client.get(INGREDIENTS_URL)["ETag"]
+
+        ingredient.delete()
+        res = self.client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"], [])
+
+    def test_other_user_change_not_modified(self):
+        """Test changes of another user don't change the list ETag"""
+        another_user = create_user(email="another@gmail.com", password="pass")
+        etag = self.client.get(TAGS_URL)["ETag"]
+
+        sample_tag(user=another_user)
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def set_collection_modified(self, modified):
+        """Sets the last time the user's collection changed"""
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            collection_modified=modified
+        )
+
+    def test_unchanged_detail_if_modified_since(self):
+        """Test an unchanged recipe detail honors If-Modified-Since"""
+        recipe = sample_recipe(user=self.user)
+        self.set_collection_modified(timezone.now() - timedelta(seconds=5))
+        res = self.client.get(recipe_detail_url(recipe.id))
+
+        res = self.client.get(
+            recipe_detail_url(recipe.id),
+            HTTP_IF_MODIFIED_SINCE=res["Last-Modified"],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_in_same_second_modified(self):
+        """Test a write in the second of a response isn't answered by 304"""
+        recipe = sample_recipe(user=self.user)
+        second = timezone.now().replace(microsecond=0) + timedelta(hours=1)
+        self.set_collection_modified(second + timedelta(milliseconds=100))
+
+        with patch("recipes.mixins.timezone.now") as now:
+            now.return_value = second + timedelta(milliseconds=200)
+            res = self.client.get(recipe_detail_url(recipe.id))
+            self.assertFalse(res.has_header("Last-Modified"))
+
+            self.set_collection_modified(second + timedelta(milliseconds=700))
+            now.return_value = second + timedelta(milliseconds=800)
+            res = self.client.get(
+                recipe_detail_url(recipe.id),
+                HTTP_IF_MODIFIED_SINCE=http_date(second.timestamp()),
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        now = second + timedelta(seconds=1, milliseconds=100)
+        with patch("recipes.mixins.timezone.now", return_value=now):
+            res = self.client.get(recipe_detail_url(recipe.id))
+
+        self.assertEqual(res["Last-Modified"], http_date(second.timestamp()))
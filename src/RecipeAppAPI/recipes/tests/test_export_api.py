@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.tests.helpers import (
+    create_user,
+    sample_recipe,
+    sample_tag,
+    sample_ingredient,
+)
+
+
+EXPORT_URL = reverse("recipes:recipe-export")
+
+
+class RecipeExportAPITests(TestCase):
+    """Test exporting the recipe library of the logged user"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+        spicy = sample_tag(user=self.user, name="Spicy")
+        vegan = sample_tag(user=self.user, name="Vegan")
+        rice = sample_ingredient(user=self.user, name="Rice")
+        self.koshary = sample_recipe(user=self.user, title="Koshary",
+                                     price="7.50")
+        self.koshary.tags.add(vegan, spicy)
+        self.koshary.ingredients.add(rice)
+        sample_recipe(user=self.user, title="Fatta, \"Egyptian\"").tags.add(
+            vegan
+        )
+        sample_recipe(user=create_user(email="other@gmail.com"))
+
+    def export(self, params=None):
+        """Returns the export response and its streamed content"""
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res, b"".join(res.streaming_content).decode()
+
+    def test_export_login_required(self):
+        """Test login is required to export recipes"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_ndjson(self):
+        """Test recipes are exported as JSON lines with related names"""
+        res, content = self.export()
+        lines = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertIn("recipes.ndjson", res["Content-Disposition"])
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0], {
+            "id": self.koshary.id,
+            "title": "Koshary",
+            "ingredients": ["Rice"],
+            "tags": ["Spicy", "Vegan"],
+            "time_minutes": 10,
+            "price": "7.50",
+            "link": "",
+        })
+
+    def test_export_csv(self):
+        """Test recipes are exported as CSV rows under a header row"""
+        res, content = self.export({"format": "csv"})
+        rows = list(csv.reader(io.StringIO(content)))
+
+        self.assertEqual(res["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            rows[0],
+            ["id", "title", "ingredients", "tags", "time_minutes", "price",
+             "link"],
+        )
+        self.assertEqual(rows[1][1:4], ["Koshary", "Rice", "Spicy; Vegan"])
+        self.assertEqual(rows[2][1:4], ["Fatta, \"Egyptian\"", "", "Vegan"])
+        self.assertEqual(len(rows), 3)
+
+    def test_export_filtered(self):
+        """Test exports hold only the recipes matching the filters"""
+        _res, content = self.export({"ingredients": "Rice"})
+
+        self.assertEqual(
+            [json.loads(line)["title"] for line in content.splitlines()],
+            ["Koshary"],
+        )
+
+    def test_export_without_recipes(self):
+        """Test exporting no recipes streams only the CSV header row"""
+        self.client.force_authenticate(create_user(email="new@gmail.com"))
+
+        _res, content = self.export({"format": "csv"})
+
+        self.assertEqual(content.splitlines(), [
+            "id,title,ingredients,tags,time_minutes,price,link",
+        ])
+
+    @override_settings(RECIPES_EXPORT_CHUNK_SIZE=2)
+    def test_export_queries_per_chunk(self):
+        """Test related names are fetched once per relation per chunk"""
+        for title in ("Molokhia", "Bashamel", "Mahshi"):
+            sample_recipe(user=self.user, title=title)
+
+        # The recipes, then their relations per chunk of two recipes
+        with self.assertNumQueries(7):
+            _res, content = self.export()
+
+        self.assertEqual(len(content.splitlines()), 5)
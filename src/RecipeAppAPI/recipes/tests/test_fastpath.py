@@ -0,0 +1,140 @@
+import json
+
+from django.core.cache import caches
+from django.db.models import Prefetch
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipes.fastpath import ValuesSerializer
+from recipes.serializers import (
+    RecipeSerializer,
+    RecipeDetailSerializer,
+    TagSerializer,
+)
+from recipes.tests.helpers import (
+    create_user,
+    sample_recipe,
+    sample_tag,
+    sample_ingredient,
+)
+
+
+RECIPE_URL = reverse("recipes:recipe-list")
+TAGS_URL = reverse("recipes:tag-list")
+
+
+class ValuesSerializerTests(TestCase):
+    """Test values rows render exactly like the model serializers"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+        tags = [sample_tag(user=self.user, name=name)
+                for name in ("Vegan", "Egyptian", "Spicy")]
+        salt = sample_ingredient(user=self.user, name="Salt")
+        rice = sample_ingredient(user=self.user, name="Rice")
+        koshary = sample_recipe(user=self.user, title="Koshary", price="7.5",
+                                link="https://example.com/koshary")
+        koshary.tags.add(tags[2], tags[0])
+        koshary.ingredients.add(rice, salt)
+        sample_recipe(user=self.user, title="Fatta",
+                      price="123.45").tags.add(tags[1])
+        sample_recipe(user=self.user, title="Ta3meya é\"\\", price=0)
+
+    def get_content(self, url, params=None, fast=True):
+        """Returns the rendered list response with or without the fast path"""
+        caches["recipes"].clear()
+        with override_settings(RECIPES_FAST_SERIALIZATION=fast):
+            return self.client.get(url, params).content
+
+    def test_render_identical_to_serializer(self):
+        """Test rendered rows are byte identical to RecipeSerializer's"""
+        queryset = Recipe.objects.filter(user=self.user).order_by("id")
+        expected = RecipeSerializer(queryset.prefetch_related(
+            Prefetch("tags", Tag.objects.order_by("id")),
+            Prefetch("ingredients", Ingredient.objects.order_by("id")),
+        ), many=True).data
+
+        serializer = ValuesSerializer(RecipeSerializer())
+        rendered = serializer.render(serializer.rows(queryset))
+
+        self.assertEqual(
+            JSONRenderer().render(rendered), JSONRenderer().render(expected)
+        )
+
+    def test_list_responses_identical(self):
+        """Test lists render the same bytes with or without the fast path"""
+        for url, params in (
+            (RECIPE_URL, None),
+            (RECIPE_URL, {"ordering": "price", "page_size": 2}),
+            (RECIPE_URL, {"fields": "price,tags", "layout": "columns"}),
+            (TAGS_URL, {"ordering": "-recipe_count"}),
+        ):
+            self.assertEqual(
+                self.get_content(url, params),
+                self.get_content(url, params, fast=False),
+            )
+
+    def test_list_fast_path_queries(self):
+        """Test listing recipes queries once per relation, not per recipe"""
+        caches["recipes"].clear()
+
+        with self.assertNumQueries(4):
+            self.client.get(RECIPE_URL)
+
+    def test_nested_serializers_unsupported(self):
+        """Test serializers nesting objects can't be rendered from rows"""
+        ValuesSerializer(TagSerializer())
+
+        with self.assertRaises(TypeError):
+            ValuesSerializer(RecipeDetailSerializer())
+
+    @override_settings(RECIPES_STREAM_CHUNK_SIZE=2)
+    def test_stream_list(self):
+        """Test streamed lists hold every recipe, read a chunk at a time"""
+        expected = json.loads(self.get_content(RECIPE_URL))["results"]
+
+        # The recipes, then their relations per chunk of two recipes
+        with self.assertNumQueries(6):
+            res = self.client.get(RECIPE_URL, {"stream": "true"})
+            content = b"".join(res.streaming_content)
+
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(json.loads(content), expected)
+
+    def test_stream_list_sparse_layout(self):
+        """Test streamed lists are laid out like the paginated lists"""
+        for params in (
+            {"fields": "title,tags"},
+            {"fields": "title,price", "layout": "rows"},
+        ):
+            expected = json.loads(
+                self.get_content(RECIPE_URL, params)
+            )["results"]
+            res = self.client.get(RECIPE_URL, {**params, "stream": "true"})
+            content = json.loads(b"".join(res.streaming_content))
+
+            self.assertEqual(content, expected)
+
+    def test_stream_list_columns_rejected(self):
+        """Test streaming lists laid out in columns is refused"""
+        res = self.client.get(
+            RECIPE_URL, {"stream": "true", "layout": "columns"}
+        )
+
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("layout", res.json())
+
+    def test_stream_list_browsable_api_paginated(self):
+        """Test renderers that can't stream render the paginated list"""
+        res = self.client.get(
+            RECIPE_URL, {"stream": "true"}, HTTP_ACCEPT="text/html"
+        )
+
+        self.assertFalse(res.streaming)
+        self.assertIn(b"Koshary", res.content)
@@ -0,0 +1,243 @@
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.tests.helpers import (
+    create_user,
+    sample_recipe,
+    recipe_image_upload_url,
+    recipe_image_uploads_url,
+    recipe_image_upload_chunk_url,
+)
+
+from recipes.uploads import received_chunk
+
+from core.models import RecipeImageUpload, upload_temp_path
+
+
+def png_bytes(size=(10, 10)):
+    """Returns the bytes of a PNG image of size"""
+    buffer = io.BytesIO()
+    Image.new("RGB", size).save(buffer, format="PNG")
+
+    return buffer.getvalue()
+
+
+class StreamingImageUploadTests(TestCase):
+    """Test recipe images are streamed to disk and checked early"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def upload(self, data, suffix=".png"):
+        """Uploads data as the recipe image file"""
+        with tempfile.NamedTemporaryFile(suffix=suffix) as ntf:
+            ntf.write(data)
+            ntf.seek(0)
+            url = recipe_image_upload_url(self.recipe.id)
+            return self.client.post(url, {"image": ntf}, format="multipart")
+
+    def temp_files(self):
+        """Returns the streamed files left in the uploads directory"""
+        directory = os.path.dirname(upload_temp_path("_"))
+        return [n for n in os.listdir(directory) if n.endswith(".upload")]
+
+    def test_upload_names_image_by_sniffed_format(self):
+        """Test the image extension comes from its first bytes"""
+        res = self.upload(png_bytes(), suffix=".jpg")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith(".png"))
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(self.temp_files(), [])
+
+    def test_upload_not_image_rejected(self):
+        """Test a file not starting like an image is rejected"""
+        res = self.upload(b"GIF? not really an image at all")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("image", res.data)
+        self.assertEqual(self.temp_files(), [])
+
+    def test_upload_truncated_image_rejected(self):
+        """Test a file starting like an image but cut short is rejected"""
+        res = self.upload(png_bytes(size=(200, 200))[:-40])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("image", res.data)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+        self.assertEqual(self.temp_files(), [])
+
+    def test_upload_polyglot_rejected(self):
+        """Test a file sniffed as one format but decoded as another fails"""
+        gif = io.BytesIO()
+        Image.new("RGB", (10, 10)).save(gif, format="GIF")
+
+        res = self.upload(b"\x89PNG\r\n\x1a\n" + gif.getvalue())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("image", res.data)
+
+    def test_clear_image_with_json_null(self):
+        """Test a JSON null image removes the recipe image"""
+        self.upload(png_bytes())
+
+        res = self.client.post(
+            recipe_image_upload_url(self.recipe.id),
+            {"image": None},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+        self.assertEqual(self.recipe.image_status, "")
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_upload_too_large_rejected(self):
+        """Test an image over the size limit is rejected"""
+        res = self.upload(png_bytes(size=(200, 200)))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+        self.assertEqual(self.temp_files(), [])
+
+
+class ChunkedImageUploadTests(TestCase):
+    """Test resumable recipe image uploads sent in chunks"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+        self.data = png_bytes(size=(50, 50))
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+        for upload in RecipeImageUpload.objects.all():
+            upload.delete()
+
+    def start_upload(self, size=None):
+        """Starts a resumable upload and returns its chunk URL"""
+        res = self.client.post(
+            recipe_image_uploads_url(self.recipe.id),
+            {"name": "photo.png", "size": size or len(self.data)},
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        return recipe_image_upload_chunk_url(self.recipe.id, res.data["id"])
+
+    def send_chunk(self, url, first, last):
+        """Sends the bytes of data from first to last"""
+        return self.client.put(
+            url,
+            self.data[first:last + 1],
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {first}-{last}/{len(self.data)}",
+        )
+
+    def test_chunked_upload_saves_image(self):
+        """Test an image sent in chunks is saved once complete"""
+        url = self.start_upload()
+        middle = len(self.data) // 2
+
+        res = self.send_chunk(url, 0, middle - 1)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data["offset"], middle)
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.data["offset"], middle)
+
+        res = self.send_chunk(url, middle, len(self.data) - 1)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        with open(self.recipe.image.path, "rb") as image:
+            self.assertEqual(image.read(), self.data)
+        self.assertFalse(RecipeImageUpload.objects.exists())
+
+    def test_chunk_at_wrong_offset_rejected(self):
+        """Test a chunk not continuing the upload is rejected"""
+        url = self.start_upload()
+
+        res = self.send_chunk(url, 10, 19)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.get(url).data["offset"], 0)
+
+    def test_chunk_overtaken_while_received_discarded(self):
+        """Test a chunk is dropped if another was appended meanwhile"""
+        url = self.start_upload()
+        upload = RecipeImageUpload.objects.get()
+
+        @contextmanager
+        def overtaken(*args):
+            with received_chunk(*args) as chunk:
+                RecipeImageUpload.objects.filter(pk=upload.pk).update(
+                    offset=10
+                )
+                yield chunk
+
+        with patch("recipes.views.received_chunk", overtaken):
+            res = self.send_chunk(url, 0, 9)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.get(url).data["offset"], 10)
+        self.assertFalse(os.path.exists(upload.path))
+        self.assertFalse([
+            name for name in os.listdir(os.path.dirname(upload.path))
+            if name.endswith(".chunk")
+        ])
+
+    def test_chunked_upload_not_image_rejected(self):
+        """Test an upload not starting like an image is dropped"""
+        self.data = b"x" * 100
+        url = self.start_upload()
+
+        res = self.send_chunk(url, 0, 49)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(RecipeImageUpload.objects.exists())
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_chunked_upload_too_large_rejected(self):
+        """Test an upload larger than the limit can't be started"""
+        res = self.client.post(
+            recipe_image_uploads_url(self.recipe.id),
+            {"name": "photo.png", "size": 101},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("size", res.data)
+
+    def test_upload_of_other_user_not_found(self):
+        """Test uploads of other users' recipes can't be resumed"""
+        url = self.start_upload()
+        self.client.force_authenticate(create_user(email="other@gmail.com"))
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
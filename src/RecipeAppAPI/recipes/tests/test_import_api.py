@@ -0,0 +1,305 @@
+import json
+import os
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Tag,
+    Recipe,
+    RecipeImport,
+    RecipeRollup,
+    RecipeRollupBucket,
+)
+
+from recipes.imports import ImportAbandoned, run_import
+from recipes.tests.helpers import (
+    create_user,
+    fail_import_batch,
+    sample_recipe,
+    sample_tag,
+)
+
+
+IMPORTS_URL = reverse("recipes:recipe-imports")
+EXPORT_URL = reverse("recipes:recipe-export")
+
+
+def import_status_url(import_id):
+    """Returns the URL of an import status"""
+    return reverse("recipes:recipe-import-status", args=(import_id,))
+
+
+def ndjson(*records):
+    """Returns records as newline delimited JSON"""
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+@override_settings(RECIPES_IMPORT_EAGER=True)
+class RecipeImportAPITests(TestCase):
+    """Test importing recipe files into the logged user's library"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, content_type="application/x-ndjson"):
+        """Uploads content to import"""
+        return self.client.post(
+            IMPORTS_URL, content, content_type=content_type
+        )
+
+    def test_import_login_required(self):
+        """Test login is required to import recipes"""
+        res = APIClient().post(
+            IMPORTS_URL, "", content_type="application/x-ndjson"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_import_ndjson(self):
+        """Test valid records are imported with their tags and ingredients"""
+        vegan = sample_tag(user=self.user, name="Vegan")
+        content = ndjson(
+            {"title": "Koshary", "time_minutes": 40, "price": "7.50",
+             "tags": ["Vegan", "Egyptian"], "ingredients": ["Rice"]},
+            {"title": "Fatta", "time_minutes": 60, "price": "12.00",
+             "tags": ["Egyptian"]},
+            {"title": "", "time_minutes": 5, "price": "1.00"},
+        ) + "not json\n"
+
+        res = self.upload(content)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data["status"], RecipeImport.STATUS_DONE)
+        self.assertEqual(res.data["records_done"], 4)
+        self.assertEqual(res.data["recipes_created"], 2)
+        self.assertEqual(res.data["records_rejected"], 2)
+        koshary = Recipe.objects.get(user=self.user, title="Koshary")
+        self.assertEqual(
+            sorted(koshary.tags.values_list("name", flat=True)),
+            ["Egyptian", "Vegan"],
+        )
+        self.assertIn(vegan, koshary.tags.all())
+        self.assertEqual(
+            Tag.objects.get(user=self.user, name="Egyptian").recipe_count, 2
+        )
+        self.assertEqual(RecipeRollup.objects.get(
+            user=self.user
+        ).recipe_count, 2)
+        self.assertFalse(os.path.exists(
+            RecipeImport.objects.get(pk=res.data["id"]).path
+        ))
+
+    @override_settings(RECIPES_IMPORT_BATCH_SIZE=2)
+    def test_import_batches_roll_up_incrementally(self):
+        """Test batches add to the rollup and counts without recounting"""
+        vegan = sample_tag(user=self.user, name="Vegan")
+        sample_recipe(user=self.user, price="3.00").tags.add(vegan)
+        content = ndjson(*(
+            {"title": f"Recipe {i}", "time_minutes": 10 * i,
+             "price": f"{i}.25", "tags": ["Vegan"] if i % 2 else []}
+            for i in range(5)
+        ))
+        manager = type(RecipeRollup.objects)
+
+        with patch.object(manager, "rebuild") as rebuild, patch.object(
+            type(Tag.objects), "refresh_recipe_counts"
+        ) as refresh_recipe_counts:
+            self.upload(content)
+
+        rebuild.assert_not_called()
+        refresh_recipe_counts.assert_not_called()
+        self.assertEqual(Tag.objects.get(pk=vegan.pk).recipe_count, 3)
+        rollup = RecipeRollup.objects.values(
+            "recipe_count", "price_total", "time_minutes_total"
+        ).get(user=self.user)
+        buckets = set(RecipeRollupBucket.objects.filter(
+            user=self.user
+        ).values_list("field", "bucket", "recipe_count"))
+
+        RecipeRollup.objects.rebuild(self.user.pk)
+
+        self.assertEqual(rollup, RecipeRollup.objects.values(
+            "recipe_count", "price_total", "time_minutes_total"
+        ).get(user=self.user))
+        self.assertEqual(buckets, set(RecipeRollupBucket.objects.filter(
+            user=self.user
+        ).values_list("field", "bucket", "recipe_count")))
+
+    def test_import_export_round_trip(self):
+        """Test CSV exports are imported back as the same recipes"""
+        other = create_user(email="other@gmail.com")
+        recipe = sample_recipe(user=other, title="Koshary, \"Egyptian\"",
+                               price="7.50")
+        recipe.tags.add(sample_tag(user=other, name="Vegan"),
+                        sample_tag(user=other, name="Spicy"))
+        self.client.force_authenticate(other)
+        exported = b"".join(
+            self.client.get(EXPORT_URL, {"format": "csv"}).streaming_content
+        )
+        self.client.force_authenticate(self.user)
+
+        res = self.upload(exported, "text/csv; charset=utf-8")
+
+        self.assertEqual(res.data["recipes_created"], 1)
+        imported = Recipe.objects.get(user=self.user)
+        self.assertEqual(imported.title, recipe.title)
+        self.assertEqual(
+            sorted(imported.tags.values_list("name", flat=True)),
+            ["Spicy", "Vegan"],
+        )
+
+    def test_import_unsupported_format(self):
+        """Test files of other media types are rejected"""
+        res = self.upload("{}", "application/json")
+
+        self.assertEqual(
+            res.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+        self.assertFalse(RecipeImport.objects.exists())
+
+    @override_settings(RECIPES_IMPORT_MAX_UPLOAD_SIZE=10)
+    def test_import_too_large(self):
+        """Test files larger than the limit are rejected"""
+        res = self.upload(ndjson({"title": "Koshary"}))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertFalse(RecipeImport.objects.exists())
+
+    def test_import_in_progress(self):
+        """Test a user can't queue an import while another one is queued"""
+        RecipeImport.objects.create(user=self.user, format="csv")
+
+        res = self.upload(ndjson({"title": "Koshary"}))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    @override_settings(RECIPES_IMPORT_MAX_QUEUED=1)
+    def test_imports_busy(self):
+        """Test imports are turned away while too many are queued"""
+        RecipeImport.objects.create(
+            user=create_user(email="other@gmail.com"), format="csv"
+        )
+
+        res = self.upload(ndjson({"title": "Koshary"}))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertIn("Retry-After", res)
+
+    @override_settings(RECIPES_IMPORT_BATCH_SIZE=2)
+    def test_resume_failed_import(self):
+        """Test failed imports resume after their last written batch"""
+        content = ndjson(*(
+            {"title": f"Recipe {i}", "time_minutes": 10, "price": "5.00"}
+            for i in range(5)
+        ))
+        with fail_import_batch(2), self.assertLogs("recipes.imports", "ERROR"):
+            res = self.upload(content)
+        job_id = res.data["id"]
+
+        failed = self.client.get(import_status_url(job_id))
+        resumed = self.client.post(import_status_url(job_id))
+
+        self.assertEqual(failed.data["status"], RecipeImport.STATUS_FAILED)
+        self.assertEqual(failed.data["records_done"], 2)
+        self.assertEqual(resumed.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(resumed.data["status"], RecipeImport.STATUS_DONE)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            [f"Recipe {i}" for i in range(5)],
+        )
+        self.assertEqual(
+            self.client.post(import_status_url(job_id)).status_code,
+            status.HTTP_409_CONFLICT,
+        )
+
+    @override_settings(RECIPES_IMPORT_STALE_SECONDS=60)
+    def test_resume_stale_import(self):
+        """Test imports left running without a worker fail and resume"""
+        job = RecipeImport.objects.create(
+            user=self.user,
+            format=RecipeImport.FORMAT_NDJSON,
+            status=RecipeImport.STATUS_RUNNING,
+            records_done=1,
+        )
+        with open(job.path, "w") as file:
+            file.write(ndjson(*(
+                {"title": f"Recipe {i}", "time_minutes": 10, "price": "5.00"}
+                for i in range(3)
+            )))
+        RecipeImport.objects.filter(pk=job.pk).update(
+            modified=timezone.now() - timedelta(seconds=61)
+        )
+
+        stale = self.client.get(import_status_url(job.pk))
+        resumed = self.client.post(import_status_url(job.pk))
+
+        self.assertEqual(stale.data["status"], RecipeImport.STATUS_FAILED)
+        self.assertEqual(resumed.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(resumed.data["status"], RecipeImport.STATUS_DONE)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            ["Recipe 1", "Recipe 2"],
+        )
+
+    @override_settings(RECIPES_IMPORT_STALE_SECONDS=60)
+    def test_stale_import_not_in_progress(self):
+        """Test stale imports don't keep users from importing"""
+        job = RecipeImport.objects.create(
+            user=self.user, format="csv", status=RecipeImport.STATUS_RUNNING
+        )
+        RecipeImport.objects.filter(pk=job.pk).update(
+            modified=timezone.now() - timedelta(seconds=61)
+        )
+
+        res = self.upload(ndjson({"title": "Koshary"}))
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        job.refresh_from_db()
+        self.assertEqual(job.status, RecipeImport.STATUS_FAILED)
+
+    def test_abandoned_worker_stops(self):
+        """Test a worker of an import failed meanwhile writes nothing"""
+        job = RecipeImport.objects.create(user=self.user, format="ndjson")
+        with open(job.path, "w") as file:
+            file.write(ndjson(
+                {"title": "Koshary", "time_minutes": 40, "price": "7.50"}
+            ))
+        self.addCleanup(os.remove, job.path)
+
+        def fail_meanwhile(records):
+            RecipeImport.objects.filter(pk=job.pk).update(
+                status=RecipeImport.STATUS_FAILED
+            )
+            return []
+
+        validate = "recipes.imports.validate_records"
+        with patch(validate, side_effect=fail_meanwhile), self.assertRaises(
+            ImportAbandoned
+        ):
+            run_import(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, RecipeImport.STATUS_FAILED)
+        self.assertEqual(job.records_done, 0)
+
+    def test_import_status_of_other_user(self):
+        """Test the imports of other users are not found"""
+        job = RecipeImport.objects.create(
+            user=create_user(email="other@gmail.com"), format="csv"
+        )
+
+        res = self.client.get(import_status_url(job.pk))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
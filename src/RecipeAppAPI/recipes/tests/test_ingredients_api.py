@@ -11,6 +11,7 @@ from recipes.serializers import IngredientSerializer
 
 
 INGREDIENT_URL = reverse("recipes:ingredient-list")
+INGREDIENT_AUTOCOMPLETE_URL = reverse("recipes:ingredient-autocomplete")
 
 
 class PublicIngredientAPITests(TestCase):
@@ -44,7 +45,7 @@ class PrivateIngredientAPITests(TestCase):
         ingredients = Ingredient.objects.all().order_by("-name")
         serializer = IngredientSerializer(ingredients, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_ingredients_limited_to_authorized_user(self):
@@ -59,8 +60,8 @@ class PrivateIngredientAPITests(TestCase):
         res = self.client.get(INGREDIENT_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], ingredient.name)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], ingredient.name)
 
     def test_create_ingredient_with_valid_data_successful(self):
         """Test creating ingredient with valid data is successful"""
@@ -90,10 +91,61 @@ class PrivateIngredientAPITests(TestCase):
         recipe.ingredients.add(ingredient1)
 
         res = self.client.get(INGREDIENT_URL, {"assigned_only": 1})
+        ingredient1.refresh_from_db()
 
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
+
+
+class IngredientAutocompleteAPITests(TestCase):
+    """Test completing ingredient names by prefix"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+        for name in ("Salt", "salmon", "Sage", "Sugar", "Basil"):
+            sample_ingredient(user=self.user, name=name)
+
+    def complete(self, prefix, **params):
+        """Returns the ingredient names completing prefix"""
+        res = self.client.get(
+            INGREDIENT_AUTOCOMPLETE_URL, {"prefix": prefix, **params}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [ingredient["name"] for ingredient in res.data["results"]]
+
+    def test_autocomplete_prefix_required(self):
+        """Test completing without a prefix is a bad request"""
+        res = self.client.get(INGREDIENT_AUTOCOMPLETE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_by_prefix_ignoring_case(self):
+        """Test names starting with the prefix are returned by name"""
+        self.assertEqual(self.complete("sa"), ["Sage", "salmon", "Salt"])
+        self.assertEqual(self.complete("SAL"), ["salmon", "Salt"])
+        self.assertEqual(self.complete("x"), [])
+
+    def test_autocomplete_limited(self):
+        """Test only the first names are returned"""
+        self.assertEqual(self.complete("s", limit=2), ["Sage", "salmon"])
+
+    def test_autocomplete_limited_to_user(self):
+        """Test other users' ingredients are not completed"""
+        other = create_user(email="other@gmail.com", password="testPass")
+        sample_ingredient(user=other, name="Saffron")
+
+        self.assertEqual(self.complete("saf"), [])
+
+    def test_autocomplete_follows_changes(self):
+        """Test new ingredients are completed"""
+        self.assertEqual(self.complete("saf"), [])
+
+        self.client.post(INGREDIENT_URL, {"name": "Saffron"})
+
+        self.assertEqual(self.complete("saf"), ["Saffron"])
@@ -1,7 +1,11 @@
 import os
 import tempfile
+from unittest.mock import patch
 
-from django.test import TestCase
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from PIL import Image
@@ -16,10 +20,14 @@ from recipes.tests.helpers import (
     sample_ingredient,
     recipe_detail_url,
     recipe_image_upload_url,
+    recipe_image_url,
+    run_commit_callbacks,
 )
+from recipes.filters import filter_recipes
 from recipes.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipes.pagination import RecipeCursorPagination
 
-from core.models import Recipe
+from core.models import Recipe, Tag
 
 
 RECIPE_URL = reverse("recipes:recipe-list")
@@ -53,7 +61,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipes_limited_logged_user_success(self):
         """Test retrieving recipes for logged user only"""
@@ -66,8 +74,8 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_retrieve_recipe_detail_success(self):
         """Test retrieving a Recipe detail is correct and successful"""
@@ -132,6 +140,78 @@ class PrivateRecipeAPITests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_names_success(self):
+        """Test creating a Recipe with tags and ingredients given by names"""
+        tag = sample_tag(user=self.user, name="Egyptian")
+        payload = {
+            "title": "Koshary",
+            "tag_names": ["Egyptian", "Vegan"],
+            "ingredient_names": ["Rice", "Lentils"],
+            "time_minutes": 40,
+            "price": "10.00",
+        }
+        res = self.client.post(RECIPE_URL, payload, format="json")
+        recipe = Recipe.objects.get(id=res.data["id"])
+        tags = recipe.tags.all()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(tags), 2)
+        self.assertIn(tag, tags)
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list("name", flat=True)),
+            ["Lentils", "Rice"],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_create_recipe_names_limited_to_user(self):
+        """Test tag names resolve to the logged user's tags only"""
+        another_user = create_user(email="another@gmail.com", password="testP")
+        another_tag = sample_tag(user=another_user, name="Egyptian")
+        payload = {
+            "title": "Koshary",
+            "tag_names": ["Egyptian"],
+            "ingredients": [],
+            "time_minutes": 40,
+            "price": "10.00",
+        }
+        res = self.client.post(RECIPE_URL, payload, format="json")
+        tag = Recipe.objects.get(id=res.data["id"]).tags.get()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(tag, another_tag)
+        self.assertEqual(tag.user, self.user)
+
+    def test_create_recipe_other_user_ingredient_fails(self):
+        """Test creating a Recipe with another user's ingredient fails"""
+        another_user = create_user(email="another@gmail.com", password="pass")
+        ingredient = sample_ingredient(user=another_user, name="Rice")
+        payload = {
+            "title": "Koshary",
+            "ingredients": [ingredient.id],
+            "tag_names": ["Egyptian"],
+            "time_minutes": 40,
+            "price": "10.00",
+        }
+        res = self.client.post(RECIPE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ingredients", res.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_without_relations_fails(self):
+        """Test creating a Recipe giving no tags by ids or names fails"""
+        payload = {
+            "title": "Koshary",
+            "ingredient_names": ["Rice"],
+            "time_minutes": 40,
+            "price": "10.00",
+        }
+        res = self.client.post(RECIPE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tags", res.data)
+        self.assertFalse(Recipe.objects.exists())
+
     def test_partial_recipe_update_success(self):
         """Test patching Recipe is successful"""
         recipe = sample_recipe(user=self.user)
@@ -181,9 +261,9 @@ class PrivateRecipeAPITests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
 
     def test_filter_recipes_by_ingredient(self):
         """Returns recipes list with a specific ingredient"""
@@ -204,9 +284,427 @@ class PrivateRecipeAPITests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
+
+    def test_filter_recipes_by_tags_no_duplicates(self):
+        """Test a recipe matching many requested tags is returned once"""
+        recipe = sample_recipe(user=self.user, title="Koshary")
+        tag1 = sample_tag(user=self.user, name="Egyptian")
+        tag2 = sample_tag(user=self.user, name="Vegan")
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {"tags": "Egyptian,Vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_filter_recipes_matching_all_tags(self):
+        """Test tags_match=all returns recipes having every tag only"""
+        recipe1 = sample_recipe(user=self.user, title="Koshary")
+        recipe2 = sample_recipe(user=self.user, title="Bashamel")
+        tag1 = sample_tag(user=self.user, name="Egyptian")
+        tag2 = sample_tag(user=self.user, name="Vegan")
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPE_URL,
+            {"tags": "Egyptian,Vegan", "tags_match": "all"}
+        )
+        ids = [recipe["id"] for recipe in res.data["results"]]
+
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_matching_all_unknown_tag(self):
+        """Test tags_match=all with an unknown tag name returns nothing"""
+        recipe = sample_recipe(user=self.user, title="Koshary")
+        recipe.tags.add(sample_tag(user=self.user, name="Egyptian"))
+
+        res = self.client.get(
+            RECIPE_URL,
+            {"tags": "Egyptian,Unknown", "tags_match": "all"}
+        )
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_filter_recipes_empty_names(self):
+        """Test a list of no names doesn't filter in either mode"""
+        recipe1 = sample_recipe(user=self.user, title="Koshary")
+        recipe2 = sample_recipe(user=self.user, title="Bashamel")
+        recipe1.tags.add(sample_tag(user=self.user, name="Egyptian"))
+
+        for match in ("any", "all"):
+            res = self.client.get(
+                RECIPE_URL, {"tags": " , ", "tags_match": match}
+            )
+            ids = {recipe["id"] for recipe in res.data["results"]}
+
+            self.assertEqual(ids, {recipe1.id, recipe2.id})
+
+    def test_filter_recipes_ignores_other_users_names(self):
+        """Test filtering doesn't match names of other users tags"""
+        another_user = create_user(email="another@gmail.com", password="testP")
+        recipe = sample_recipe(user=self.user, title="Koshary")
+        recipe.tags.add(sample_tag(user=another_user, name="Egyptian"))
+
+        res = self.client.get(RECIPE_URL, {"tags": "Egyptian"})
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_filter_recipes_invalid_match(self):
+        """Test an unknown matching mode returns a bad request"""
+        res = self.client.get(
+            RECIPE_URL,
+            {"ingredients": "Salt", "ingredients_match": "some"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeRangeFilterTests(TestCase):
+    """Test filtering and ordering recipes by price and time ranges"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+
+    def list_titles(self, **params):
+        """Returns the titles of the recipes listed for params"""
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe["title"] for recipe in res.data["results"]]
+
+    def explain(self, queryset):
+        """Returns the query plan of queryset, preferring indexes"""
+        if connection.vendor != "postgresql":
+            return queryset.explain()
+
+        # Tables of tests are too small for Postgres to prefer indexes
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+        try:
+            return queryset.explain()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("RESET enable_seqscan")
+
+    def test_filter_recipes_by_price_range(self):
+        """Test min_price and max_price bound listed recipes prices"""
+        sample_recipe(user=self.user, title="Ta3meya", price="5.00")
+        sample_recipe(user=self.user, title="Koshary", price="10.00")
+        sample_recipe(user=self.user, title="Fatta", price="25.50")
+
+        self.assertEqual(self.list_titles(max_price="10"),
+                         ["Koshary", "Ta3meya"])
+        self.assertEqual(self.list_titles(min_price="6", max_price="30"),
+                         ["Fatta", "Koshary"])
+
+    def test_filter_recipes_by_time_combined_with_tags(self):
+        """Test time ranges combine with tag filters"""
+        tag = sample_tag(user=self.user, name="Egyptian")
+        sample_recipe(user=self.user, title="Koshary",
+                      time_minutes=20).tags.add(tag)
+        sample_recipe(user=self.user, title="Fatta",
+                      time_minutes=60).tags.add(tag)
+        sample_recipe(user=self.user, title="Salad", time_minutes=10)
+
+        titles = self.list_titles(tags="Egyptian", max_time_minutes="30")
+
+        self.assertEqual(titles, ["Koshary"])
+
+    def test_filter_recipes_invalid_range(self):
+        """Test a range bound that isn't a number returns a bad request"""
+        for params in ({"min_price": "cheap"}, {"max_time_minutes": "1.5"},
+                       {"max_price": "NaN"}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_order_recipes_by_price_paginated(self):
+        """Test ordering by price pages through ties deterministically"""
+        prices = ["7.00", "3.00", "7.00", "1.00", "7.00"]
+        recipes = [sample_recipe(user=self.user, price=price)
+                   for price in prices]
+
+        res = self.client.get(RECIPE_URL,
+                              {"ordering": "price", "page_size": 2})
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            ids.extend(recipe["id"] for recipe in res.data["results"])
+
+        self.assertEqual(ids, [recipes[i].id for i in (3, 1, 0, 2, 4)])
+
+    def test_order_recipes_by_time_descending(self):
+        """Test ordering by decreasing time"""
+        sample_recipe(user=self.user, title="Salad", time_minutes=10)
+        sample_recipe(user=self.user, title="Fatta", time_minutes=60)
+        sample_recipe(user=self.user, title="Koshary", time_minutes=20)
+
+        titles = self.list_titles(ordering="-time_minutes")
+
+        self.assertEqual(titles, ["Fatta", "Koshary", "Salad"])
+
+    def test_price_range_uses_index(self):
+        """Test price ranges are answered from the (user, price) index"""
+        queryset = filter_recipes(
+            Recipe.objects.filter(user=self.user), self.user,
+            {"min_price": "5", "max_price": "10"},
+        ).order_by("price", "id")
+
+        self.assertIn("recipe_user_price_idx", self.explain(queryset))
+
+    def test_time_range_with_tags_uses_index(self):
+        """Test time ranges combined with tags use the (user, time) index"""
+        sample_tag(user=self.user, name="Egyptian")
+        queryset = filter_recipes(
+            Recipe.objects.filter(user=self.user), self.user,
+            {"tags": "Egyptian", "max_time_minutes": "30"},
+        ).order_by("time_minutes", "id")
+
+        self.assertIn("recipe_user_time_idx", self.explain(queryset))
+
+
+class RecipeSparseFieldsTests(TestCase):
+    """Test selecting the rendered recipe fields and compact layouts"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user, title="Koshary")
+        self.recipe.tags.add(sample_tag(user=self.user, name="Egyptian"))
+
+    def test_list_selected_fields(self):
+        """Test only the selected fields are rendered and selected"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPE_URL, {"fields": "title,id"})
+        recipe_queries = [query["sql"] for query in queries
+                          if "core_recipe" in query["sql"]]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"],
+            [{"id": self.recipe.id, "title": "Koshary"}],
+        )
+        self.assertEqual(len(recipe_queries), 1)
+        self.assertNotIn('"price"', recipe_queries[0])
+
+    def test_list_unknown_field(self):
+        """Test selecting a field recipes don't have is a bad request"""
+        for fields in ("id,secret", "tag_names"):
+            res = self.client.get(RECIPE_URL, {"fields": fields})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_selected_fields(self):
+        """Test a recipe detail renders the selected nested relations"""
+        res = self.client.get(
+            recipe_detail_url(self.recipe.id), {"fields": "tags"}
+        )
+
+        self.assertEqual(list(res.data), ["tags"])
+        self.assertEqual(res.data["tags"][0]["name"], "Egyptian")
+
+    def test_selected_fields_keep_ordering_fields(self):
+        """Test pages ordered by an unselected field need no extra query"""
+        cheap = sample_recipe(user=self.user, title="Fatta", price="1.00")
+        params = {"fields": "id", "ordering": "price", "page_size": 1}
+
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res.data["results"], [{"id": cheap.id}])
+        self.assertIsNotNone(res.data["next"])
+
+    def test_list_rows_layout(self):
+        """Test the rows layout renders an array of values per recipe"""
+        res = self.client.get(
+            RECIPE_URL, {"fields": "id,title", "layout": "rows"}
+        )
+
+        self.assertEqual(res.data["results"], {
+            "fields": ["id", "title"],
+            "rows": [[self.recipe.id, "Koshary"]],
+        })
+
+    def test_list_columns_layout(self):
+        """Test the columns layout renders an array of values per field"""
+        sample_recipe(user=self.user, title="Fatta")
+
+        res = self.client.get(
+            RECIPE_URL, {"fields": "title", "layout": "columns"}
+        )
+
+        self.assertEqual(res.data["results"], {
+            "fields": ["title"],
+            "columns": [["Fatta", "Koshary"]],
+        })
+
+    def test_list_unknown_layout(self):
+        """Test an unknown layout is a bad request"""
+        res = self.client.get(RECIPE_URL, {"layout": "table"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipePaginationTests(TestCase):
+    """Test Recipe API list cursor pagination"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+
+    def test_recipes_list_paginated(self):
+        """Test recipes list is split into pages linked by cursors"""
+        recipes = [sample_recipe(user=self.user) for _ in range(3)]
+
+        res = self.client.get(RECIPE_URL, {"page_size": 2})
+        first_ids = [recipe["id"] for recipe in res.data["results"]]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(first_ids, [recipes[2].id, recipes[1].id])
+        self.assertIsNone(res.data["previous"])
+        self.assertIsNotNone(res.data["next"])
+
+        res = self.client.get(res.data["next"])
+        last_ids = [recipe["id"] for recipe in res.data["results"]]
+
+        self.assertEqual(last_ids, [recipes[0].id])
+        self.assertIsNone(res.data["next"])
+        self.assertIsNotNone(res.data["previous"])
+
+    def test_recipes_pages_stable_under_inserts(self):
+        """Test recipes created between page requests don't shift pages"""
+        recipes = [sample_recipe(user=self.user) for _ in range(4)]
+
+        res = self.client.get(RECIPE_URL, {"page_size": 2})
+        sample_recipe(user=self.user, title="New Recipe")
+        res = self.client.get(res.data["next"])
+        ids = [recipe["id"] for recipe in res.data["results"]]
+
+        self.assertEqual(ids, [recipes[1].id, recipes[0].id])
+
+    def walk_pages(self, params):
+        """Returns the ids of the recipes of every page, following cursors"""
+        ids = []
+        res = self.client.get(RECIPE_URL, params)
+        # Bounded, as looping cursors would never end
+        for _ in range(100):
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(recipe["id"] for recipe in res.data["results"])
+            if res.data["next"] is None:
+                return ids, res
+            res = self.client.get(res.data["next"])
+
+        self.fail("The pages never end")
+
+    def test_recipes_pages_past_offset_cutoff_of_ties(self):
+        """Test pages of more ties than the cursor offset cutoff all come"""
+        caches["recipes"].clear()
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title=f"Recipe {i}", time_minutes=10,
+                   price="5.00")
+            for i in range(RecipeCursorPagination.offset_cutoff + 150)
+        )
+        created = list(
+            Recipe.objects.filter(user=self.user).values_list("id", flat=True)
+        )
+
+        for ordering, expected in (
+            ("price", sorted(created)),
+            ("-time_minutes", sorted(created, reverse=True)),
+        ):
+            ids, last = self.walk_pages(
+                {"ordering": ordering, "page_size": 100}
+            )
+            self.assertEqual(ids, expected)
+
+            # Previous pages are walked back by the same positions
+            previous = self.client.get(last.data["previous"])
+            self.assertEqual(
+                [recipe["id"] for recipe in previous.data["results"]],
+                expected[-150:-50],
+            )
+
+    def test_recipes_invalid_cursor(self):
+        """Test cursors of malformed positions are not found"""
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPE_URL, {"cursor": "cD1hYmM="})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch.object(RecipeCursorPagination, "max_page_size", 2)
+    def test_recipes_page_size_limited(self):
+        """Test requested page size can't exceed the maximum page size"""
+        for _ in range(3):
+            sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPE_URL, {"page_size": 10})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 2)
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test Recipe API query count does not grow with the recipes count"""
+    # One query for the collection version, one for the recipes and one
+    # batched query per relation
+    EXPECTED_QUERIES = 4
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            sample_tag(user=self.user, name="Egyptian"),
+            sample_tag(user=self.user, name="Fast"),
+        ]
+        self.ingredients = [
+            sample_ingredient(user=self.user, name="Salt"),
+            sample_ingredient(user=self.user, name="Milk"),
+        ]
+
+    def create_recipes(self, count):
+        """Creates recipes having all sample tags and ingredients"""
+        recipes = []
+        for i in range(count):
+            recipe = sample_recipe(user=self.user, title=f"Recipe {i}")
+            recipe.tags.add(*self.tags)
+            recipe.ingredients.add(*self.ingredients)
+            recipes.append(recipe)
+
+        return recipes
+
+    def test_list_query_count_constant(self):
+        """Test listing recipes runs the same queries for any list size"""
+        self.create_recipes(1)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            self.client.get(RECIPE_URL)
+
+        self.create_recipes(20)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 21)
+        self.assertEqual(len(res.data["results"][0]["tags"]), len(self.tags))
+
+    def test_retrieve_query_count_constant(self):
+        """Test retrieving a recipe runs the same queries for any size"""
+        recipe = self.create_recipes(1)[0]
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            self.client.get(recipe_detail_url(recipe.id))
+
+        self.create_recipes(20)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            res = self.client.get(recipe_detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
 
 
 class RecipeImageUploadTests(TestCase):
@@ -217,8 +715,20 @@ class RecipeImageUploadTests(TestCase):
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        for rendition in self.recipe.image_renditions.all():
+            rendition.delete()
         self.recipe.image.delete()
 
+    def upload_image(self, size=(10, 10), color="black"):
+        """Uploads a PNG image of size to the recipe"""
+        with tempfile.NamedTemporaryFile(suffix=".png") as ntf:
+            img = Image.new("RGB", size, color)
+            img.save(ntf, format="PNG")
+            ntf.seek(0)
+            url = recipe_image_upload_url(self.recipe.id)
+            return self.client.post(url, {"image": ntf}, format="multipart")
+
     def test_upload_image_to_recipe_successful(self):
         """Test uploading an image to a recipe is successful"""
         with tempfile.NamedTemporaryFile(suffix=".png") as ntf:
@@ -239,3 +749,72 @@ class RecipeImageUploadTests(TestCase):
         res = self.client.post(url, {"image": "non-image"}, format="multipart")
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_image_returns_before_rendering(self):
+        """Test uploading an image leaves its renditions pending"""
+        res = self.upload_image()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["image_status"], Recipe.IMAGE_PENDING)
+        self.assertEqual(res.data["renditions"], [])
+
+    @override_settings(RECIPE_IMAGE_PIPELINE_EAGER=True)
+    def test_upload_image_renders_renditions(self):
+        """Test resized WebP and JPEG renditions are made of an image"""
+        res = self.upload_image(size=(1600, 800))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(recipe_image_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["image_status"], Recipe.IMAGE_READY)
+        renditions = {
+            (r["name"], r["format"]): r for r in res.data["renditions"]
+        }
+        self.assertEqual(len(renditions), 6)
+        self.assertEqual(renditions["thumbnail", "webp"]["width"], 200)
+        self.assertEqual(renditions["thumbnail", "webp"]["height"], 100)
+        self.assertEqual(renditions["large", "jpg"]["width"], 1280)
+        for rendition in self.recipe.image_renditions.all():
+            self.assertTrue(os.path.exists(rendition.file.path))
+
+    @override_settings(
+        RECIPE_IMAGE_PIPELINE_EAGER=True, MEDIA_RELEASE_MIN_AGE=0
+    )
+    def test_upload_image_replaces_renditions(self):
+        """Test uploading a new image deletes the old renditions"""
+        self.upload_image()
+        old_paths = [
+            rendition.file.path
+            for rendition in self.recipe.image_renditions.all()
+        ]
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+        self.upload_image(color="white")
+        run_commit_callbacks()
+
+        self.assertEqual(self.recipe.image_renditions.count(), 6)
+        for path in old_paths:
+            self.assertFalse(os.path.exists(path))
+
+    @override_settings(RECIPE_IMAGE_PIPELINE_EAGER=True)
+    def test_identical_image_shares_renditions(self):
+        """Test renditions of an identical image are reused, not redone"""
+        other = sample_recipe(user=self.user)
+        self.upload_image()
+        self.recipe, other = other, self.recipe
+
+        with patch("recipes.images.create_renditions") as create_renditions:
+            self.upload_image()
+
+        create_renditions.assert_not_called()
+        self.assertEqual(self.recipe.image_renditions.count(), 6)
+        self.assertEqual(
+            set(self.recipe.image_renditions.values_list("file", flat=True)),
+            set(other.image_renditions.values_list("file", flat=True)),
+        )
+        for rendition in other.image_renditions.all():
+            rendition.delete()
+        other.refresh_from_db()
+        other.image.delete()
@@ -0,0 +1,134 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+from recipes.search import InvertedIndex
+from recipes.tests.helpers import (
+    create_user,
+    sample_recipe,
+    sample_tag,
+    sample_ingredient,
+    recipe_detail_url,
+)
+
+
+SEARCH_URL = reverse("recipes:recipe-search")
+
+
+class RecipeSearchAPITests(TestCase):
+    """Test searching recipes by words"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        """Returns the titles of the recipes found for query"""
+        res = self.client.get(SEARCH_URL, {"q": query, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe["title"] for recipe in res.data["results"]]
+
+    def test_search_query_required(self):
+        """Test searching without words is a bad request"""
+        res = self.client.get(SEARCH_URL, {"q": " "})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_by_title_tags_and_ingredients(self):
+        """Test recipes are found by title, tag and ingredient names"""
+        curry = sample_recipe(user=self.user, title="Chicken curry")
+        curry.tags.add(sample_tag(user=self.user, name="Spicy"))
+        salad = sample_recipe(user=self.user, title="Green salad")
+        salad.ingredients.add(sample_ingredient(user=self.user, name="Lime"))
+
+        self.assertEqual(self.search("curry"), ["Chicken curry"])
+        self.assertEqual(self.search("SPICY chicken"), ["Chicken curry"])
+        self.assertEqual(self.search("lime"), ["Green salad"])
+        self.assertEqual(self.search("spicy lime"), [])
+
+    def test_search_results_ranked(self):
+        """Test recipes matching words more often rank first"""
+        sample_recipe(user=self.user, title="Tomato soup")
+        sample_recipe(user=self.user, title="Tomato tomato salad")
+
+        self.assertEqual(
+            self.search("tomato"), ["Tomato tomato salad", "Tomato soup"]
+        )
+        self.assertEqual(self.search("tomato", limit=1), [
+            "Tomato tomato salad"
+        ])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are not found"""
+        other = create_user(email="other@gmail.com", password="testPass")
+        sample_recipe(user=other, title="Secret pie")
+
+        self.assertEqual(self.search("pie"), [])
+
+    def test_search_compact_layout(self):
+        """Test search results render the selected fields as rows"""
+        recipe = sample_recipe(user=self.user, title="Tomato soup")
+
+        res = self.client.get(SEARCH_URL, {
+            "q": "tomato", "fields": "id,title", "layout": "rows",
+        })
+
+        self.assertEqual(res.data["results"], {
+            "fields": ["id", "title"],
+            "rows": [[recipe.id, "Tomato soup"]],
+        })
+
+    def test_search_follows_changes(self):
+        """Test searching reflects renamed recipes and tags"""
+        recipe = sample_recipe(user=self.user, title="Pancakes")
+        tag = sample_tag(user=self.user, name="Breakfast")
+        recipe.tags.add(tag)
+        self.assertEqual(self.search("breakfast"), ["Pancakes"])
+
+        self.client.patch(recipe_detail_url(recipe.id), {"title": "Waffles"})
+        tag.name = "Brunch"
+        tag.save()
+
+        self.assertEqual(self.search("pancakes"), [])
+        self.assertEqual(self.search("brunch waffles"), ["Waffles"])
+
+        tag.delete()
+
+        self.assertEqual(self.search("brunch"), [])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.search_document, "Waffles")
+
+
+class InvertedIndexTests(TestCase):
+    """Test the in-process recipe search index"""
+
+    def test_rarer_words_rank_higher(self):
+        """Test matches of words found in fewer documents rank first"""
+        index = InvertedIndex([
+            (1, "rice beans"),
+            (2, "rice saffron"),
+            (3, "rice beans"),
+        ])
+
+        ranked = index.search("rice saffron", limit=10)
+
+        self.assertEqual([pk for pk, _rank in ranked], [2])
+        self.assertEqual(
+            [pk for pk, _rank in index.search("rice", limit=10)], [3, 2, 1]
+        )
+
+    def test_search_documents_stored(self):
+        """Test recipes store their title and relation names to search"""
+        user = create_user(email="ebram96@gmail.com", password="testPass")
+        recipe = sample_recipe(user=user, title="Pho")
+        recipe.tags.add(sample_tag(user=user, name="Soup"))
+        recipe.ingredients.add(sample_ingredient(user=user, name="Beef"))
+
+        recipe = Recipe.objects.get(pk=recipe.pk)
+
+        self.assertEqual(recipe.search_document, "Pho Soup Beef")
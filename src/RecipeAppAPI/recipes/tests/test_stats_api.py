@@ -0,0 +1,180 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import RecipeRollup, RecipeRollupBucket, Tag
+
+from recipes.tests.helpers import (
+    create_user,
+    sample_recipe,
+    sample_tag,
+    sample_ingredient,
+    recipe_detail_url,
+)
+
+
+STATS_URL = reverse("recipes:recipe-stats")
+RECIPE_BULK_URL = reverse("recipes:recipe-bulk")
+
+
+class RecipeStatsAPITests(TestCase):
+    """Test the recipe statistics of the logged user"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="ebram96@gmail.com", password="testPass")
+        self.client.force_authenticate(self.user)
+
+    def get_stats(self):
+        """Returns the logged user's statistics"""
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data
+
+    def test_stats_login_required(self):
+        """Test login is required to retrieve statistics"""
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stats_without_recipes(self):
+        """Test the statistics of a user having no recipes"""
+        stats = self.get_stats()
+
+        self.assertEqual(stats["recipe_count"], 0)
+        self.assertIsNone(stats["price"]["average"])
+        self.assertEqual(stats["price"]["percentiles"], {})
+        self.assertEqual(stats["tags"], [])
+
+    def test_stats_of_recipes(self):
+        """Test averages, percentiles and histograms of the user's recipes"""
+        for price, time_minutes in ((5, 10), (10, 20), (15, 30), (50, 90)):
+            sample_recipe(user=self.user, price=price,
+                          time_minutes=time_minutes)
+        sample_recipe(user=create_user(email="other@gmail.com"), price=99)
+
+        stats = self.get_stats()
+
+        self.assertEqual(stats["recipe_count"], 4)
+        self.assertEqual(stats["price"]["average"], "20.00")
+        self.assertEqual(
+            stats["price"]["percentiles"],
+            {"50": "10.00", "90": "50.00", "99": "50.00"},
+        )
+        self.assertEqual(stats["time_minutes"]["average"], 38)
+        self.assertEqual(stats["time_minutes"]["percentiles"]["50"], 20)
+
+    def test_stats_histograms(self):
+        """Test the most used tags and ingredients are counted"""
+        spicy = sample_tag(user=self.user, name="Spicy")
+        dinner = sample_tag(user=self.user, name="Dinner")
+        sample_tag(user=self.user, name="Unused")
+        tomato = sample_ingredient(user=self.user, name="Tomato")
+        sample_recipe(user=self.user).tags.add(spicy, dinner)
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(dinner)
+        recipe.ingredients.add(tomato)
+
+        stats = self.get_stats()
+
+        self.assertEqual(
+            [(tag["name"], tag["recipe_count"]) for tag in stats["tags"]],
+            [("Dinner", 2), ("Spicy", 1)],
+        )
+        self.assertEqual(stats["ingredients"][0]["recipe_count"], 1)
+
+    def test_stats_follow_recipe_changes(self):
+        """Test updated and deleted recipes are rolled up again"""
+        recipe = sample_recipe(user=self.user, price=5, time_minutes=10)
+        other = sample_recipe(user=self.user, price=7, time_minutes=10)
+
+        self.client.patch(recipe_detail_url(recipe.id), {"price": "45.00"})
+        self.client.delete(recipe_detail_url(other.id))
+        stats = self.get_stats()
+
+        self.assertEqual(stats["recipe_count"], 1)
+        self.assertEqual(stats["price"]["average"], "45.00")
+        self.assertEqual(stats["price"]["percentiles"]["50"], "45.00")
+
+    def test_stats_follow_bulk_writes(self):
+        """Test recipes written in bulk are rolled up"""
+        payload = [
+            {"title": "Koshary", "time_minutes": 40, "price": "10.00",
+             "tags": [], "ingredients": []},
+            {"title": "Bashamel", "time_minutes": 45, "price": "20.00",
+             "tags": [], "ingredients": []},
+        ]
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+        stats = self.get_stats()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(stats["recipe_count"], 2)
+        self.assertEqual(stats["price"]["average"], "15.00")
+
+    def test_stats_queries_independent_of_recipes(self):
+        """Test statistics are read without scanning the recipes"""
+        for price in range(30):
+            sample_recipe(user=self.user, price=price)
+
+        with self.assertNumQueries(4):
+            self.get_stats()
+
+    def test_rebuild_recipe_rollups(self):
+        """Test the rebuild command recomputes drifted rollups"""
+        sample_recipe(user=self.user, price=5, time_minutes=10)
+        sample_recipe(user=self.user, price="12.50", time_minutes=12)
+        expected = self.get_stats()
+        RecipeRollup.objects.update(recipe_count=9, price_total=0)
+        RecipeRollupBucket.objects.all().delete()
+
+        call_command(
+            "rebuild_recipe_rollups", self.user.email, stdout=StringIO()
+        )
+
+        self.assertEqual(self.get_stats(), expected)
+
+    def test_rebuilt_buckets_of_negative_values(self):
+        """Test rebuilt rollups bucket negative values like recipe changes"""
+        refund = sample_recipe(user=self.user, price="-2.50",
+                               time_minutes=-5)
+        sample_recipe(user=self.user, price="1.00", time_minutes=10)
+        RecipeRollup.objects.rebuild(self.user.pk)
+
+        self.client.delete(recipe_detail_url(refund.id))
+        stats = self.get_stats()
+
+        self.assertEqual(stats["price"]["average"], "1.00")
+        self.assertEqual(stats["price"]["percentiles"]["50"], "1.00")
+        self.assertEqual(stats["time_minutes"]["percentiles"]["50"], 10)
+        self.assertFalse(RecipeRollupBucket.objects.filter(
+            recipe_count__lt=0
+        ).exists())
+
+    def test_stats_follow_created_batches(self):
+        """Test batches of created recipes are added to the rollup"""
+        sample_recipe(user=self.user, price=5, time_minutes=10)
+        call_command(
+            "seed_recipes", self.user.email, "--recipes=20", "--tags=3",
+            "--batch-size=7", stdout=StringIO(),
+        )
+        stats = self.get_stats()
+        counts = dict(self.user.tag_set.values_list("name", "recipe_count"))
+
+        call_command(
+            "rebuild_recipe_rollups", self.user.email, stdout=StringIO()
+        )
+        Tag.objects.refresh_recipe_counts(
+            list(self.user.tag_set.values_list("pk", flat=True))
+        )
+
+        self.assertEqual(stats["recipe_count"], 21)
+        self.assertEqual(self.get_stats(), stats)
+        self.assertEqual(
+            dict(self.user.tag_set.values_list("name", "recipe_count")),
+            counts,
+        )
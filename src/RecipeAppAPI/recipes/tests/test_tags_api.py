@@ -11,6 +11,7 @@ from recipes.tests.helpers import create_user, sample_tag, sample_recipe
 
 
 TAGS_URL = reverse("recipes:tag-list")
+TAGS_AUTOCOMPLETE_URL = reverse("recipes:tag-autocomplete")
 USER_PAYLOAD = {"email": "ebram96@gmail.com", "password": "testPassword"}
 
 
@@ -42,7 +43,7 @@ class PrivateTagAPITests(TestCase):
         tags = Tag.objects.all().order_by("-name")
         serializer = TagSerializer(tags, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_tags_limited_to_authorized_user(self):
@@ -58,11 +59,11 @@ class PrivateTagAPITests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data["results"]), 2)
 
         # The data returned ordered by -name :
-        self.assertEqual(res.data[0]["name"], "Salad")
-        self.assertEqual(res.data[1]["name"], "Fruity")
+        self.assertEqual(res.data["results"][0]["name"], "Salad")
+        self.assertEqual(res.data["results"][1]["name"], "Fruity")
 
     def test_create_tag_with_valid_data_successful(self):
         """Test creating a new tag with valid data is successful"""
@@ -82,6 +83,25 @@ class PrivateTagAPITests(TestCase):
         res = self.client.post(TAGS_URL, payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_tag_with_taken_name_fail(self):
+        """Test creating a tag with a name the user already has fails"""
+        sample_tag(user=self.user, name="Spicy")
+        res = self.client.post(TAGS_URL, {"name": "Spicy"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_tag_with_name_of_another_user(self):
+        """Test users may have tags with the same names"""
+        another_user = create_user(
+            email="another_ebram96@gmail.com",
+            password="testPassword",
+        )
+        sample_tag(user=another_user, name="Spicy")
+        res = self.client.post(TAGS_URL, {"name": "Spicy"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
     def test_retrieve_tags_assigned_to_recipes(self):
         """Returns a list of tags that are assigned to recipes"""
         tag1 = sample_tag(user=self.user, name="Spicy")
@@ -91,10 +111,90 @@ class PrivateTagAPITests(TestCase):
         recipe.tags.add(tag1)
 
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
+        tag1.refresh_from_db()
 
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
+
+    def test_tags_list_paginated(self):
+        """Test tags list is split into pages ordered by name"""
+        for name in ("Dinner", "Lunch", "Spicy"):
+            sample_tag(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {"page_size": 2})
+        names = [tag["name"] for tag in res.data["results"]]
+
+        self.assertEqual(names, ["Spicy", "Lunch"])
+
+        res = self.client.get(res.data["next"])
+        names = [tag["name"] for tag in res.data["results"]]
+
+        self.assertEqual(names, ["Dinner"])
+        self.assertIsNone(res.data["next"])
+
+    def test_autocomplete_tags(self):
+        """Test completing tag names by prefix"""
+        sample_tag(user=self.user, name="Vegan")
+        sample_tag(user=self.user, name="Vegetarian")
+        sample_tag(user=self.user, name="Dessert")
+
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {"prefix": "veg"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag["name"] for tag in res.data["results"]],
+            ["Vegan", "Vegetarian"],
+        )
+
+    def test_retrieve_assigned_tags_without_duplicates(self):
+        """Test a tag assigned to many recipes is listed once"""
+        tag = sample_tag(user=self.user, name="Spicy")
+        sample_recipe(user=self.user, title="Koshary").tags.add(tag)
+        sample_recipe(user=self.user, title="Molokhia").tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["recipe_count"], 2)
+
+    def test_tags_ordered_by_usage(self):
+        """Test ordering tags by the number of recipes using them"""
+        spicy = sample_tag(user=self.user, name="Spicy")
+        dinner = sample_tag(user=self.user, name="Dinner")
+        sample_tag(user=self.user, name="Lunch")
+        sample_recipe(user=self.user, title="Koshary").tags.add(spicy, dinner)
+        sample_recipe(user=self.user, title="Molokhia").tags.add(dinner)
+
+        res = self.client.get(TAGS_URL, {"ordering": "-recipe_count"})
+
+        counts = [(tag["name"], tag["recipe_count"])
+                  for tag in res.data["results"]]
+
+        self.assertEqual(counts, [("Dinner", 2), ("Spicy", 1), ("Lunch", 0)])
+
+    def test_tags_pages_past_offset_cutoff_of_equal_counts(self):
+        """Test unused tags are all paged through when ordered by usage"""
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name=f"Tag {i}") for i in range(1150)
+        )
+        expected = sorted(
+            Tag.objects.filter(user=self.user).values_list("id", flat=True),
+            reverse=True,
+        )
+
+        ids = []
+        res = self.client.get(
+            TAGS_URL, {"ordering": "-recipe_count", "page_size": 100}
+        )
+        # Bounded, as looping cursors would never end
+        for _ in range(100):
+            ids.extend(tag["id"] for tag in res.data["results"])
+            if res.data["next"] is None:
+                break
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(ids, expected)
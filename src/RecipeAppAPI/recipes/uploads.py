@@ -0,0 +1,334 @@
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http.multipartparser import (
+    MultiPartParser as DjangoMultiPartParser,
+    MultiPartParserError,
+)
+from django.utils.translation import gettext as _
+
+from PIL import Image
+
+from rest_framework import exceptions, parsers, serializers, status
+
+from core.models import upload_temp_path
+
+
+# Leading bytes identifying each accepted image format
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+IMAGE_EXTENSIONS = {
+    "jpeg": "jpg",
+    "png": "png",
+    "gif": "gif",
+    "webp": "webp",
+}
+SNIFF_LENGTH = 12
+
+# Bytes read from the request body at once
+CHUNK_SIZE = 64 * 1024
+
+# Room left for the other form fields and the multipart framing
+MULTIPART_OVERHEAD = 64 * 1024
+
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class UploadTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _("Uploaded file is too large.")
+    default_code = "upload_too_large"
+
+
+class UploadOffsetMismatch(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("The chunk doesn't start at the upload offset.")
+    default_code = "upload_offset_mismatch"
+
+
+class InvalidImage(exceptions.ValidationError):
+    """Error of an upload that doesn't start like an accepted image"""
+    def __init__(self):
+        super().__init__({"image": [_(
+            "Upload a valid image. The file you uploaded was either not an "
+            "image or a corrupted image."
+        )]})
+
+
+def sniff_image_format(head):
+    """Returns the image format identified by the first bytes of a file"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+
+    for signature, image_format in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+
+    return None
+
+
+def verify_image(path, image_format):
+    """
+    Returns whether Pillow reads the file at path as an image of the
+    sniffed format and finds it intact, like Django's ImageField does
+    """
+    try:
+        with Image.open(path) as image:
+            if (image.format or "").lower() != image_format:
+                return False
+            image.verify()
+    except Exception:
+        return False
+
+    return True
+
+
+def image_file_name(name, image_format):
+    """Returns name with the extension of the sniffed image format"""
+    stem = os.path.splitext(os.path.basename(name))[0] or "image"
+
+    return f"{stem}.{IMAGE_EXTENSIONS[image_format]}"
+
+
+class StreamedImageFile(UploadedFile):
+    """
+    Image written straight under MEDIA_ROOT while it was received, with the
+    digest of its content when it was hashed meanwhile. Storage moves it in
+    place instead of copying it, it is removed if left unsaved.
+    """
+    def __init__(self, path, mode, name, size=0, image_format=None,
+                 content_type=None, charset=None):
+        super().__init__(open(path, mode), name, content_type, size, charset)
+        self.path = path
+        self.image_format = image_format
+        self.digest = None
+
+    def temporary_file_path(self):
+        """Returns the path storage moves the file from"""
+        return self.path
+
+    def close(self):
+        """Closes the file and removes it unless storage moved it"""
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """
+    Upload handler writing image files to disk as they are received. The
+    size limit is enforced before and while reading the body, and the
+    format is sniffed from the first bytes instead of decoding the image.
+    """
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+        self.file = None
+        self.head = b""
+        self.hasher = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        """Rejects requests too large to hold an accepted image"""
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        """Opens the file the upload is written to"""
+        super().new_file(*args, **kwargs)
+        self.head = b""
+        self.hasher = hashlib.sha256()
+        self.file = StreamedImageFile(
+            upload_temp_path(f"{uuid.uuid4().hex}.upload"),
+            "w+b",
+            self.file_name,
+            content_type=self.content_type,
+            charset=self.charset,
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        """Writes a chunk after checking the size and the format"""
+        if start + len(raw_data) > self.max_size:
+            self.abort(UploadTooLarge())
+
+        if self.file.image_format is None:
+            self.head += raw_data[:SNIFF_LENGTH - len(self.head)]
+            if len(self.head) >= SNIFF_LENGTH:
+                self.sniff()
+
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        """Returns the received image file"""
+        if self.file.image_format is None:
+            self.sniff()
+
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.digest = self.hasher.hexdigest()
+        self.file.name = image_file_name(
+            self.file.name, self.file.image_format
+        )
+
+        return self.file
+
+    def sniff(self):
+        """Identifies the image format of the file being received"""
+        self.file.image_format = sniff_image_format(self.head)
+        if self.file.image_format is None:
+            self.abort(InvalidImage())
+
+    def abort(self, error):
+        """Removes the partially received file and stops the upload"""
+        self.file.close()
+        raise error
+
+
+class StreamingImageParser(parsers.MultiPartParser):
+    """Multipart parser streaming files with StreamingImageUploadHandler"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parses the form and streams its files to disk"""
+        parser_context = parser_context or {}
+        request = parser_context["request"]
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta["CONTENT_TYPE"] = media_type
+        upload_handlers = [StreamingImageUploadHandler(request)]
+
+        try:
+            parser = DjangoMultiPartParser(
+                meta, stream, upload_handlers, encoding
+            )
+            data, files = parser.parse()
+            return parsers.DataAndFiles(data, files)
+        except MultiPartParserError as exc:
+            raise exceptions.ParseError(
+                "Multipart form parse error - %s" % str(exc)
+            )
+
+
+class StreamedImageField(serializers.ImageField):
+    """
+    Image field verifying streamed uploads with Pillow from the file they
+    were written to, and rejecting the ones whose content doesn't match
+    their sniffed format, like polyglot or truncated files.
+    """
+    def to_internal_value(self, data):
+        if getattr(data, "image_format", None):
+            if not verify_image(data.temporary_file_path(), data.image_format):
+                self.fail("invalid_image")
+            return serializers.FileField.to_internal_value(self, data)
+
+        return super().to_internal_value(data)
+
+
+def parse_content_range(value):
+    """Returns the first byte, last byte and total of a Content-Range"""
+    match = CONTENT_RANGE_RE.match(value or "")
+    if match is None:
+        raise exceptions.ValidationError({"content_range": [_(
+            "Expected a Content-Range header like 'bytes 0-1023/4096'."
+        )]})
+
+    first, last, total = (int(group) for group in match.groups())
+    if first > last or last >= total:
+        raise exceptions.ValidationError({"content_range": [_(
+            "Invalid byte range."
+        )]})
+
+    return first, last, total
+
+
+def check_chunk_offset(upload, first):
+    """Raises UploadOffsetMismatch unless a chunk continues upload"""
+    if first != upload.offset:
+        raise UploadOffsetMismatch(_(
+            "Expected the chunk starting at byte %(offset)d."
+        ) % {"offset": upload.offset})
+
+
+@contextmanager
+def received_chunk(upload, stream, content_range):
+    """
+    Writes the chunk read from stream at the byte range of content_range
+    of a resumable upload to a file of its own, without holding more than
+    a read buffer in memory. Yields the first and last bytes of the chunk
+    and the path of its file, to be appended by append_chunk(), and
+    removes the file on exit.
+    """
+    first, last, total = parse_content_range(content_range)
+    if total != upload.size:
+        raise exceptions.ValidationError({"content_range": [_(
+            "The total size doesn't match the upload size."
+        )]})
+    check_chunk_offset(upload, first)
+
+    path = upload_temp_path(f"{upload.pk}.{uuid.uuid4().hex}.chunk")
+    remaining = last - first + 1
+    try:
+        with open(path, "wb") as chunk:
+            while remaining:
+                data = stream.read(min(remaining, CHUNK_SIZE))
+                if not data:
+                    raise exceptions.ValidationError({"content_range": [_(
+                        "The body is shorter than the byte range."
+                    )]})
+
+                chunk.write(data)
+                remaining -= len(data)
+
+        yield first, last, path
+    finally:
+        os.remove(path)
+
+
+def append_chunk(upload, first, last, path):
+    """
+    Appends a chunk written by received_chunk() to a resumable upload,
+    which should be locked meanwhile. Chunks no longer continuing the
+    upload, as another one was appended since they were received, are
+    rejected. Returns True once every byte of the upload is received.
+    """
+    check_chunk_offset(upload, first)
+    with open(upload.path, "ab") as part, open(path, "rb") as chunk:
+        part.truncate(upload.offset)
+        shutil.copyfileobj(chunk, part, CHUNK_SIZE)
+
+    upload.offset = last + 1
+    if not upload.image_format and (
+        upload.offset >= min(SNIFF_LENGTH, upload.size)
+    ):
+        with open(upload.path, "rb") as part:
+            upload.image_format = sniff_image_format(part.read(SNIFF_LENGTH))
+        if upload.image_format is None:
+            raise InvalidImage()
+
+    upload.save(update_fields=("offset", "image_format"))
+
+    return upload.offset == upload.size
+
+
+def completed_image_file(upload):
+    """Returns the file of a completely received upload"""
+    return StreamedImageFile(
+        upload.path,
+        "rb",
+        image_file_name(upload.name, upload.image_format),
+        size=upload.size,
+        image_format=upload.image_format,
+    )
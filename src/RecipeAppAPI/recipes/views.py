@@ -1,20 +1,98 @@
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.utils.translation import gettext as _
+
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 
-from core.models import Tag, Ingredient, Recipe
+from core.authentication import CachedTokenAuthentication
+from core.models import (
+    Tag,
+    Ingredient,
+    Recipe,
+    RecipeImageUpload,
+    RecipeImport,
+)
+from core.renderers import CSVRenderer, NDJSONRenderer
 
 from recipes import serializers
+from recipes.autocomplete import complete_names
+from recipes.bulk import BulkModelMixin
+from recipes.export import RecipeExportSerializer
+from recipes.filters import KeysetOrderingFilter, filter_recipes
+from recipes.images import schedule_renditions
+from recipes.imports import (
+    ImportNotResumable,
+    fail_stale_imports,
+    get_import_format,
+    receive_file,
+    schedule_import,
+    start_import,
+    touch_import,
+)
+from recipes.mixins import (
+    get_collection_state,
+    ConditionalListMixin,
+    ConditionalRetrieveMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
+    ValuesListMixin,
+)
+from recipes.pagination import RecipeCursorPagination, NameCursorPagination
+from recipes.search import search_recipes
+from recipes.sparse import (
+    apply_layout,
+    get_layout,
+    get_stream_layout,
+    parse_fields,
+)
+from recipes.stats import recipe_stats
+from recipes.uploads import (
+    InvalidImage,
+    UploadTooLarge,
+    StreamingImageParser,
+    append_chunk,
+    completed_image_file,
+    received_chunk,
+)
+
+
+def get_limit(request, default, maximum):
+    """Returns the limit query parameter bounded by maximum"""
+    try:
+        limit = int(request.query_params.get("limit", default))
+    except ValueError:
+        limit = default
+
+    return max(1, min(limit, maximum))
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(ConditionalListMixin,
+                            CachedListMixin,
+                            ValuesListMixin,
+                            BulkModelMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for recipe models owned by a user"""
-    authentication_classes = (TokenAuthentication,)
+    # Safe requests read from a replica, see core.middleware
+    replica_reads = True
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = NameCursorPagination
+    # Lists are ordered by name, or by usage with ?ordering=-recipe_count
+    filter_backends = (KeysetOrderingFilter,)
+    ordering_fields = ("name", "recipe_count")
+    ordering = NameCursorPagination.ordering
 
     def get_queryset(self):
         """Returns a list o objects owned by current logged user only"""
@@ -22,7 +100,7 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         assigned_only = bool(self.request.query_params.get("assigned_only"))
 
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(recipe_count__gt=0)
 
         return queryset.filter(user=self.request.user).order_by("-name")
 
@@ -30,6 +108,50 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         """Sets the current logged in user as the author of the object"""
         serializer.save(user=self.request.user)
 
+    @action(methods=["GET"], detail=False)
+    def autocomplete(self, request):
+        """
+        Returns the logged user's first objects by name whose names start
+        with the prefix parameter, ignoring case
+        """
+        prefix = request.query_params.get("prefix", "")
+        if not prefix:
+            return Response(
+                {"prefix": [_("This field is required.")]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        limit = get_limit(
+            request,
+            settings.RECIPES_AUTOCOMPLETE_LIMIT,
+            settings.RECIPES_AUTOCOMPLETE_MAX_LIMIT,
+        )
+        version, _modified = get_collection_state(request)
+        results = complete_names(
+            self.queryset.model, request.user, version, prefix, limit
+        )
+
+        return Response({"results": [
+            {"id": pk, "name": name} for pk, name in results
+        ]})
+
+    def get_bulk_context(self, serializer, items, instances):
+        """Adds the names that bulk items can't use to the context"""
+        context = super().get_bulk_context(serializer, items, instances)
+        names = Counter(
+            item.get("name") for item in items
+            if isinstance(item, dict) and isinstance(item.get("name"), str)
+        )
+        taken_names = set(
+            self.queryset.filter(user=self.request.user, name__in=names)
+            .exclude(pk__in=[instance.pk for instance in instances])
+            .values_list("name", flat=True)
+        )
+        taken_names.update(name for name, count in names.items() if count > 1)
+        context["taken_names"] = taken_names
+
+        return context
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in database"""
@@ -43,35 +165,148 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalListMixin,
+                    ConditionalRetrieveMixin,
+                    CachedListMixin,
+                    CachedRetrieveMixin,
+                    ValuesListMixin,
+                    BulkModelMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in database"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    # Safe requests read from a replica, see core.middleware
+    replica_reads = True
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
+    # Lists are newest first, or ordered by ?ordering=price or time_minutes
+    filter_backends = (KeysetOrderingFilter,)
+    ordering_fields = ("id", "price", "time_minutes")
+    ordering = RecipeCursorPagination.ordering
+
+    # Columns and related objects each read action actually serializes.
+    # Related objects are fetched in one batched query per relation instead
+    # of two extra queries per recipe.
+    action_fields = {
+        "list": ("id", "title", "time_minutes", "price", "link"),
+        "retrieve": ("id", "title", "time_minutes", "price", "link"),
+        "search": ("id", "title", "time_minutes", "price", "link"),
+    }
+    action_related_fields = {
+        "list": ("id",),
+        "search": ("id",),
+        "retrieve": ("id", "name", "recipe_count"),
+    }
 
     def get_queryset(self):
         """Retrieve recipe list of the logged user only"""
-        tags = self.request.query_params.get("tags")
-        ingredients = self.request.query_params.get("ingredients")
-        queryset = self.queryset
+        queryset = filter_recipes(
+            self.queryset.filter(user=self.request.user),
+            self.request.user,
+            self.request.query_params,
+        )
+
+        return self.optimize_queryset(queryset)
+
+    def get_selected_fields(self):
+        """
+        Returns the fields read actions render, as selected by the fields
+        query parameter, or None to render them all
+        """
+        if self.action not in self.action_fields:
+            return None
+
+        if not hasattr(self, "_selected_fields"):
+            serializer = self.get_serializer_class()()
+            self._selected_fields = parse_fields(
+                self.request.query_params.get("fields"),
+                [name for name, field in serializer.fields.items()
+                 if not field.write_only],
+            )
 
-        if tags:
-            queryset = queryset.filter(tags__name__in=tags.split(","))
+        return self._selected_fields
 
-        if ingredients:
-            queryset = queryset.filter(
-                ingredients__name__in=ingredients.split(",")
+    def optimize_queryset(self, queryset):
+        """
+        Limits the queryset projection and prefetching to the action and
+        the selected fields
+        """
+        fields = self.action_fields.get(self.action)
+        related_fields = self.action_related_fields.get(self.action)
+        relations = ("ingredients", "tags")
+
+        selected = self.get_selected_fields()
+        if selected is not None:
+            # Keyset pagination reads the ordering fields of the page ends
+            ordering = KeysetOrderingFilter().get_ordering(
+                self.request, queryset, self
+            )
+            kept = set(selected).union(
+                name.lstrip("-") for name in ordering
             )
+            fields = [name for name in fields if name in kept or name == "id"]
+            relations = [name for name in relations if name in selected]
+
+        if fields:
+            queryset = queryset.only(*fields)
+
+        if related_fields:
+            queryset = queryset.prefetch_related(*(
+                Prefetch(
+                    relation,
+                    queryset=model.objects.only(*related_fields).order_by(
+                        "id"
+                    ),
+                )
+                for relation, model in (
+                    ("ingredients", Ingredient), ("tags", Tag),
+                )
+                if relation in relations
+            ))
+
+        return queryset
+
+    def get_serializer_context(self):
+        """Passes the selected fields to the serializers of read actions"""
+        context = super().get_serializer_context()
+        context["fields"] = self.get_selected_fields()
+
+        return context
+
+    def get_paginated_response(self, data):
+        """Lays the listed recipes out as requested by the layout parameter"""
+        return super().get_paginated_response(self.lay_out(data))
+
+    def lay_out(self, data):
+        """Returns serialized recipes in the requested layout"""
+        fields = self.get_selected_fields()
+        if fields is None:
+            serializer = self.get_serializer_class()()
+            fields = [name for name, field in serializer.fields.items()
+                      if not field.write_only]
 
-        return queryset.filter(user=self.request.user)
+        layout = get_layout(self.request.query_params)
+
+        return apply_layout(data, fields, layout)
+
+    def get_stream_context(self, serializer):
+        """Passes the requested layout to the renderer of streamed recipes"""
+        context = super().get_stream_context(serializer)
+        context["layout"] = get_stream_layout(self.request.query_params)
+
+        return context
 
     def get_serializer_class(self):
         """Returns the appropriate serializer for actions"""
         if self.action == "retrieve":
             return serializers.RecipeDetailSerializer
-        elif self.action == "image_upload":
+        elif self.action in ("image", "image_upload"):
             return serializers.RecipeImageSerializer
+        elif self.action in ("image_uploads", "image_upload_chunk"):
+            return serializers.RecipeImageUploadSerializer
+        elif self.action in ("imports", "import_status"):
+            return serializers.RecipeImportSerializer
 
         return self.serializer_class
 
@@ -79,14 +314,230 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Attach the logged user to the new object to be created"""
         serializer.save(user=self.request.user)
 
-    @action(methods=["POST"], detail=True, url_path="image-upload")
+    @action(methods=["GET"], detail=False)
+    def search(self, request):
+        """
+        Returns the logged user's recipes best matching the words of the q
+        parameter, by title, tag names and ingredient names
+        """
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                {"q": [_("This field is required.")]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        limit = get_limit(
+            request,
+            settings.RECIPES_SEARCH_LIMIT,
+            settings.RECIPES_SEARCH_MAX_LIMIT,
+        )
+        version, _modified = get_collection_state(request)
+        ranked = search_recipes(request.user, version, query, limit)
+        recipes = self.optimize_queryset(self.queryset).in_bulk(
+            [pk for pk, _rank in ranked]
+        )
+        serializer = self.get_serializer(
+            [recipes[pk] for pk, _rank in ranked if pk in recipes],
+            many=True,
+        )
+
+        return Response({"results": self.lay_out(serializer.data)})
+
+    @action(methods=["GET"], detail=False)
+    def stats(self, request):
+        """
+        Returns the logged user's recipe count, the average and percentiles
+        of their recipe prices and times, and their most used tags and
+        ingredients, all read from precomputed rollups
+        """
+        data = recipe_stats(request.user)
+        size = settings.RECIPES_STATS_HISTOGRAM_SIZE
+        for name, model, serializer_class in (
+            ("tags", Tag, serializers.TagSerializer),
+            ("ingredients", Ingredient, serializers.IngredientSerializer),
+        ):
+            used = model.objects.filter(
+                user=request.user, recipe_count__gt=0,
+            ).order_by("-recipe_count", "name")[:size]
+            data[name] = serializer_class(used, many=True).data
+
+        return Response(data)
+
+    @action(methods=["GET"], detail=False,
+            renderer_classes=(NDJSONRenderer, CSVRenderer))
+    def export(self, request):
+        """
+        Streams the logged user's recipes matching the filter parameters,
+        with the names of their tags and ingredients, as newline delimited
+        JSON or, with ?format=csv, as CSV
+        """
+        queryset = self.get_queryset().order_by("id")
+        serializer = RecipeExportSerializer(self.get_serializer())
+        chunks = serializer.stream(
+            serializer.rows(queryset), settings.RECIPES_EXPORT_CHUNK_SIZE
+        )
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+
+        response = StreamingHttpResponse(
+            renderer.stream(chunks, {"fields": serializer.fields}),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+
+        return response
+
+    @action(methods=["POST"], detail=False)
+    def imports(self, request):
+        """
+        Imports the recipes of the NDJSON or CSV file of the request body,
+        formatted like exports. The file is written to disk as it is
+        received and imported in the background, a batch at a time.
+        """
+        import_format = get_import_format(request.content_type)
+        max_size = settings.RECIPES_IMPORT_MAX_UPLOAD_SIZE
+        if int(request.META.get("CONTENT_LENGTH") or 0) > max_size:
+            raise UploadTooLarge()
+
+        job = start_import(request.user, import_format)
+        try:
+            receive_file(
+                request.stream, job.path, max_size, partial(touch_import, job)
+            )
+        except Exception:
+            job.delete()
+            raise
+
+        schedule_import(job)
+
+        return Response(
+            self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(methods=["GET", "POST"], detail=False,
+            url_path=r"imports/(?P<import_id>[0-9a-f-]+)")
+    def import_status(self, request, import_id=None):
+        """
+        Returns the status and progress of an import, or resumes a failed
+        import after its last written batch. Stale imports show as failed.
+        """
+        try:
+            job = request.user.recipe_imports.get(pk=import_id)
+        except (RecipeImport.DoesNotExist, ValidationError):
+            raise Http404
+
+        if fail_stale_imports(RecipeImport.objects.filter(pk=job.pk)):
+            job.refresh_from_db()
+
+        if request.method == "GET":
+            return Response(self.get_serializer(job).data)
+
+        if job.status != RecipeImport.STATUS_FAILED:
+            raise ImportNotResumable()
+
+        start_import(request.user, job.format, job)
+        schedule_import(job)
+
+        return Response(
+            self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(methods=["GET"], detail=True)
+    def image(self, request, pk=None):
+        """Returns a recipe image processing status and renditions"""
+        recipe = self.get_object()
+        serializer = self.get_serializer(recipe)
+
+        return Response(serializer.data)
+
+    @action(methods=["POST"], detail=True, url_path="image-upload",
+            parser_classes=(StreamingImageParser, JSONParser))
     def image_upload(self, request, pk=None):
-        """Upload an image to a recipe"""
+        """
+        Upload an image to a recipe, its renditions are rendered in the
+        background. A JSON null image clears it.
+        """
+        recipe = self.get_object()
+
+        return self.save_image(recipe, request.data)
+
+    @action(methods=["POST"], detail=True, url_path="image-uploads")
+    def image_uploads(self, request, pk=None):
+        """Starts a resumable upload of a recipe image sent in chunks"""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+
+        if serializer.is_valid():
+            serializer.save(recipe=recipe)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=["GET", "PUT"], detail=True,
+            url_path=r"image-uploads/(?P<upload_id>[0-9a-f-]+)")
+    def image_upload_chunk(self, request, pk=None, upload_id=None):
+        """
+        Returns the offset to resume a chunked upload from, or appends the
+        request body to it at the byte range of its Content-Range header.
+        The image is saved to the recipe once every byte is received.
+        """
         recipe = self.get_object()
-        serializer = self.get_serializer_class()(recipe, data=request.data)
+        queryset = RecipeImageUpload.objects.filter(recipe=recipe)
+
+        if request.method == "GET":
+            upload = self.get_image_upload(queryset, upload_id)
+            return Response(self.get_serializer(upload).data)
+
+        # The body is received before locking the upload, so that slow
+        # clients don't hold the lock, and appended if still continuing it
+        chunk = received_chunk(
+            self.get_image_upload(queryset, upload_id),
+            request.stream,
+            request.META.get("HTTP_CONTENT_RANGE"),
+        )
+        try:
+            with chunk as (first, last, path), transaction.atomic():
+                upload = self.get_image_upload(
+                    queryset.select_for_update(), upload_id
+                )
+                completed = append_chunk(upload, first, last, path)
+                if not completed:
+                    return Response(
+                        self.get_serializer(upload).data,
+                        status=status.HTTP_202_ACCEPTED,
+                    )
+
+                image = completed_image_file(upload)
+                try:
+                    response = self.save_image(recipe, {"image": image})
+                finally:
+                    image.close()
+                upload.delete()
+        except InvalidImage:
+            queryset.filter(pk=upload_id).delete()
+            raise
+
+        return response
+
+    def get_image_upload(self, queryset, upload_id):
+        """Returns the upload of upload_id or raises 404"""
+        try:
+            return queryset.get(pk=upload_id)
+        except (RecipeImageUpload.DoesNotExist, ValidationError):
+            raise Http404
+
+    def save_image(self, recipe, data):
+        """Saves an image to a recipe and schedules its renditions"""
+        serializer = serializers.RecipeImageSerializer(recipe, data=data)
 
         if serializer.is_valid():
             serializer.save()
+            schedule_renditions(recipe)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)